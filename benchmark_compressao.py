@@ -0,0 +1,339 @@
+"""
+Benchmark do pipeline de compressão (testesunirecomprimirpdf.py) sobre um corpus sintético.
+
+Gera (uma vez) um corpus local com reportlab/PIL — páginas só de texto, páginas "escaneadas"
+(foto com ruído), mistas, em 10/100/1000 páginas, e um PDF corrompido — e roda os modos
+turbo e preciso em cada qualidade de QUALIDADES_GS. Cada execução roda em um subprocesso
+próprio para que pico de memória e contadores não se misturem entre casos.
+
+Uso:
+  python benchmark_compressao.py                       # gera o corpus e roda tudo
+  python benchmark_compressao.py --tamanhos 10,100 --qualidades /ebook --modos turbo
+  python benchmark_compressao.py --comparar antes.json depois.json
+  python benchmark_compressao.py --pdf 1.4,1.5 --resultado pdf.json
+  python benchmark_compressao.py --comparar-pdf pdf.json     # partes/tamanho: PDF 1.4 x 1.5 (object streams)
+  python benchmark_compressao.py --compressao serial         # só o caminho sem fatias paralelas
+
+Registra por execução: tempo de parede, nº de chamadas ao Ghostscript, pico de RSS (Python e
+filhos), bytes escritos em disco (blocos de I/O, quando o SO informa), nº de partes e tamanho
+da saída. O arquivo de resultados leva o commit atual para comparação entre versões.
+Os interpretadores do pool de GS são encerrados (e esperados) antes da leitura do rusage dos
+filhos, que só cobre processos já terminados.
+--pdf escolhe a versão de saída (1.4 = xref clássica; 1.5 = object streams e xref comprimida,
+ver PDF_OBJETOS_COMPACTOS); com as duas, cada caso roda uma vez em cada.
+--compressao escolhe entre a compressão em fatias paralelas e a serial (padrão: as duas).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+CORPUS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_corpus")
+TIPOS = ("texto", "scan", "misto")
+VERSOES_PDF = ("1.4", "1.5")
+COMPRESSOES = ("paralela", "serial")
+
+# ===================== Corpus sintético =====================
+
+def _pagina_texto(c, n: int):
+    from reportlab.lib.pagesizes import A4
+    c.setFont("Times-Roman", 11)
+    y = A4[1] - 72
+    c.drawString(72, y, f"Página {n} — documento de teste do benchmark")
+    for linha in range(45):
+        y -= 15
+        c.drawString(72, y, f"{linha:02d} Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod {n}")
+    c.showPage()
+
+def _imagem_scan(semente: int):
+    from PIL import Image, ImageDraw
+    # A4 a 150 dpi, papel levemente cinza com ruído de scanner e "linhas de texto"
+    w, h = 1240, 1754
+    ruido = Image.effect_noise((w, h), 18 + semente % 7).point(lambda v: 200 + v // 5)
+    img = Image.merge("RGB", (ruido, ruido, ruido))
+    draw = ImageDraw.Draw(img)
+    y = 140
+    while y < h - 160:
+        comprimento = 700 + (semente * 37 + y) % 300
+        draw.rectangle((120, y, 120 + comprimento, y + 14), fill=(40, 40, 60))
+        y += 34
+    return img
+
+def _pagina_scan(c, semente: int, pasta_tmp: str):
+    from reportlab.lib.pagesizes import A4
+    path = os.path.join(pasta_tmp, f"scan_{semente}.jpg")
+    _imagem_scan(semente).save(path, quality=85)
+    c.drawImage(path, 0, 0, *A4)
+    c.showPage()
+    os.remove(path)
+
+def _gerar_pdf(path: str, tipo: str, n_paginas: int, pasta_tmp: str):
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    c = canvas.Canvas(path, pagesize=A4)
+    for i in range(n_paginas):
+        if tipo == "texto" or (tipo == "misto" and i % 2 == 0):
+            _pagina_texto(c, i + 1)
+        else:
+            _pagina_scan(c, i + 1, pasta_tmp)
+    c.save()
+
+def gerar_corpus(pasta: str, tamanhos: List[int]) -> Dict[str, List[str]]:
+    """
+    Gera os PDFs que ainda não existem e devolve os casos: nome -> lista ordenada de entradas.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    pasta_tmp = tempfile.mkdtemp(prefix="bench_img_")
+    casos: Dict[str, List[str]] = {}
+    try:
+        for n in sorted(set(tamanhos) | {10}):
+            for tipo in TIPOS:
+                path = os.path.join(pasta, f"{tipo}_{n}.pdf")
+                if not os.path.exists(path):
+                    print(f"gerando {os.path.basename(path)}…", flush=True)
+                    _gerar_pdf(path + ".tmp", tipo, n, pasta_tmp)
+                    os.replace(path + ".tmp", path)
+                if n in tamanhos:
+                    casos[f"{tipo}_{n}"] = [path]
+    finally:
+        shutil.rmtree(pasta_tmp, ignore_errors=True)
+
+    corrompido = os.path.join(pasta, "corrompido.pdf")
+    if not os.path.exists(corrompido):
+        with open(os.path.join(pasta, "texto_10.pdf"), "rb") as f:
+            dados = f.read()
+        # corta no meio e descarta xref/trailer: o GS deve recusar e o pipeline isolar o arquivo
+        with open(corrompido, "wb") as f:
+            f.write(dados[: len(dados) * 6 // 10] + b"\n%% truncado\n")
+    casos["pacote_com_corrompido"] = [os.path.join(pasta, "texto_10.pdf"), os.path.join(pasta, "scan_10.pdf"),
+                                      corrompido, os.path.join(pasta, "misto_10.pdf")]
+    return casos
+
+# ===================== Execução de um caso (subprocesso) =====================
+
+def _rusage(quem) -> Optional[object]:
+    if resource is None:
+        return None
+    try:
+        return resource.getrusage(quem)
+    except Exception:
+        return None
+
+def _rss_bytes(ru) -> Optional[int]:
+    if ru is None:
+        return None
+    # Linux informa KB; macOS, bytes
+    return ru.ru_maxrss if sys.platform == "darwin" else ru.ru_maxrss * 1024
+
+def executar_caso(arquivos: List[str], modo: str, qualidade: str, pasta_saida: str, pdf: str = "1.5",
+                  compressao: str = "paralela") -> Dict:
+    import testesunirecomprimirpdf as pipeline
+
+    pipeline.PDF_OBJETOS_COMPACTOS = pdf != "1.4"
+    notify = pipeline.NotifierConsole(stream=io.StringIO())
+    destino = os.path.join(pasta_saida, "saida.pdf")
+    inicio = time.perf_counter()
+    partes = pipeline.processar_com_limite_worker(
+        arquivos, destino, qualidade, False, modo == "turbo", notify, threading.Event(),
+        compressao_paralela=compressao == "paralela",
+    )
+    tempo = time.perf_counter() - inicio
+    gs = pipeline.gs_invocacoes()
+    if pipeline._pool_gs is not None:
+        # os interpretadores do pool só entram no RUSAGE_CHILDREN depois de terminados
+        pipeline._pool_gs.encerrar(aguardar=30)
+
+    ru_self = _rusage(resource.RUSAGE_SELF) if resource else None
+    ru_filhos = _rusage(resource.RUSAGE_CHILDREN) if resource else None
+    pico_py = _rss_bytes(ru_self)
+    pico_gs = _rss_bytes(ru_filhos)
+    if pico_py is None:
+        try:
+            import psutil
+            pico_py = psutil.Process().memory_info().peak_wset
+        except Exception:
+            pass
+    escritos = None
+    if ru_self is not None and ru_filhos is not None:
+        escritos = (ru_self.ru_oublock + ru_filhos.ru_oublock) * 512
+    return {
+        "ok": bool(partes),
+        "tempo_s": round(tempo, 3),
+        "gs_invocacoes": gs,
+        "pico_rss_python": pico_py,
+        "pico_rss_gs": pico_gs,
+        "bytes_escritos": escritos,
+        "partes": len(partes),
+        "bytes_saida": sum(os.path.getsize(p) for p in partes if os.path.exists(p)),
+        "erros": [m for k, m in notify.msgs if k == "error"],
+    }
+
+def _rodar_subprocesso(arquivos: List[str], modo: str, qualidade: str, cache_quente: bool,
+                       pasta_cache: str, pdf: str = "1.5", compressao: str = "paralela") -> Dict:
+    pasta_saida = tempfile.mkdtemp(prefix="bench_saida_")
+    env = dict(os.environ)
+    if not cache_quente:
+        # cache de compressão isolado por execução: mede o custo a frio
+        pasta_cache = tempfile.mkdtemp(prefix="bench_cache_")
+    env["XDG_CACHE_HOME"] = pasta_cache
+    env["LOCALAPPDATA"] = pasta_cache
+    cmd = [sys.executable, os.path.abspath(__file__), "--_executar",
+           json.dumps({"arquivos": arquivos, "modo": modo, "qualidade": qualidade, "saida": pasta_saida, "pdf": pdf,
+                                                        "compressao": compressao})]
+    try:
+        proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+        linhas = proc.stdout.decode(errors="replace").strip().splitlines()
+        if proc.returncode != 0 or not linhas:
+            return {"ok": False, "erros": [proc.stderr.decode(errors="replace")[-2000:]]}
+        return json.loads(linhas[-1])
+    finally:
+        shutil.rmtree(pasta_saida, ignore_errors=True)
+        if not cache_quente:
+            shutil.rmtree(pasta_cache, ignore_errors=True)
+
+# ===================== Resultados =====================
+
+def _commit_atual() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+        return out.stdout.decode().strip()
+    except Exception:
+        return None
+
+def _chave(r: Dict) -> str:
+    # resultados anteriores à opção --pdf eram todos 1.4, e anteriores a --compressao, paralelos
+    return f"{r['caso']} | {r['modo']} | {r['qualidade']} | {r.get('pdf', '1.4')} | {r.get('compressao', 'paralela')}"
+
+def comparar(base_path: str, novo_path: str):
+    with open(base_path, encoding="utf-8") as f:
+        base = {_chave(r): r for r in json.load(f)["resultados"]}
+    with open(novo_path, encoding="utf-8") as f:
+        novo_doc = json.load(f)
+    print(f"{'caso | modo | qualidade | pdf | compressão':65} {'tempo (s)':>20} {'GS':>9} {'partes':>8} {'saída (MB)':>16}")
+    for r in novo_doc["resultados"]:
+        b = base.get(_chave(r))
+        if not b or not b.get("ok") or not r.get("ok"):
+            continue
+        dt = (r["tempo_s"] - b["tempo_s"]) / b["tempo_s"] * 100 if b["tempo_s"] else 0.0
+        print(f"{_chave(r):65} {b['tempo_s']:8.2f}→{r['tempo_s']:7.2f} {dt:+4.0f}% "
+              f"{b['gs_invocacoes']:>4}→{r['gs_invocacoes']:<4} {b['partes']:>3}→{r['partes']:<3} "
+              f"{b['bytes_saida'] / 2**20:7.2f}→{r['bytes_saida'] / 2**20:<7.2f}")
+
+def comparar_pdf(path: str):
+    """
+    Dentro de um arquivo de resultados rodado com --pdf 1.4,1.5: partes e tamanho de cada caso nas duas versões.
+    """
+    with open(path, encoding="utf-8") as f:
+        resultados = [r for r in json.load(f)["resultados"] if r.get("ok")]
+    por_versao = {(r["caso"], r["modo"], r["qualidade"], r.get("pdf", "1.4")): r for r in resultados
+                  if r.get("compressao", "paralela") == "paralela"}
+    print(f"{'caso | modo | qualidade':48} {'partes 1.4→1.5':>16} {'saída MB 1.4→1.5':>20} {'Δ':>6}")
+    total_partes = [0, 0]
+    for (caso, modo, qualidade, pdf), novo in por_versao.items():
+        base = por_versao.get((caso, modo, qualidade, "1.4"))
+        if pdf != "1.5" or base is None:
+            continue
+        total_partes[0] += base["partes"]; total_partes[1] += novo["partes"]
+        dt = (novo["bytes_saida"] - base["bytes_saida"]) / base["bytes_saida"] * 100 if base["bytes_saida"] else 0.0
+        print(f"{f'{caso} | {modo} | {qualidade}':48} {base['partes']:>8}→{novo['partes']:<7} "
+              f"{base['bytes_saida'] / 2**20:10.2f}→{novo['bytes_saida'] / 2**20:<9.2f} {dt:+5.1f}%")
+    print(f"\ntotal de partes: {total_partes[0]} → {total_partes[1]}")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark do pipeline de compressão com corpus sintético.")
+    ap.add_argument("--corpus", default=CORPUS_PADRAO, help="pasta do corpus (gerado se faltar)")
+    ap.add_argument("--tamanhos", default="10,100,1000", help="nº de páginas dos PDFs sintéticos")
+    ap.add_argument("--modos", default="turbo,preciso")
+    ap.add_argument("--qualidades", default=None, help="padrão: todas de QUALIDADES_GS")
+    ap.add_argument("--casos", default=None, help="filtra casos por nome (separados por vírgula)")
+    ap.add_argument("--pdf", default="1.5", help=f"versões de saída a medir, entre {','.join(VERSOES_PDF)}")
+    ap.add_argument("--compressao", default=",".join(COMPRESSOES),
+                    help=f"compressão dos PDFs grandes a medir, entre {','.join(COMPRESSOES)}")
+    ap.add_argument("--cache-quente", action="store_true", help="reaproveita o cache de compressão entre execuções")
+    ap.add_argument("--resultado", default=None, help="arquivo JSON de saída")
+    ap.add_argument("--comparar", nargs=2, metavar=("BASE", "NOVO"), help="compara dois arquivos de resultados")
+    ap.add_argument("--comparar-pdf", metavar="RESULTADO", help="compara PDF 1.4 x 1.5 dentro de um arquivo de resultados")
+    ap.add_argument("--_executar", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args._executar:
+        p = json.loads(args._executar)
+        print(json.dumps(executar_caso(p["arquivos"], p["modo"], p["qualidade"], p["saida"], p.get("pdf", "1.5"),
+                                        p.get("compressao", "paralela"))))
+        return 0
+    if args.comparar:
+        comparar(*args.comparar)
+        return 0
+    if args.comparar_pdf:
+        comparar_pdf(args.comparar_pdf)
+        return 0
+
+    from testesunirecomprimirpdf import QUALIDADES_GS, _encontrar_ghostscript
+    if not _encontrar_ghostscript():
+        print("Ghostscript não encontrado.", file=sys.stderr)
+        return 2
+
+    tamanhos = [int(x) for x in args.tamanhos.split(",") if x.strip()]
+    qualidades = args.qualidades.split(",") if args.qualidades else list(QUALIDADES_GS)
+    modos = args.modos.split(",")
+    versoes = [v for v in args.pdf.split(",") if v.strip()]
+    if any(v not in VERSOES_PDF for v in versoes):
+        ap.error(f"--pdf aceita {', '.join(VERSOES_PDF)}")
+    compressoes = [c for c in args.compressao.split(",") if c.strip()]
+    if any(c not in COMPRESSOES for c in compressoes):
+        ap.error(f"--compressao aceita {', '.join(COMPRESSOES)}")
+    casos = gerar_corpus(args.corpus, tamanhos)
+    if args.casos:
+        filtro = set(args.casos.split(","))
+        casos = {k: v for k, v in casos.items() if k in filtro}
+
+    commit = _commit_atual()
+    resultado_path = args.resultado or f"bench_resultados_{commit or time.strftime('%Y%m%d_%H%M%S')}.json"
+    pasta_cache = tempfile.mkdtemp(prefix="bench_cache_")
+    resultados = []
+    try:
+        for nome, arquivos in casos.items():
+            for modo in modos:
+                for qualidade in qualidades:
+                    for pdf in versoes:
+                        for compressao in compressoes:
+                            r = _rodar_subprocesso(arquivos, modo, qualidade, args.cache_quente, pasta_cache, pdf,
+                                                   compressao)
+                            r.update({"caso": nome, "modo": modo, "qualidade": qualidade, "pdf": pdf,
+                                      "compressao": compressao})
+                            resultados.append(r)
+                            if r.get("ok"):
+                                print(f"{_chave(r):65} {r['tempo_s']:8.2f}s  GS={r['gs_invocacoes']:<4} "
+                                      f"partes={r['partes']:<3} saída={r['bytes_saida'] / 2**20:.2f} MB", flush=True)
+                            else:
+                                print(f"{_chave(r):65} FALHOU", flush=True)
+    finally:
+        shutil.rmtree(pasta_cache, ignore_errors=True)
+
+    with open(resultado_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "data": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "maquina": {"plataforma": platform.platform(), "python": platform.python_version(),
+                        "cpus": os.cpu_count()},
+            "resultados": resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Resultados em {resultado_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,88 @@
+import atexit
+import gc
+import hashlib
+import io
+import itertools
+import json
+import math
 import os
+import re
 import shutil
 import subprocess
+import sys
 import tempfile
 import threading
+import time
+import zlib
+import multiprocessing
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-from typing import List, Dict, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from collections import deque
+from typing import BinaryIO, Callable, Iterable, List, Dict, Optional, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from queue import Queue, Empty
 
 from PyPDF2 import PdfReader, PdfWriter
 
+try:
+    import numpy as np
+except ImportError:   # sem NumPy a detecção de brancos fica só na checagem estrutural
+    np = None
+try:
+    from PIL import Image
+except ImportError:   # sem Pillow o motor de imagens cai para o Ghostscript
+    Image = None
+from PyPDF2.generic import (
+    ArrayObject, ContentStream, DecodedStreamObject, DictionaryObject, EncodedStreamObject, IndirectObject,
+    NameObject, NullObject, NumberObject, StreamObject,
+)
+
 # ===================== Parâmetros =====================
 LIMITE_MB = 5.0                     # limite PJe por arquivo
 QUALIDADES_GS = ("/screen", "/ebook", "/printer", "/prepress")
+QUALIDADE_AUTO = "auto"             # escolhe preset + resolução por amostragem (ver escolher_qualidade_auto)
+GS_RESOLUCAO_PADRAO = 110           # DPI de downsampling das imagens quando a resolução não é escolhida
 GS_TIMEOUT_SEC = 120                # timeout base por execução do Ghostscript
 MAX_WORKERS_DEFAULT = max(2, (os.cpu_count() or 4) - 1)  # paralelismo da pré-compressão
-MARGEM_MB = 0.12                    # margem para overhead ao unir sem recomprimir (~120KB)
+FATOR_PREVISAO = 0.97               # folga aplicada à previsão de tamanho ao dividir por páginas
+CACHE_MAX_MB = 2048                 # teto do cache de compressão em disco (LRU)
+STREAMING_CACHE_OBJETOS = 2000      # objetos resolvidos mantidos por PdfReader na união em streaming
+PDF_OBJETOS_COMPACTOS = True        # PDF 1.5: object streams + xref comprimida (saída do GS e da união em streaming)
+OBJSTM_OBJETOS = 100                # objetos por object stream na união em streaming
+UNIAO_DEDUP_RECURSOS = True         # união sem recompressão grava uma cópia só de fontes/imagens/recursos idênticos
+UNIAO_DEDUP_MIN_BYTES = 1024        # streams menores que isso não entram na deduplicação (não compensa a memória)
+GS_PIPE_ATIVO = True                # PDFs pequenos/médios vão ao GS por stdin/stdout, sem arquivos intermediários
+GS_PIPE_MAX_MB = 24                 # acima disso a entrada vai ao GS por arquivo
+GS_POOL_ATIVO = True                # interpretadores GS persistentes (cai para um processo por chamada se falhar)
+GS_POOL_PRONTO_SEC = 5              # espera pelo handshake de um interpretador novo
+BRANCO_DPI = 30                     # resolução da renderização para detectar páginas em branco
+BRANCO_MARGEM = 0.06                # fração de cada borda ignorada (furos de perfurador, sombra do scanner)
+BRANCO_CONTRASTE = 60               # quão mais escuro que o papel um pixel precisa ser para contar como tinta
+BRANCO_LIMIAR_TINTA = 0.002         # fração máxima de blocos com tinta para a página ser considerada branca
+BRANCO_CONTEUDO_MAX = 2048          # páginas sem imagem com conteúdo maior que isso não são renderizadas
+FATIAS_MIN_PAGINAS = 60             # abaixo disso a compressão em fatias paralelas não compensa
+FATIA_MIN_PAGINAS = 15              # páginas mínimas por fatia (menos que isso, o custo fixo do GS domina)
+AUTO_AMOSTRA_PAGINAS = 8            # páginas amostradas para ajustar a curva tamanho x resolução
+AUTO_RESOLUCOES = (300, 240, 200, 150, 130, 110, 96, 85, 72)  # degraus do modo auto, do melhor para o menor
+MOTORES = ("gs", "imagens")         # gs = Ghostscript reescreve tudo; imagens = só recodifica as imagens embutidas
+IMAGENS_PARAMETROS = {              # qualidade -> (DPI alvo, qualidade JPEG) do motor de imagens
+    "/screen": (72, 45), "/ebook": (110, 60), "/printer": (200, 75), "/prepress": (300, 85),
+}
+IMAGENS_MIN_BYTES = 16 * 1024       # imagens menores que isso não compensam a recodificação
+IMAGENS_GANHO_MIN = 0.9             # só troca a imagem se a nova tiver no máximo 90% do tamanho
+DUPLICATAS_MODOS = ("desligado", "relatar", "remover", "remover_similares")
+DUPLICATA_DPI = 24                  # resolução da renderização para o hash perceptual (rescans/fotos repetidas)
+DUPLICATA_DISTANCIA_MAX = 10        # bits diferentes (de 256) para duas páginas escaneadas contarem como iguais
+ANALISE_FATOR_TEXTO = 0.8           # análise prévia: fração que sobra de conteúdo/vetores após o pdfwrite
+ANALISE_FATOR_FONTES = 0.6          # análise prévia: fração que sobra das fontes embutidas (subconjunto)
+AREA_RAM_ATIVA = True               # artefatos temporários de cada job em tmpfs (RAM) quando couberem
+AREA_RAM_PASTAS = ("/dev/shm",)     # candidatas a tmpfs, na ordem de preferência (inexistentes são ignoradas)
+AREA_COTA_MB = 1024                 # teto de um job na área em RAM; o artefato que não couber vai para o disco
+AREA_RAM_FOLGA = 0.5                # fração do espaço livre do tmpfs que um job pode ocupar
+AREA_ORFA_HORAS = 12                # áreas de processos mortos (crash) ou mais velhas que isso são apagadas
+RASTROS_ATIVO = True                # grava um rastro JSONL (spans por etapa) de cada job
+RASTROS_MAX_ARQUIVOS = 200          # rastros mais antigos que isso são apagados
 
 # ===================== Utils =====================
 
@@ -26,6 +92,18 @@ def _mb(path: str) -> float:
     except Exception:
         return 0.0
 
+def _tamanho(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except Exception:
+        return 0
+
+def _contar_paginas(paths: List[str]) -> int:
+    try:
+        return sum(len(PdfReader(p).pages) for p in paths)
+    except Exception:
+        return 0
+
 def _nome_parte(base_saida: str, indice: int) -> str:
     base, ext = os.path.splitext(base_saida)
     return f"{base}_parte_{indice:02d}{ext}"
@@ -36,12 +114,30 @@ def _norm(p: str) -> str:
 def _is_windows() -> bool:
     return os.name == "nt"
 
+def _pasta_dados_app() -> str:
+    """
+    Pasta local (fora do OneDrive) para dados persistentes do app: cache etc.
+    """
+    if _is_windows():
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+        return os.path.join(base, "CompressorPDF")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "compressor_pdf")
+
+def _sha256_arquivo(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
 # ===================== Canal de notificação (thread-safe) =====================
 
 class Notifier:
     def __init__(self, queue: Queue):
         self.q = queue
         self.msgs: List[Tuple[str, str]] = []
+        self.rastreador: Optional["Rastreador"] = None   # definido pelo job (ver processar_com_limite_worker)
 
     def text(self, s: str): self.q.put(("text", s))
     def subtext(self, s: str): self.q.put(("subtext", s))
@@ -55,6 +151,377 @@ class Notifier:
     def warn(self, s: str): self.msgs.append(("warn", s))
     def error(self, s: str): self.msgs.append(("error", s))
 
+    def span(self, nome: str, **atributos):
+        """
+        Mede uma etapa: `with notify.span("gs", entradas=2) as sp: ...; sp["bytes_out"] = n`.
+        Sem rastreador é um no-op que ainda entrega o dicionário de atributos.
+        """
+        if self.rastreador is None:
+            return nullcontext(atributos)
+        return self.rastreador.span(nome, **atributos)
+
+    def anotar(self, **atributos):
+        # acrescenta atributos ao span aberto mais interno desta thread (ex.: código de saída do GS)
+        if self.rastreador is not None:
+            self.rastreador.anotar(**atributos)
+
+class NotifierConsole(Notifier):
+    """
+    Notifier sem Tk (lote/linha de comando): escreve o progresso no stdout, com um prefixo
+    por caso, e guarda as mensagens em `msgs` como o Notifier da interface.
+    """
+    def __init__(self, prefixo: str = "", stream=None):
+        super().__init__(Queue())
+        self.prefixo = prefixo
+        self.stream = stream or sys.stdout
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def _escrever(self, s: str):
+        with self._lock:
+            print(f"{self.prefixo}{s}", file=self.stream, flush=True)
+
+    def text(self, s: str): self._escrever(s)
+    def subtext(self, s: str): self._escrever(f"  {s}")
+    def set_total(self, n: int): self._total = int(n)
+    def step_to(self, i: int):
+        if self._total > 1:
+            self._escrever(f"  [{i}/{self._total}]")
+
+    def done(self, result): pass
+    def close(self): pass
+
+    def info(self, s: str): super().info(s); self._escrever(s)
+    def warn(self, s: str): super().warn(s); self._escrever(f"AVISO: {s}")
+    def error(self, s: str): super().error(s); self._escrever(f"ERRO: {s}")
+
+# ===================== Rastreamento (spans por etapa) =====================
+
+def _pasta_rastros() -> str:
+    return os.path.join(_pasta_dados_app(), "rastros")
+
+_rastros_seq = itertools.count(1)
+
+class Rastreador:
+    """
+    Grava um span por etapa do job num JSONL (um objeto por linha, ao fechar a etapa):
+    job, id, pai, nome, inicio (epoch), dur_s (parede), cpu_s (CPU desta thread; o GS roda
+    em outro processo e entra só no dur_s), thread e os atributos da etapa
+    (bytes_in, bytes_out, paginas, codigo_saida…). Spans abertos em threads de pool não têm pai.
+    """
+    def __init__(self, pasta: Optional[str] = None):
+        self.pasta = pasta or _pasta_rastros()
+        os.makedirs(self.pasta, exist_ok=True)
+        self.job = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{next(_rastros_seq):03d}"
+        self.caminho = os.path.join(self.pasta, f"{self.job}.jsonl")
+        self._arquivo = open(self.caminho, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._podar()
+
+    def _podar(self):
+        try:
+            nomes = sorted(n for n in os.listdir(self.pasta) if n.endswith(".jsonl"))
+            for nome in nomes[:max(0, len(nomes) - RASTROS_MAX_ARQUIVOS)]:
+                os.remove(os.path.join(self.pasta, nome))
+        except Exception:
+            pass
+
+    def _pilha(self) -> List[Dict]:
+        if not hasattr(self._local, "pilha"):
+            self._local.pilha = []
+        return self._local.pilha
+
+    @contextmanager
+    def span(self, nome: str, **atributos):
+        pilha = self._pilha()
+        registro = {"job": self.job, "id": next(self._ids), "pai": pilha[-1]["id"] if pilha else None,
+                    "nome": nome, "inicio": round(time.time(), 3), "thread": threading.current_thread().name}
+        pilha.append(registro)
+        t0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            yield atributos
+        except BaseException as e:
+            atributos["erro"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            pilha.pop()
+            registro["dur_s"] = round(time.perf_counter() - t0, 4)
+            registro["cpu_s"] = round(time.thread_time() - c0, 4)
+            registro.update(registro.pop("_anotacoes", {}))
+            registro.update(atributos)
+            self._gravar(registro)
+
+    def anotar(self, **atributos):
+        pilha = self._pilha()
+        if pilha:
+            pilha[-1].setdefault("_anotacoes", {}).update(atributos)
+
+    def _gravar(self, registro: Dict):
+        linha = json.dumps(registro, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                self._arquivo.write(linha + "\n")
+                self._arquivo.flush()
+            except Exception:
+                pass
+
+    def fechar(self):
+        with self._lock:
+            try: self._arquivo.close()
+            except Exception: pass
+
+def resumir_rastros(caminhos: List[str], top: int = 10) -> Dict:
+    """
+    Agrega spans de vários rastros: por etapa (n, total, média, p95, máximo, CPU, bytes)
+    e os `top` spans individuais mais lentos.
+    """
+    por_nome: Dict[str, List[Dict]] = {}
+    todos: List[Dict] = []
+    for caminho in caminhos:
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        sp = json.loads(linha)
+                    except ValueError:
+                        continue
+                    sp["_rastro"] = os.path.basename(caminho)
+                    por_nome.setdefault(sp.get("nome", "?"), []).append(sp)
+                    todos.append(sp)
+        except OSError:
+            continue
+    etapas = []
+    for nome, spans in por_nome.items():
+        duracoes = sorted(sp.get("dur_s", 0.0) for sp in spans)
+        etapas.append({
+            "nome": nome,
+            "n": len(spans),
+            "total_s": round(sum(duracoes), 3),
+            "media_s": round(sum(duracoes) / len(duracoes), 3),
+            "p95_s": round(duracoes[min(len(duracoes) - 1, int(len(duracoes) * 0.95))], 3),
+            "max_s": round(duracoes[-1], 3),
+            "cpu_s": round(sum(sp.get("cpu_s", 0.0) for sp in spans), 3),
+            "bytes_in": sum(sp.get("bytes_in", 0) or 0 for sp in spans),
+            "bytes_out": sum(sp.get("bytes_out", 0) or 0 for sp in spans),
+        })
+    etapas.sort(key=lambda e: e["total_s"], reverse=True)
+    lentos = sorted(todos, key=lambda sp: sp.get("dur_s", 0.0), reverse=True)[:top]
+    return {"rastros": len(caminhos), "etapas": etapas, "lentos": lentos}
+
+# ===================== Área de trabalho (temporários por job) =====================
+
+_AREA_PREFIXO = "compressor_pdf_"
+_AREA_DONO = ".dono"
+_areas_abertas: set = set()
+_areas_lock = threading.Lock()
+_orfas_verificadas = False
+
+def _pid_vivo(pid: int) -> bool:
+    if _is_windows():
+        return True   # os.kill no Windows encerra o processo: lá só a idade decide
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except Exception:
+        pass
+    return True
+
+def _raizes_area() -> List[str]:
+    raizes = [r for r in AREA_RAM_PASTAS if os.path.isdir(r)]
+    return raizes + [tempfile.gettempdir()]
+
+def limpar_areas_orfas():
+    """
+    Apaga áreas de trabalho deixadas por processos que morreram sem fechar (crash, kill)
+    ou mais velhas que AREA_ORFA_HORAS. Roda uma vez por processo, na primeira área criada.
+    """
+    global _orfas_verificadas
+    with _areas_lock:
+        if _orfas_verificadas:
+            return
+        _orfas_verificadas = True
+    agora = time.time()
+    for raiz in _raizes_area():
+        try:
+            nomes = [n for n in os.listdir(raiz) if n.startswith(_AREA_PREFIXO)]
+        except Exception:
+            continue
+        for nome in nomes:
+            pasta = os.path.join(raiz, nome)
+            try:
+                with open(os.path.join(pasta, _AREA_DONO), "r", encoding="ascii") as f:
+                    pid = int(f.read().strip() or 0)
+                if pid == os.getpid():
+                    continue
+                if not _pid_vivo(pid) or agora - os.path.getmtime(pasta) > AREA_ORFA_HORAS * 3600:
+                    shutil.rmtree(pasta, ignore_errors=True)
+            except Exception:
+                pass
+
+def _fechar_areas_abertas():
+    with _areas_lock:
+        areas = list(_areas_abertas)
+    for area in areas:
+        area.fechar()
+
+atexit.register(_fechar_areas_abertas)
+
+def _raiz_ram() -> Optional[str]:
+    for raiz in AREA_RAM_PASTAS:
+        try:
+            if os.path.isdir(raiz) and os.access(raiz, os.W_OK) and shutil.disk_usage(raiz).free > 64 * 1024 * 1024:
+                return raiz
+        except Exception:
+            pass
+    return None
+
+class AreaTrabalho:
+    """
+    Pasta de trabalho de um job: cada artefato temporário (fatias, sondagens, limpezas,
+    renderizações) ganha aqui um nome único e é apagado no fechar(), inclusive em cancelamento.
+    - em RAM (tmpfs, AREA_RAM_PASTAS) quando houver; senão no temp do disco
+    - cota de AREA_COTA_MB na RAM: o artefato que não couber (tamanho previsto) vai para uma pasta em disco
+    - um arquivo .dono com o PID permite apagar depois a área de um processo que morreu
+    """
+    def __init__(self, cota_mb: Optional[float] = None):
+        limpar_areas_orfas()
+        self.cota = int((AREA_COTA_MB if cota_mb is None else cota_mb) * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._artefatos: set = set()
+        raiz_ram = _raiz_ram() if AREA_RAM_ATIVA else None
+        self.em_ram = raiz_ram is not None
+        self.dir = self._criar_pasta(raiz_ram or tempfile.gettempdir())
+        self._dir_disco: Optional[str] = None if self.em_ram else self.dir
+        with _areas_lock:
+            _areas_abertas.add(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    @staticmethod
+    def _criar_pasta(raiz: str) -> str:
+        pasta = tempfile.mkdtemp(prefix=f"{_AREA_PREFIXO}{os.getpid()}_", dir=raiz)
+        with open(os.path.join(pasta, _AREA_DONO), "w", encoding="ascii") as f:
+            f.write(str(os.getpid()))
+        return pasta
+
+    def bytes_em_ram(self) -> int:
+        if not self.em_ram:
+            return 0
+        total = 0
+        for raiz, _, nomes in os.walk(self.dir):
+            total += sum(_tamanho(os.path.join(raiz, n)) for n in nomes)
+        return total
+
+    def _pasta_para(self, tamanho: int) -> str:
+        if self.em_ram:
+            try:
+                livre = shutil.disk_usage(self.dir).free
+                if self.bytes_em_ram() + tamanho <= self.cota and tamanho <= livre * AREA_RAM_FOLGA:
+                    return self.dir
+            except Exception:
+                pass
+        if self._dir_disco is None:
+            self._dir_disco = self._criar_pasta(tempfile.gettempdir())
+        return self._dir_disco
+
+    def _caminho_em(self, pasta: str, prefixo: str, sufixo: str) -> str:
+        path = os.path.join(pasta, f"{prefixo}{next(self._seq):05d}{sufixo}")
+        self._artefatos.add(path)
+        return path
+
+    def novo_caminho(self, prefixo: str, sufixo: str, tamanho: int = 0) -> str:
+        """
+        Caminho único para um artefato; tamanho (bytes previstos) decide entre RAM e disco.
+        """
+        with self._lock:
+            return self._caminho_em(self._pasta_para(tamanho), prefixo, sufixo)
+
+    def novo_diretorio(self, prefixo: str, tamanho: int = 0) -> str:
+        with self._lock:
+            pasta = tempfile.mkdtemp(prefix=prefixo, dir=self._pasta_para(tamanho))
+            self._artefatos.add(pasta)
+            return pasta
+
+    def liberar(self, path: Optional[str]):
+        """
+        Apaga um artefato antes do fim do job (libera a cota).
+        """
+        if not path:
+            return
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try: os.remove(path)
+            except Exception: pass
+        with self._lock:
+            self._artefatos.discard(path)
+
+    def fechar(self):
+        with _areas_lock:
+            _areas_abertas.discard(self)
+        for pasta in {self.dir, self._dir_disco}:
+            if pasta:
+                shutil.rmtree(pasta, ignore_errors=True)
+        self._artefatos.clear()
+
+class AreaStaging(AreaTrabalho):
+    """
+    Área de trabalho de um job que também é o staging do GS (cwd do GS e response files).
+    - caminhos já ASCII-seguros são passados direto ao GS, sem staging
+    - os demais ganham um nome ASCII 00001.pdf… via hardlink, symlink ou, em último caso, cópia
+    - cada origem (caminho + mtime + tamanho) é preparada uma única vez por job
+    """
+    def __init__(self, cota_mb: Optional[float] = None):
+        super().__init__(cota_mb)
+        self._preparados: Dict[Tuple[str, int, int], str] = {}
+
+    def _vincular(self, src: str, dst: str):
+        try:
+            os.link(src, dst)
+            return
+        except Exception:
+            pass
+        try:
+            os.symlink(src, dst)
+            return
+        except Exception:
+            pass
+        shutil.copyfile(src, dst)
+
+    def novo_caminho_no_stage(self, prefixo: str, sufixo: str) -> str:
+        """
+        Como novo_caminho, mas sempre na pasta que é o cwd do GS (referência só pelo basename).
+        """
+        with self._lock:
+            return self._caminho_em(self.dir, prefixo, sufixo)
+
+    def preparar(self, input_files: List[str]) -> List[str]:
+        staged = []
+        for src in input_files:
+            src_abs = os.path.abspath(src)
+            st = os.stat(src_abs)
+            chave = (src_abs, st.st_mtime_ns, st.st_size)
+            with self._lock:
+                dst = self._preparados.get(chave)
+                if dst is None:
+                    if _caminho_seguro_para_gs(src_abs):
+                        dst = _norm(src_abs)
+                    else:
+                        # sempre na pasta principal: o response file usa só o basename (cwd do GS)
+                        dst = self._caminho_em(self.dir, "", ".pdf")
+                        self._vincular(src_abs, dst)
+                    self._preparados[chave] = dst
+            staged.append(dst)
+        return staged
+
 # ===================== Ghostscript =====================
 
 def _encontrar_ghostscript() -> Optional[str]:
@@ -72,65 +539,531 @@ def _encontrar_ghostscript() -> Optional[str]:
 
 # --------- STAGING ASCII + response file (cwd no stage) ---------
 
-def _stage_inputs_for_gs(input_files: List[str]) -> Tuple[str, List[str]]:
+_CAMINHO_SEGURO_GS = re.compile(r"[A-Za-z0-9_./:\-]+")
+
+def _caminho_seguro_para_gs(path: str) -> bool:
     """
-    Copia os PDFs para um diretório temporário único (por chamada),
-    com nomes ASCII sequenciais 00001.pdf, 00002.pdf...
+    Caminho que o GS lê direto do response file: ASCII, sem espaços nem aspas.
     """
-    stage_dir = tempfile.mkdtemp(prefix=f"gs_stage_{os.getpid()}_")
-    staged = []
-    for idx, src in enumerate(input_files, start=1):
-        dst = os.path.join(stage_dir, f"{idx:05d}.pdf")
-        shutil.copyfile(os.path.abspath(src), dst)
-        staged.append(dst)
-    return stage_dir, staged
+    return bool(_CAMINHO_SEGURO_GS.fullmatch(_norm(path)))
 
-def _write_gs_listfile_basename(files_in_stage: List[str], stage_dir: str) -> str:
+def _write_gs_listfile_basename(files_in_stage: List[str], stage: AreaStaging) -> str:
     """
-    Cria um response file .lst contendo APENAS os nomes (basename) dos PDFs, um por linha.
+    Cria um response file .lst com um PDF por linha: basename para os que estão no stage
+    (o GS roda com cwd no stage), caminho absoluto para os que dispensaram staging.
     """
-    list_path = os.path.join(stage_dir, f"gs_inputs_{os.getpid()}_{threading.get_ident()}.lst")
+    list_path = stage.novo_caminho_no_stage(f"gs_inputs_{os.getpid()}_", ".lst")
+    stage_norm = _norm(stage.dir)
     with open(list_path, "w", encoding="ascii", errors="strict") as f:
         for p in files_in_stage:
-            f.write(os.path.basename(p) + "\n")
+            if _norm(os.path.dirname(p)) == stage_norm:
+                f.write(os.path.basename(p) + "\n")
+            else:
+                f.write(_norm(p) + "\n")
     return list_path
 
-def _run_gs(args: List[str], timeout: int, cwd: Optional[str], notify: Notifier) -> Tuple[bool, str]:
+_gs_invocacoes = 0
+_gs_invocacoes_lock = threading.Lock()
+
+def gs_invocacoes() -> int:
+    """
+    Quantas vezes o Ghostscript foi executado neste processo (usado pelo benchmark).
+    """
+    return _gs_invocacoes
+
+def _contar_gs():
+    global _gs_invocacoes
+    with _gs_invocacoes_lock:
+        _gs_invocacoes += 1
+
+_RE_PAGINA_GS = re.compile(r"^Page \d+$")   # linha que o GS imprime ao começar cada página (sem -dQUIET)
+
+def _run_gs(args: List[str], timeout: int, cwd: Optional[str], notify: Notifier,
+            cancel_flag: Optional[threading.Event] = None,
+            ao_paginar: Optional[Callable[[int], None]] = None,
+            entrada: Optional[bytes] = None, saida: Optional[BinaryIO] = None,
+            avisar: bool = True) -> Tuple[bool, str]:
     """
     Executa o Ghostscript capturando stderr/stdout. Retorna (ok, stderr_text).
+    avisar=False não manda erros ao notify (quem chama tem alternativa e decide se reporta).
+    O processo é morto assim que cancel_flag é marcado (retorna (False, "cancelado"));
+    cada "Page N" do stdout chama ao_paginar(páginas iniciadas até agora).
+    Modo pipe: `entrada` vai pelo stdin e o stdout binário (-sOutputFile=-) é copiado para `saida`;
+    as mensagens, inclusive as páginas, chegam pelo stderr (-sstdout=%stderr).
     """
+    _contar_gs()
     popen_kwargs = dict(
-        shell=False, timeout=timeout, cwd=cwd,
+        shell=False, cwd=cwd,
+        stdin=subprocess.DEVNULL if entrada is None else subprocess.PIPE,
         stdout=subprocess.PIPE, stderr=subprocess.PIPE
     )
     if _is_windows():
         popen_kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
     try:
-        proc = subprocess.run(args, check=False, **popen_kwargs)
-        err = (proc.stderr or b"").decode(errors="replace").strip()
-        out = (proc.stdout or b"").decode(errors="replace").strip()
-        if proc.returncode == 0:
-            return True, err
-        msg = f"Ghostscript retornou código {proc.returncode}."
-        if err: msg += f"\n\n[stderr]\n{err}"
-        if out: msg += f"\n\n[stdout]\n{out}"
-        if "undefinedfilename" in err.lower() or "cannot find" in err.lower():
-            msg += "\n\nDica: verifique se algum PDF foi movido/renomeado, se há bloqueio do OneDrive, ou se há caracteres incomuns no nome ORIGINAL."
-        notify.warn(msg)
-        return False, err
-    except subprocess.TimeoutExpired:
-        notify.error(f"Tempo esgotado ({timeout}s) ao executar o Ghostscript.")
-        return False, "timeout"
+        proc = subprocess.Popen(args, **popen_kwargs)
     except Exception as e:
-        notify.error(f"Falha ao executar o Ghostscript: {e}")
+        if avisar:
+            notify.error(f"Falha ao executar o Ghostscript: {e}")
         return False, str(e)
 
-def gs_comprimir_para_pdf(input_files: List[str], output_pdf: str, qualidade: str, notify: Notifier) -> bool:
+    linhas: Queue = Queue()
+    saida_out: List[str] = []
+    saida_err: List[str] = []
+
+    def ler(stream, destino: List[str], encaminhar: bool):
+        for linha in iter(stream.readline, b""):
+            texto = linha.decode(errors="replace").rstrip()
+            destino.append(texto)
+            if encaminhar:
+                linhas.put(texto)
+        stream.close()
+
+    def copiar(stream):
+        for bloco in iter(lambda: stream.read(1024 * 1024), b""):
+            saida.write(bloco)
+        stream.close()
+
+    def alimentar(stream):
+        try:
+            stream.write(entrada)
+        except Exception:
+            pass   # GS saiu antes de ler tudo: o código de saída conta a história
+        try: stream.close()
+        except Exception: pass
+
+    if saida is None:
+        leitores = [threading.Thread(target=ler, args=(proc.stdout, saida_out, True), daemon=True),
+                    threading.Thread(target=ler, args=(proc.stderr, saida_err, False), daemon=True)]
+    else:
+        leitores = [threading.Thread(target=copiar, args=(proc.stdout,), daemon=True),
+                    threading.Thread(target=ler, args=(proc.stderr, saida_err, True), daemon=True)]
+    if entrada is not None:
+        leitores.append(threading.Thread(target=alimentar, args=(proc.stdin,), daemon=True))
+    for t in leitores:
+        t.start()
+
+    paginas = 0
+    def contar(texto: str):
+        nonlocal paginas
+        if _RE_PAGINA_GS.match(texto):
+            paginas += 1
+            if ao_paginar is not None:
+                ao_paginar(paginas)
+
+    limite = time.monotonic() + timeout
+    interrompido = None
+    while proc.poll() is None:
+        if cancel_flag is not None and cancel_flag.is_set():
+            interrompido = "cancelado"
+        elif time.monotonic() > limite:
+            interrompido = "timeout"
+        if interrompido:
+            try:
+                proc.kill()
+            except Exception:
+                pass
+            break
+        try:
+            contar(linhas.get(timeout=0.1))
+        except Empty:
+            pass
+    proc.wait()
+    if not interrompido:   # morto: não espera os leitores (são daemon e param no EOF)
+        for t in leitores:
+            t.join(timeout=2)
+    while not linhas.empty():
+        contar(linhas.get_nowait())
+
+    if interrompido == "cancelado":
+        notify.anotar(codigo_saida="cancelado")
+        return False, "cancelado"
+    if interrompido == "timeout":
+        notify.anotar(codigo_saida="timeout")
+        if avisar:
+            notify.error(f"Tempo esgotado ({timeout}s) ao executar o Ghostscript.")
+        return False, "timeout"
+
+    notify.anotar(codigo_saida=proc.returncode, paginas=paginas)
+    err = "\n".join(l for l in saida_err if not _RE_PAGINA_GS.match(l)).strip()
+    if proc.returncode == 0:
+        return True, err
+    out = "\n".join(l for l in saida_out if not _RE_PAGINA_GS.match(l))[-4000:].strip()
+    msg = f"Ghostscript retornou código {proc.returncode}."
+    if err: msg += f"\n\n[stderr]\n{err}"
+    if out: msg += f"\n\n[stdout]\n{out}"
+    if "undefinedfilename" in err.lower() or "cannot find" in err.lower():
+        msg += "\n\nDica: verifique se algum PDF foi movido/renomeado, se há bloqueio do OneDrive, ou se há caracteres incomuns no nome ORIGINAL."
+    if avisar:
+        notify.warn(msg)
+    return False, err
+
+def _timeout_gs(entradas: int, bytes_entrada: int) -> int:
+    # base + um pouco por arquivo e por MB de entrada (scans grandes demoram), com teto
+    return min(900, max(GS_TIMEOUT_SEC, 90 + 3 * max(1, entradas) + 2 * (bytes_entrada >> 20)))
+
+def _gs_opcoes(qualidade: str, resolucao: Optional[int] = None) -> List[str]:
+    """
+    Opções do pdfwrite usadas em toda compressão (sem executável, saída e entradas).
+    Também compõem a chave do CacheDisco: mudar algo aqui invalida o cache.
+    Com PDF_OBJETOS_COMPACTOS pede PDF 1.5: a partir do GS 10.02 o pdfwrite então agrupa os objetos
+    pequenos em object streams e grava a xref como stream comprimido (versões antigas só mudam o cabeçalho).
+    """
+    resolucao = resolucao or GS_RESOLUCAO_PADRAO
+    return [
+        "-sDEVICE=pdfwrite",
+        "-dCompatibilityLevel=1.5" if PDF_OBJETOS_COMPACTOS else "-dCompatibilityLevel=1.4",
+        f"-dPDFSETTINGS={qualidade}",
+        "-dNOPAUSE",
+        "-dBATCH",
+        "-dDetectDuplicateImages=true",
+        "-dDownsampleColorImages=true",
+        "-dColorImageDownsampleType=/Bicubic",
+        f"-dColorImageResolution={resolucao}",
+        "-dDownsampleGrayImages=true",
+        "-dGrayImageDownsampleType=/Bicubic",
+        f"-dGrayImageResolution={resolucao}",
+        "-dDownsampleMonoImages=true",
+        "-dMonoImageDownsampleType=/Subsample",
+        f"-dMonoImageResolution={resolucao}",
+    ]
+
+# --------- Pool de interpretadores GS persistentes ---------
+
+def _ps_string(texto: str) -> str:
+    """
+    Literal PostScript (…) para um caminho: bytes UTF-8, com escape de \\, ( ) e não-ASCII.
+    """
+    partes = []
+    for b in texto.encode("utf-8"):
+        ch = chr(b)
+        if ch in "\\()":
+            partes.append("\\" + ch)
+        elif 32 <= b < 127:
+            partes.append(ch)
+        else:
+            partes.append(f"\\{b:03o}")
+    return "(" + "".join(partes) + ")"
+
+def _opcoes_para_distiller(opcoes: List[str]) -> Tuple[Optional[str], str]:
+    """
+    Converte as opções de linha de comando do pdfwrite em (PDFSETTINGS, dicionário setdistillerparams).
+    """
+    settings = None
+    itens = []
+    for op in opcoes:
+        if op.startswith("-dPDFSETTINGS="):
+            settings = op.split("=", 1)[1]
+        elif op.startswith("-d") and "=" in op:
+            nome, valor = op[2:].split("=", 1)
+            itens.append(f"/{nome} {valor}")
+        elif op.startswith("-s") and "=" in op and not op.startswith("-sDEVICE=") and not op.startswith("-sOutputFile="):
+            nome, valor = op[2:].split("=", 1)
+            itens.append(f"/{nome} {_ps_string(valor)}")
+    return settings, "<< " + " ".join(itens) + " >>"
+
+def _args_interpretador_gs(gs_path: str, leitura: frozenset, escrita: frozenset,
+                           descarte: Optional[str] = None) -> List[str]:
+    """
+    Linha de comando de um interpretador do pool: SAFER, com leitura liberada só nas pastas das
+    entradas e escrita só nas pastas das saídas (o GS libera sozinho os próprios recursos e temporários),
+    mais o arquivo de descarte do interpretador.
+    Sem "-" no fim: com ele o GS só executa o stdin depois do EOF; sem arquivo nenhum, o executivo
+    interativo roda cada linha assim que ela chega.
+    """
+    permissoes = [f"--permit-file-read={p}/" for p in sorted(leitura)]
+    permissoes += [f"--permit-file-write={p}/" for p in sorted(escrita)]
+    if descarte:
+        permissoes.append(f"--permit-file-write={descarte}")
+    # sem -q: o interpretador de PDF imprime "Page N" a cada página (progresso)
+    return [gs_path, "-dNOPAUSE", "-dNOPROMPT", "-dSAFER"] + permissoes + ["-sDEVICE=nullpage"]
+
+class _InterpretadorGS:
+    """
+    Um processo GS de longa duração lendo PostScript do stdin. Cada job roda entre save/restore,
+    troca o device para pdfwrite com a saída do job, executa os PDFs e responde com uma
+    linha-sentinela no stdout.
+    O pdfwrite fica em cache no interpretador e só fecha o arquivo (trailer e %%EOF) quando recebe
+    outro OutputFile; nulldevice e restore não bastam. Por isso todo job termina apontando o pdfwrite
+    para o arquivo de descarte do interpretador, que é apagado quando ele encerra.
+    Roda com -dSAFER: só lê e grava nas pastas recebidas (ver _args_interpretador_gs); jobs em
+    outras pastas vão para outro interpretador (ver PoolGhostscript._obter).
+    """
+    def __init__(self, gs_path: str, leitura: frozenset = frozenset(), escrita: frozenset = frozenset()):
+        kwargs = dict(stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False)
+        if _is_windows():
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+        self.leitura = leitura
+        self.escrita = escrita
+        fd, self._descarte = tempfile.mkstemp(prefix="gs_pool_", suffix=".pdf")
+        os.close(fd)
+        try:
+            self.proc = subprocess.Popen(_args_interpretador_gs(gs_path, leitura, escrita, self._descarte), **kwargs)
+        except Exception:
+            self._apagar_descarte()
+            raise
+        self._linhas: Queue = Queue()
+        self._stderr: List[str] = []
+        self._seq = itertools.count(1)
+        threading.Thread(target=self._ler_stdout, daemon=True).start()
+        threading.Thread(target=self._ler_stderr, daemon=True).start()
+        # handshake: um GS que não aceita PostScript pelo stdin não chega a responder
+        linha = None
+        try:
+            self.proc.stdin.write(b"(@@PRONTO\\n) print flush\n"); self.proc.stdin.flush()
+            limite = time.monotonic() + GS_POOL_PRONTO_SEC
+            while linha != "@@PRONTO":   # pula o banner
+                linha = self._linhas.get(timeout=max(0.01, limite - time.monotonic()))
+                if linha is None:
+                    break
+        except Exception:
+            linha = None
+        if linha != "@@PRONTO":
+            self.encerrar()
+            raise RuntimeError("Ghostscript não respondeu ao handshake do pool")
+
+    def cobre(self, leitura: frozenset, escrita: frozenset) -> bool:
+        return leitura <= self.leitura and escrita <= self.escrita
+
+    def _ler_stdout(self):
+        for linha in iter(self.proc.stdout.readline, b""):
+            self._linhas.put(linha.decode(errors="replace").rstrip("\r\n"))
+        self._linhas.put(None)   # EOF: o processo morreu
+
+    def _ler_stderr(self):
+        for linha in iter(self.proc.stderr.readline, b""):
+            self._stderr.append(linha.decode(errors="replace").rstrip())
+            del self._stderr[:-50]
+
+    def vivo(self) -> bool:
+        return self.proc.poll() is None
+
+    def _apagar_descarte(self):
+        try:
+            os.remove(self._descarte)
+        except Exception:
+            pass
+
+    def matar(self):
+        try:
+            self.proc.kill()
+            self.proc.wait(timeout=5)
+        except Exception:
+            pass
+        self._apagar_descarte()
+
+    def encerrar(self):
+        try:
+            self.proc.stdin.write(b"quit\n"); self.proc.stdin.close()
+            self.proc.wait(timeout=2)
+        except Exception:
+            pass
+        if self.proc.poll() is None:
+            self.matar()
+        self._apagar_descarte()
+
+    def executar(self, entradas: List[str], saida: str, opcoes: List[str], timeout: int,
+                 cancel_flag: Optional[threading.Event] = None,
+                 ao_paginar: Optional[Callable[[int], None]] = None) -> Optional[Tuple[bool, str]]:
+        """
+        (ok, stderr) do job; None se o interpretador morreu (o chamador deve tentar sem o pool).
+        Cancelar mata o interpretador na hora e retorna (False, "cancelado").
+        """
+        n = next(self._seq)
+        settings, params = _opcoes_para_distiller(opcoes)
+        aplicar_settings = (f"{{ .distillersettings /{settings.lstrip('/')} get setdistillerparams }} stopped pop "
+                            if settings else "")
+        runs = " ".join(f"{_ps_string(_norm(e))} run" for e in entradas)
+        # erro no job: limpa a pilha (sobras de operandos impedem o restore) e deixa só o true;
+        # erro ao fechar a saída também conta como falha
+        job = (f"/_job{n} save def\n"
+               f"{{ << /OutputDevice /pdfwrite /OutputFile {_ps_string(_norm(saida))} >> setpagedevice "
+               f"{aplicar_settings}{params} setdistillerparams {runs} nulldevice }} stopped "
+               f"{{ clear true }} {{ false }} ifelse\n"
+               f"_job{n} restore\n"
+               f"{{ << /OutputDevice /pdfwrite /OutputFile {_ps_string(self._descarte)} >> setpagedevice "
+               f"nulldevice }} stopped {{ clear true }} if\n"
+               f"{{ (\\n@@FIM {n} ERRO\\n) }} {{ (\\n@@FIM {n} OK\\n) }} ifelse print flush\n")
+        self._stderr.clear()
+        try:
+            self.proc.stdin.write(job.encode("ascii"))
+            self.proc.stdin.flush()
+        except Exception:
+            return None
+        limite = time.monotonic() + timeout
+        paginas = 0
+        while True:
+            if cancel_flag is not None and cancel_flag.is_set():
+                self.matar()
+                return False, "cancelado"
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                self.matar()
+                return False, "timeout"
+            try:
+                linha = self._linhas.get(timeout=min(0.1, restante))
+            except Empty:
+                continue
+            if linha is None:
+                return None
+            if linha.startswith(f"@@FIM {n} "):
+                return linha.endswith("OK"), "\n".join(self._stderr)
+            if ao_paginar is not None and _RE_PAGINA_GS.match(linha):
+                paginas += 1
+                ao_paginar(paginas)
+
+class PoolGhostscript:
+    """
+    Pool de interpretadores GS reaproveitados entre chamadas (evita startup + init de fontes).
+    Workers que morrem ou estouram o timeout são descartados e recriados sob demanda.
+    Se o primeiro job não produzir um PDF completo, o pool se desativa e tudo volta ao
+    caminho de um processo por chamada.
+    Quem acha o pool cheio espera na condição até um interpretador ser devolvido ou descartado
+    (ou o pool ser desativado, quando recebe None e roda sem o pool).
+    """
+    def __init__(self, gs_path: str, tamanho: int):
+        self.gs_path = gs_path
+        self.tamanho = max(1, tamanho)
+        self._livres: List[_InterpretadorGS] = []
+        self._criados = 0
+        self._cond = threading.Condition()
+        self.desativado = False
+        self._validado = False
+
+    def _obter(self, leitura: frozenset, escrita: frozenset) -> Optional[_InterpretadorGS]:
+        """
+        Um interpretador livre cujas pastas liberadas cubram as do job; senão cria um novo (no lugar
+        de um livre que não serve, se o pool estiver cheio). None se o pool foi desativado.
+        """
+        while True:
+            w = trocar = None
+            with self._cond:
+                while True:
+                    if self.desativado:
+                        return None
+                    w = next((x for x in self._livres if x.cobre(leitura, escrita)), None)
+                    if w is not None:
+                        self._livres.remove(w)
+                        break
+                    if self._criados < self.tamanho:
+                        self._criados += 1
+                        break
+                    if self._livres:
+                        trocar = self._livres.pop(0)   # o mais antigo cede a vaga
+                        break
+                    self._cond.wait()
+            if trocar is not None:
+                trocar.encerrar()
+            if w is None:
+                try:
+                    return _InterpretadorGS(self.gs_path, leitura, escrita)
+                except Exception:
+                    with self._cond:
+                        self._criados -= 1
+                    self._desativar()
+                    return None
+            if w.vivo():
+                return w
+            self._descartar(w)
+
+    def _devolver(self, w: _InterpretadorGS):
+        with self._cond:
+            if not self.desativado:
+                self._livres.append(w)
+                self._cond.notify_all()
+                return
+        self._descartar(w)
+
+    def _descartar(self, w: _InterpretadorGS):
+        w.encerrar()
+        with self._cond:
+            self._criados -= 1
+            self._cond.notify_all()
+
+    def _desativar(self):
+        with self._cond:
+            self.desativado = True
+            self._cond.notify_all()
+
+    def executar(self, entradas: List[str], saida: str, opcoes: List[str], timeout: int,
+                 cancel_flag: Optional[threading.Event] = None,
+                 ao_paginar: Optional[Callable[[int], None]] = None) -> Optional[Tuple[bool, str]]:
+        if self.desativado:
+            return None
+        leitura = frozenset(_norm(os.path.dirname(_norm(e))) for e in entradas)
+        escrita = frozenset([_norm(os.path.dirname(_norm(saida)))])
+        w = self._obter(leitura, escrita)
+        if w is None:
+            return None
+        res = w.executar(entradas, saida, opcoes, timeout, cancel_flag, ao_paginar)
+        if res is not None and res[1] == "cancelado":
+            self._descartar(w)
+        elif res is None or not w.vivo() or (not res[0] and not self._validado):
+            self._descartar(w)
+            if not self._validado:
+                # o primeiro job não passou pelo pool: desiste dele e o chamador repete sem o pool
+                self._desativar()
+                return None
+        else:
+            if res[0] and not self._validado:
+                # confere se o device realmente fechou o arquivo (versões de GS que não trocam de device)
+                try:
+                    with open(saida, "rb") as f:
+                        f.seek(max(0, os.path.getsize(saida) - 1024))
+                        completo = b"%%EOF" in f.read()
+                except Exception:
+                    completo = False
+                if not completo:
+                    self._desativar()
+                    self._descartar(w)
+                    return None
+                self._validado = True
+            self._devolver(w)
+        if res is not None:
+            _contar_gs()   # None volta ao chamador, que roda (e conta) o GS por processo
+        return res
+
+    def encerrar(self, aguardar: float = 0):
+        """
+        Desativa o pool e fecha os interpretadores livres; os ocupados fecham ao terminar o job.
+        aguardar: segundos esperando também esses saírem (ex.: antes de ler o rusage dos filhos).
+        """
+        with self._cond:
+            self.desativado = True
+            livres, self._livres = self._livres, []
+            self._cond.notify_all()
+        for w in livres:
+            self._descartar(w)
+        limite = time.monotonic() + aguardar
+        with self._cond:
+            while self._criados > 0 and time.monotonic() < limite:
+                self._cond.wait(max(0.01, limite - time.monotonic()))
+
+_pool_gs: Optional[PoolGhostscript] = None
+_pool_gs_lock = threading.Lock()
+
+def _obter_pool_gs(gs_path: str) -> Optional[PoolGhostscript]:
+    global _pool_gs
+    if not GS_POOL_ATIVO:
+        return None
+    with _pool_gs_lock:
+        if _pool_gs is None:
+            _pool_gs = PoolGhostscript(gs_path, MAX_WORKERS_DEFAULT)
+            atexit.register(_pool_gs.encerrar)
+        return None if _pool_gs.desativado else _pool_gs
+
+def gs_comprimir_para_pdf(input_files: List[str], output_pdf: str, qualidade: str, notify: Notifier,
+                          stage: Optional[AreaStaging] = None, resolucao: Optional[int] = None,
+                          cancel_flag: Optional[threading.Event] = None,
+                          ao_paginar: Optional[Callable[[int], None]] = None) -> bool:
     """
     Integração robusta:
-    - staging com nomes ASCII e cwd no stage
-    - response file com basenames
+    - staging com nomes ASCII (só quando o caminho exige) e cwd no stage
+    - response file com basenames/caminhos ASCII
     - se falhar com múltiplos, testa arquivos 1 a 1 (GS) para isolar e excluir problemáticos
+    Passe a AreaStaging do job em `stage` para reaproveitar o diretório entre chamadas.
+    Usa o PoolGhostscript quando disponível; senão, um processo GS por chamada.
+    cancel_flag mata o GS em andamento (a saída parcial é apagada); ao_paginar(n) recebe as
+    páginas já iniciadas pela chamada principal (não pelas de isolamento).
     """
     gs_path = _encontrar_ghostscript()
     if not gs_path:
@@ -140,41 +1073,56 @@ def gs_comprimir_para_pdf(input_files: List[str], output_pdf: str, qualidade: st
     out_norm = _norm(output_pdf)
     os.makedirs(os.path.dirname(out_norm) or ".", exist_ok=True)
 
-    dyn_timeout = min(900, max(GS_TIMEOUT_SEC, 90 + 3 * max(1, len(input_files))))
+    dyn_timeout = _timeout_gs(len(input_files), sum(_tamanho(p) for p in input_files))
 
     # 1) STAGING
+    stage_proprio = stage is None
     try:
-        stage_dir, staged_files = _stage_inputs_for_gs(input_files)
+        if stage_proprio:
+            stage = AreaStaging()
+        with notify.span("staging", arquivos=len(input_files)):
+            staged_files = stage.preparar(input_files)
     except Exception as e:
         notify.error(str(e))
+        if stage_proprio and stage is not None:
+            stage.fechar()
         return False
+    originais = dict(zip(staged_files, input_files))
+
+    def _call_gs_with_list(files_in_stage: List[str], out_path: str,
+                           paginar: Optional[Callable[[int], None]] = None) -> Tuple[bool, str]:
+        absolutos = [p if os.path.isabs(p) else os.path.join(stage.dir, p) for p in files_in_stage]
+        with notify.span("gs", entradas=len(absolutos), qualidade=qualidade, resolucao=resolucao,
+                         bytes_in=sum(_tamanho(p) for p in absolutos)) as sp:
+            ok, err = _executar_gs(files_in_stage, absolutos, out_path, paginar)
+            if err == "cancelado":
+                try: os.remove(out_path)
+                except Exception: pass
+            sp["ok"] = ok
+            sp["bytes_out"] = _tamanho(out_path) if ok else 0
+            return ok, err
 
-    def _call_gs_with_list(files_in_stage: List[str], out_path: str) -> Tuple[bool, str]:
-        listfile = _write_gs_listfile_basename(files_in_stage, stage_dir)
-        args = [
-            gs_path,
-            "-sDEVICE=pdfwrite",
-            "-dCompatibilityLevel=1.4",
-            f"-dPDFSETTINGS={qualidade}",
-            "-dNOPAUSE",
-            "-dBATCH",
-            "-dQUIET",
-            "-dDetectDuplicateImages=true",
-            "-dDownsampleColorImages=true",
-            "-dColorImageDownsampleType=/Bicubic",
-            "-dColorImageResolution=110",
-            "-dDownsampleGrayImages=true",
-            "-dGrayImageDownsampleType=/Bicubic",
-            "-dGrayImageResolution=110",
-            "-dDownsampleMonoImages=true",
-            "-dMonoImageDownsampleType=/Subsample",
-            "-dMonoImageResolution=110",
+    def _executar_gs(files_in_stage: List[str], absolutos: List[str], out_path: str,
+                     paginar: Optional[Callable[[int], None]]) -> Tuple[bool, str]:
+        pool = _obter_pool_gs(gs_path)
+        if pool is not None:
+            res = pool.executar(absolutos, out_path, _gs_opcoes(qualidade, resolucao), dyn_timeout,
+                                cancel_flag=cancel_flag, ao_paginar=paginar)
+            if res is not None:
+                ok, err = res
+                notify.anotar(pool=True, codigo_saida=0 if ok else (err if err in ("timeout", "cancelado") else "erro"))
+                if not ok and err != "cancelado":
+                    notify.warn(f"Ghostscript (pool) falhou em {len(files_in_stage)} arquivo(s)." + (f"\n\n[stderr]\n{err}" if err else ""))
+                return ok and os.path.isfile(out_path), err
+        listfile = _write_gs_listfile_basename(files_in_stage, stage)
+        args = [gs_path] + _gs_opcoes(qualidade, resolucao) + [
             f"-sOutputFile={_norm(out_path)}",
             "-f",
             f"@{os.path.basename(listfile)}",
         ]
         try:
-            ok, err = _run_gs(args, timeout=dyn_timeout, cwd=stage_dir, notify=notify)
+            ok, err = _run_gs(args, timeout=dyn_timeout, cwd=stage.dir, notify=notify,
+                              cancel_flag=cancel_flag, ao_paginar=paginar)
             return ok and os.path.isfile(out_path), err
         finally:
             try: os.remove(listfile)
@@ -182,9 +1130,11 @@ def gs_comprimir_para_pdf(input_files: List[str], output_pdf: str, qualidade: st
 
     try:
         # 2) Tenta direto com todos
-        ok, err = _call_gs_with_list(staged_files, out_norm)
+        ok, err = _call_gs_with_list(staged_files, out_norm, ao_paginar)
         if ok:
             return True
+        if err == "cancelado" or (cancel_flag is not None and cancel_flag.is_set()):
+            return False
 
         # 3) Se falhou e havia múltiplos arquivos, isola culpados SEM usar PyPDF2
         if len(staged_files) > 1:
@@ -192,7 +1142,9 @@ def gs_comprimir_para_pdf(input_files: List[str], output_pdf: str, qualidade: st
             bons: List[str] = []
             ruins: List[str] = []
             for p in staged_files:
-                tmp_out = os.path.join(stage_dir, f"test_{os.path.basename(p)}")
+                if cancel_flag is not None and cancel_flag.is_set():
+                    return False
+                tmp_out = stage.novo_caminho("test_", ".pdf")
                 ok_one, _ = _call_gs_with_list([p], tmp_out)
                 try:
                     if os.path.exists(tmp_out):
@@ -202,7 +1154,7 @@ def gs_comprimir_para_pdf(input_files: List[str], output_pdf: str, qualidade: st
                 (bons if ok_one else ruins).append(p)
 
             if ruins:
-                base_names = [os.path.basename(x) for x in ruins]
+                base_names = [os.path.basename(originais.get(x, x)) for x in ruins]
                 notify.warn("Alguns PDFs estão corrompidos/incompatíveis e foram ignorados nesta etapa:\n\n" +
                             "\n".join(base_names))
 
@@ -215,14 +1167,36 @@ def gs_comprimir_para_pdf(input_files: List[str], output_pdf: str, qualidade: st
         return False
 
     finally:
-        # limpeza do stage
-        try:
-            for name in os.listdir(stage_dir):
-                try: os.remove(os.path.join(stage_dir, name))
-                except Exception: pass
-            os.rmdir(stage_dir)
-        except Exception:
-            pass
+        # limpeza do stage (só quando foi criado aqui; o do job é fechado pelo dono)
+        if stage_proprio:
+            stage.fechar()
+
+def gs_comprimir_em_memoria(dados: bytes, qualidade: str, notify: Notifier, resolucao: Optional[int] = None,
+                            cancel_flag: Optional[threading.Event] = None,
+                            ao_paginar: Optional[Callable[[int], None]] = None,
+                            erros: Optional[List[str]] = None) -> Optional[bytes]:
+    """
+    Comprime um PDF inteiro por pipes: entra pelo stdin, sai pelo stdout para um buffer.
+    Sem staging, response file nem arquivo de saída: o tamanho é len() do resultado e quem
+    chama só grava o que for ficar. None se o GS falhar (quem chama cai para os arquivos);
+    a falha não vai ao notify, só para `erros` (para reportar se a alternativa também falhar).
+    """
+    gs_path = _encontrar_ghostscript()
+    if not gs_path:
+        return None
+    buf = io.BytesIO()
+    args = [gs_path] + _gs_opcoes(qualidade, resolucao) + ["-sstdout=%stderr", "-sOutputFile=-", "-"]
+    with notify.span("gs", entradas=1, pipe=True, qualidade=qualidade, resolucao=resolucao, bytes_in=len(dados)) as sp:
+        ok, err = _run_gs(args, timeout=_timeout_gs(1, len(dados)), cwd=None, notify=notify,
+                          cancel_flag=cancel_flag, ao_paginar=ao_paginar, entrada=dados, saida=buf, avisar=False)
+        resultado = buf.getvalue()
+        if ok and not resultado.startswith(b"%PDF"):
+            ok, err = False, "a saída não é um PDF"
+        if not ok and erros is not None and err != "cancelado":
+            erros.append(err)
+        sp["ok"] = ok
+        sp["bytes_out"] = len(resultado) if ok else 0
+        return resultado if ok else None
 
 # ===================== Remoção de páginas em branco =====================
 
@@ -250,265 +1224,2556 @@ def _page_has_xobject_or_annots(page) -> bool:
         return True
     return False
 
-def is_page_blank_fast(page) -> bool:
-    if _page_has_xobject_or_annots(page):
-        return False
+def is_page_blank_fast(page) -> bool:
+    if _page_has_xobject_or_annots(page):
+        return False
+    try:
+        contents = page.get_contents()
+        if contents is None:
+            return True
+        if isinstance(contents, list):
+            data = b"".join([c.get_data() for c in contents if hasattr(c, "get_data")])
+        else:
+            data = contents.get_data()
+        return len(data.strip()) == 0
+    except Exception:
+        return False
+
+def _bytes_brutos(obj) -> bytes:
+    try:
+        return obj.get_object()._data or b""
+    except Exception:
+        return b""
+
+def _imagens_da_pagina(page) -> List:
+    imagens = []
+    try:
+        xobj = page["/Resources"].get_object().get("/XObject")
+        for v in (xobj.get_object().values() if xobj else []):
+            o = v.get_object()
+            if o.get("/Subtype") == "/Image":
+                imagens.append(o)
+    except Exception:
+        pass
+    return imagens
+
+_CHAVES_HASH_PAGINA = ("/MediaBox", "/CropBox", "/Rotate", "/UserUnit", "/Contents", "/Resources", "/Annots", "/Group")
+
+def _hash_conteudo_pagina(page, hasher: Optional["_HashEstrutural"] = None) -> str:
+    """
+    Hash do que aparece na página: streams de conteúdo, /Resources resolvido por inteiro (Form
+    XObjects e as imagens/fontes dentro deles, fontes, padrões...), anotações, caixa e rotação.
+    Passe o mesmo hasher para as páginas de um reader e os recursos comuns são lidos uma vez só.
+    Recursos cíclicos ou fundos demais levantam ValueError: a página fica fora da comparação.
+    """
+    hasher = hasher or _HashEstrutural()
+    h = hashlib.sha256()
+    for k in _CHAVES_HASH_PAGINA:
+        v = page.get(k)
+        if v is None:
+            continue
+        d = hasher.de_objeto(v)
+        if d is None:
+            raise ValueError(f"{k} sem hash estrutural")
+        h.update(k.encode("ascii") + d)
+    return h.hexdigest()
+
+def _tamanho_conteudo(page) -> int:
+    conteudo = page.get("/Contents")
+    if conteudo is None:
+        return 0
+    conteudo = conteudo.get_object()
+    return sum(len(_bytes_brutos(c)) for c in (conteudo if isinstance(conteudo, ArrayObject) else [conteudo]))
+
+def _pontuar_tinta(pixels) -> float:
+    """
+    Fração de blocos 3x3 com tinta, ignorando as margens. Tinta = pixel bem mais escuro que o
+    tom do papel (percentil 95), e um bloco só conta com 2+ pixels de tinta (descarta poeira/ruído).
+    Fundo escuro demais para ser papel conta como página toda coberta.
+    """
+    a = np.asarray(pixels, dtype=np.int16)
+    h, w = a.shape
+    mh, mw = int(h * BRANCO_MARGEM), int(w * BRANCO_MARGEM)
+    miolo = a[mh:h - mh, mw:w - mw]
+    if miolo.size == 0:
+        return 0.0
+    papel = np.percentile(miolo, 95)
+    if papel < 2 * BRANCO_CONTRASTE:
+        return 1.0   # fundo escuro (foto, página toda impressa): não é papel em branco
+    tinta = miolo < (papel - BRANCO_CONTRASTE)
+    bh, bw = tinta.shape[0] // 3, tinta.shape[1] // 3
+    if bh == 0 or bw == 0:
+        return float(tinta.mean())
+    blocos = tinta[:bh * 3, :bw * 3].reshape(bh, 3, bw, 3).sum(axis=(1, 3))
+    return float((blocos >= 2).mean())
+
+def _renderizar_paginas(entrada_pdf: str, paginas: List[int], dpi: int, avaliar: Callable, notify: Notifier,
+                        max_workers: Optional[int] = None) -> Dict[int, object]:
+    """
+    Renderiza as páginas (índices 0-based) em tons de cinza a `dpi`, em grupos paralelos de GS,
+    e devolve {índice: avaliar(imagem PIL em "L")}. Sem GS ou Pillow devolve {}.
+    """
+    gs_path = _encontrar_ghostscript()
+    if not gs_path or Image is None or not paginas:
+        return {}
+    workers = max_workers or MAX_WORKERS_DEFAULT
+    grupos = [paginas[k::workers] for k in range(min(workers, len(paginas)))]
+    resultado: Dict[int, object] = {}
+
+    with AreaStaging() as stage:
+        entrada = stage.preparar([entrada_pdf])[0]
+
+        def renderizar_grupo(grupo: List[int]) -> Dict[int, object]:
+            saida_dir = stage.novo_diretorio("render_")
+            args = [gs_path, "-q", "-dNOPAUSE", "-dBATCH", "-dSAFER", "-sDEVICE=pgmraw", f"-r{dpi}",
+                    "-sPageList=" + ",".join(str(j + 1) for j in grupo),
+                    f"-sOutputFile={_norm(saida_dir)}/p_%05d.pgm", "-f", _norm(entrada)]
+            ok, _ = _run_gs(args, timeout=GS_TIMEOUT_SEC, cwd=stage.dir, notify=notify)
+            parcial = {}
+            if ok:
+                for n, j in enumerate(grupo, start=1):
+                    try:
+                        with Image.open(os.path.join(saida_dir, f"p_{n:05d}.pgm")) as img:
+                            parcial[j] = avaliar(img.convert("L"))
+                    except Exception:
+                        pass
+            stage.liberar(saida_dir)
+            return parcial
+
+        with ThreadPoolExecutor(max_workers=len(grupos)) as ex:
+            for parcial in ex.map(renderizar_grupo, grupos):
+                resultado.update(parcial)
+    return resultado
+
+class DetectorBrancos:
+    """
+    Detecta páginas em branco de verdade, inclusive escaneadas: renderiza as candidatas em baixa
+    resolução (GS, em paralelo) e mede a cobertura de tinta com NumPy.
+    O veredito fica em cache por hash do conteúdo da página (em memória e em disco).
+    Sem NumPy ou Ghostscript, só a checagem estrutural (is_page_blank_fast) é aplicada.
+    """
+    def __init__(self, arquivo_cache: Optional[str] = None, max_workers: Optional[int] = None):
+        self.arquivo_cache = arquivo_cache or os.path.join(_pasta_dados_app(), "brancos.json")
+        self.max_workers = max_workers or MAX_WORKERS_DEFAULT
+        self._assinatura = f"{BRANCO_DPI}|{BRANCO_MARGEM}|{BRANCO_CONTRASTE}|{BRANCO_LIMIAR_TINTA}"
+        self._lock = threading.Lock()
+        self._cache: Dict[str, bool] = {}
+        self._alterado = False
+        try:
+            with open(self.arquivo_cache, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+            if dados.get("assinatura") == self._assinatura:
+                self._cache = dict(dados.get("paginas", {}))
+        except Exception:
+            pass
+
+    def salvar(self):
+        with self._lock:
+            if not self._alterado:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.arquivo_cache), exist_ok=True)
+                tmp = f"{self.arquivo_cache}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump({"assinatura": self._assinatura, "paginas": self._cache}, f)
+                os.replace(tmp, self.arquivo_cache)
+                self._alterado = False
+            except Exception:
+                pass
+
+    def _renderizar(self, entrada_pdf: str, paginas: List[int], notify: Notifier) -> Dict[int, float]:
+        """
+        Renderiza as páginas (índices 0-based) e devolve {índice: cobertura de tinta}.
+        """
+        return _renderizar_paginas(entrada_pdf, paginas, BRANCO_DPI, _pontuar_tinta, notify, self.max_workers)
+
+    def paginas_em_branco(self, entrada_pdf: str, reader: PdfReader, notify: Optional[Notifier] = None) -> List[bool]:
+        notify = notify or Notifier(Queue())
+        brancos: List[bool] = []
+        pendentes: Dict[int, str] = {}
+        hasher = _HashEstrutural()
+        for j, p in enumerate(reader.pages):
+            if is_page_blank_fast(p):
+                brancos.append(True)
+                continue
+            brancos.append(False)
+            if np is None:
+                continue
+            try:
+                if p.get("/Annots") or (not _imagens_da_pagina(p) and _tamanho_conteudo(p) > BRANCO_CONTEUDO_MAX):
+                    continue   # anotações ou texto de verdade: não é branca, não precisa renderizar
+                chave = _hash_conteudo_pagina(p, hasher)
+            except Exception:
+                continue
+            with self._lock:
+                conhecido = self._cache.get(chave)
+            if conhecido is None:
+                pendentes[j] = chave
+            else:
+                brancos[j] = conhecido
+
+        if pendentes:
+            cobertura = self._renderizar(entrada_pdf, sorted(pendentes), notify)
+            with self._lock:
+                for j, tinta in cobertura.items():
+                    veredito = tinta < BRANCO_LIMIAR_TINTA
+                    self._cache[pendentes[j]] = veredito
+                    brancos[j] = veredito
+                    self._alterado = True
+            self.salvar()
+        return brancos
+
+_detector_padrao: Optional[DetectorBrancos] = None
+_detector_padrao_lock = threading.Lock()
+
+def _obter_detector_brancos() -> DetectorBrancos:
+    global _detector_padrao
+    with _detector_padrao_lock:
+        if _detector_padrao is None:
+            _detector_padrao = DetectorBrancos()
+        return _detector_padrao
+
+def limpar_brancos_para_arquivo(entrada_pdf: str, detector: Optional[DetectorBrancos] = None,
+                                notify: Optional[Notifier] = None, area: Optional[AreaTrabalho] = None) -> str:
+    """
+    Devolve entrada_pdf sem as páginas em branco (na área de trabalho do job, se houver)
+    ou o próprio entrada_pdf quando não há o que tirar.
+    """
+    try:
+        reader = PdfReader(entrada_pdf)
+        brancos = (detector or _obter_detector_brancos()).paginas_em_branco(entrada_pdf, reader, notify)
+    except Exception:
+        return entrada_pdf
+
+    writer = PdfWriter()
+    removidos = 0
+    for p, branca in zip(reader.pages, brancos):
+        if branca:
+            removidos += 1
+            continue
+        writer.add_page(p)
+
+    if notify is not None:
+        notify.anotar(paginas=len(brancos), removidas=removidos)
+    if removidos == 0 or removidos == len(brancos):
+        return entrada_pdf
+
+    if area is not None:
+        tmp_out = area.novo_caminho("limpo_", ".pdf", _tamanho(entrada_pdf))
+    else:
+        fd, tmp_out = tempfile.mkstemp(prefix="temp_clean_", suffix=".pdf")
+        os.close(fd)
+    with open(tmp_out, "wb") as f:
+        writer.write(f)
+    return tmp_out
+
+# ===================== Páginas e documentos duplicados =====================
+
+def _dhash(img) -> str:
+    """
+    Hash perceptual (dHash 16x16 = 256 bits, em hex): compara vizinhos numa miniatura 17x16.
+    Sobrevive a recompressão, pequena diferença de brilho e de resolução de um rescan.
+    Página lisa (sem contraste) não tem assinatura: devolve "" e fica fora da comparação.
+    """
+    mini = list(img.resize((17, 16), Image.BILINEAR).getdata())
+    if max(mini) - min(mini) < 8:
+        return ""
+    bits = 0
+    for y in range(16):
+        linha = mini[y * 17:(y + 1) * 17]
+        for x in range(16):
+            bits = (bits << 1) | (linha[x + 1] > linha[x])
+    return f"{bits:064x}"
+
+def _distancia_hash(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+def _proporcao_pagina(page) -> float:
+    try:
+        w, h = float(page.mediabox.width), float(page.mediabox.height)
+        if int(page.get("/Rotate", 0) or 0) % 180:
+            w, h = h, w
+        return round(w / h, 2)
+    except Exception:
+        return 0.0
+
+class DetectorDuplicatas:
+    """
+    Acha páginas repetidas no conjunto, na ordem: a primeira ocorrência fica, as seguintes são
+    duplicatas dela.
+    - exata: mesmo conteúdo (streams e recursos inteiros byte a byte, caixa e rotação; ver _hash_conteudo_pagina)
+    - similar: só páginas com imagem (scans/fotos); dHash da renderização em baixa resolução a no
+      máximo DUPLICATA_DISTANCIA_MAX bits, com a mesma proporção. Páginas só de texto nunca são
+      "similares" (formulários iguais com nomes diferentes ficariam parecidos demais).
+    Os dHash ficam em cache por hash do conteúdo (em disco, como o DetectorBrancos).
+    """
+    def __init__(self, arquivo_cache: Optional[str] = None, max_workers: Optional[int] = None):
+        self.arquivo_cache = arquivo_cache or os.path.join(_pasta_dados_app(), "duplicatas.json")
+        self.max_workers = max_workers or MAX_WORKERS_DEFAULT
+        self._assinatura = f"dhash16|{DUPLICATA_DPI}"
+        self._lock = threading.Lock()
+        self._cache: Dict[str, str] = {}
+        self._alterado = False
+        try:
+            with open(self.arquivo_cache, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+            if dados.get("assinatura") == self._assinatura:
+                self._cache = dict(dados.get("paginas", {}))
+        except Exception:
+            pass
+
+    def salvar(self):
+        with self._lock:
+            if not self._alterado:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.arquivo_cache), exist_ok=True)
+                tmp = f"{self.arquivo_cache}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump({"assinatura": self._assinatura, "paginas": self._cache}, f)
+                os.replace(tmp, self.arquivo_cache)
+                self._alterado = False
+            except Exception:
+                pass
+
+    def _hashes_perceptuais(self, arquivo: str, pendentes: Dict[int, str], notify: Notifier) -> Dict[int, str]:
+        resultado: Dict[int, str] = {}
+        faltam = []
+        with self._lock:
+            for j, chave in pendentes.items():
+                if chave in self._cache:
+                    resultado[j] = self._cache[chave]
+                else:
+                    faltam.append(j)
+        if faltam:
+            novos = _renderizar_paginas(arquivo, sorted(faltam), DUPLICATA_DPI, _dhash, notify, self.max_workers)
+            with self._lock:
+                for j, h in novos.items():
+                    self._cache[pendentes[j]] = h
+                    self._alterado = True
+            resultado.update(novos)
+        return resultado
+
+    def encontrar(self, arquivos: List[str], similares: bool, notify: Notifier) -> List[Dict]:
+        """
+        Lista de duplicatas: {"doc", "arquivo", "pagina", "doc_original", "original", "pagina_original", "tipo"}
+        (doc = posição do arquivo na lista, o mesmo arquivo pode vir duas vezes; páginas 1-based;
+        tipo "exata" ou "similar").
+        """
+        vistos: Dict[str, Tuple[int, int]] = {}
+        perceptuais: List[Tuple[str, float, int, int]] = []   # (dhash, proporção, doc, página)
+        achadas: List[Dict] = []
+
+        def _achada(doc, j, doc_orig, j_orig, tipo):
+            achadas.append({"doc": doc, "arquivo": arquivos[doc], "pagina": j + 1, "doc_original": doc_orig,
+                            "original": arquivos[doc_orig], "pagina_original": j_orig + 1, "tipo": tipo})
+
+        for doc, arquivo in enumerate(arquivos):
+            notify.subtext(f"Procurando duplicatas: {os.path.basename(arquivo)}")
+            try:
+                reader = PdfReader(arquivo)
+                paginas = list(reader.pages)
+            except Exception:
+                continue
+            candidatas: Dict[int, str] = {}
+            proporcoes: Dict[int, float] = {}
+            hasher = _HashEstrutural()
+            for j, page in enumerate(paginas):
+                try:
+                    chave = _hash_conteudo_pagina(page, hasher)
+                except Exception:
+                    continue
+                if chave in vistos:
+                    _achada(doc, j, *vistos[chave], "exata")
+                    continue
+                vistos[chave] = (doc, j)
+                if similares and _imagens_da_pagina(page) and not is_page_blank_fast(page):
+                    candidatas[j] = chave
+                    proporcoes[j] = _proporcao_pagina(page)
+            if not candidatas:
+                continue
+            hashes = self._hashes_perceptuais(arquivo, candidatas, notify)
+            for j in sorted(hashes):
+                h = hashes[j]
+                if not h:
+                    continue
+                igual = next((p for p in perceptuais
+                              if p[1] == proporcoes[j] and _distancia_hash(p[0], h) <= DUPLICATA_DISTANCIA_MAX), None)
+                if igual is not None:
+                    _achada(doc, j, igual[2], igual[3], "similar")
+                else:
+                    perceptuais.append((h, proporcoes[j], doc, j))
+        self.salvar()
+        return achadas
+
+def _texto_relatorio_duplicatas(achadas: List[Dict], removidas: bool, paginas_por_doc: Dict[int, int]) -> str:
+    """
+    Resumo legível: documentos inteiros repetidos numa linha só, páginas avulsas uma por linha.
+    """
+    por_doc: Dict[int, List[Dict]] = {}
+    for d in achadas:
+        por_doc.setdefault(d["doc"], []).append(d)
+    verbo = "removida(s)" if removidas else "encontrada(s)"
+    linhas = [f"{len(achadas)} página(s) duplicada(s) {verbo}:"]
+    for doc, itens in por_doc.items():
+        nome = os.path.basename(itens[0]["arquivo"])
+        origens = {d["doc_original"] for d in itens}
+        if len(itens) == paginas_por_doc.get(doc) and len(origens) == 1:
+            linhas.append(f"- {nome}: documento inteiro repete {os.path.basename(itens[0]['original'])}")
+            continue
+        for d in itens:
+            linhas.append(f"- {nome} p.{d['pagina']} = {os.path.basename(d['original'])} p.{d['pagina_original']}"
+                          + (" (similar)" if d["tipo"] == "similar" else ""))
+    if len(linhas) > 25:
+        linhas = linhas[:24] + [f"… e mais {len(linhas) - 24} linha(s) no relatório"]
+    return "\n".join(linhas)
+
+def deduplicar_arquivos(arquivos: List[str], modo: str, notify: Notifier,
+                        relatorio_json: Optional[str] = None, area: Optional[AreaTrabalho] = None) -> List[str]:
+    """
+    Etapa opcional antes da compressão (modo em DUPLICATAS_MODOS):
+    relatar = só informa (exatas e similares); remover = tira as exatas; remover_similares = tira as duas.
+    Devolve a nova lista de entradas (arquivos sem páginas restantes saem da lista; os alterados
+    viram temporários, na área de trabalho se houver). Com relatorio_json, grava lá a lista completa do que foi achado/removido.
+    """
+    if modo not in DUPLICATAS_MODOS or modo == "desligado":
+        return list(arquivos)
+    with notify.span("duplicatas", modo=modo, arquivos=len(arquivos)) as sp:
+        achadas = DetectorDuplicatas().encontrar(arquivos, similares=modo != "remover", notify=notify)
+        if modo == "remover":
+            achadas = [d for d in achadas if d["tipo"] == "exata"]
+        sp["duplicatas"] = len(achadas)
+        if not achadas:
+            return list(arquivos)
+
+        remover = modo != "relatar"
+        paginas_por_doc = {}
+        for doc, a in enumerate(arquivos):
+            try:
+                paginas_por_doc[doc] = len(PdfReader(a).pages)
+            except Exception:
+                pass
+        notify.info(_texto_relatorio_duplicatas(achadas, remover, paginas_por_doc))
+        if relatorio_json:
+            try:
+                with open(relatorio_json, "w", encoding="utf-8") as f:
+                    json.dump({"modo": modo, "removidas": remover, "duplicatas": achadas}, f, ensure_ascii=False, indent=2)
+            except Exception as e:
+                notify.warn(f"Falha ao gravar relatório de duplicatas: {e}")
+        if not remover:
+            return list(arquivos)
+
+        tirar: Dict[int, set] = {}
+        for d in achadas:
+            tirar.setdefault(d["doc"], set()).add(d["pagina"] - 1)
+        saida: List[str] = []
+        for n, arquivo in enumerate(arquivos):
+            indices = tirar.get(n)
+            if not indices:
+                saida.append(arquivo)
+                continue
+            reader = PdfReader(arquivo)
+            writer = PdfWriter()
+            for j, page in enumerate(reader.pages):
+                if j not in indices:
+                    writer.add_page(page)
+            if len(writer.pages) == 0:
+                continue   # documento inteiro repetido
+            if area is not None:
+                tmp_out = area.novo_caminho("dedup_", ".pdf", _tamanho(arquivo))
+            else:
+                fd, tmp_out = tempfile.mkstemp(prefix="temp_dedup_", suffix=".pdf")
+                os.close(fd)
+            with open(tmp_out, "wb") as f:
+                writer.write(f)
+            saida.append(tmp_out)
+        sp["paginas_removidas"] = len(achadas)
+        return saida
+
+# ===================== União em streaming (memória limitada) =====================
+
+class _HashEstrutural:
+    """
+    Hash de conteúdo de objetos indiretos de um PdfReader: streams pelo dado bruto e pelo dicionário,
+    referências pelo hash do alvo (recursivo, com memo). Duas fontes/imagens/recursos com o mesmo
+    hash são intercambiáveis no destino, venham do mesmo arquivo ou de arquivos diferentes.
+    paginas: referência de página -> número no destino (as demais páginas viram null, como em _copiar).
+    Ciclos e cadeias muito fundas devolvem None (o objeto simplesmente não é deduplicado).
+    """
+    _PROFUNDIDADE_MAX = 40
+
+    def __init__(self, paginas: Optional[Dict[Tuple[int, int], int]] = None):
+        self.paginas = paginas or {}
+        self._memo: Dict[Tuple[int, int], Optional[bytes]] = {}
+        self._em_curso: set = set()
+
+    def de_ref(self, ref: IndirectObject, prof: int = 0) -> Optional[bytes]:
+        chave = (ref.idnum, ref.generation)
+        if chave in self._memo:
+            return self._memo[chave]
+        if chave in self.paginas:
+            return b"P%d" % self.paginas[chave]
+        if chave in self._em_curso or prof > self._PROFUNDIDADE_MAX:
+            return None
+        try:
+            obj = ref.get_object()
+        except Exception:
+            return None
+        if isinstance(obj, DictionaryObject) and obj.get("/Type") in ("/Page", "/Pages"):
+            return b"N"
+        self._em_curso.add(chave)
+        try:
+            d = self._digest(obj, prof)
+        finally:
+            self._em_curso.discard(chave)
+        self._memo[chave] = d
+        return d
+
+    def de_objeto(self, obj) -> Optional[bytes]:
+        return self._digest(obj, 0)
+
+    def _digest(self, obj, prof: int) -> Optional[bytes]:
+        h = hashlib.sha1()
+        if isinstance(obj, IndirectObject):
+            d = self.de_ref(obj, prof + 1)
+            if d is None:
+                return None
+            h.update(b"R" + d)
+        elif isinstance(obj, (StreamObject, DictionaryObject)):
+            if isinstance(obj, StreamObject):
+                h.update(b"S%d:" % len(obj._data or b"")); h.update(obj._data or b"")
+            h.update(b"D")
+            for k, v in sorted(obj.items()):
+                if k == "/Length":
+                    continue
+                d = self._digest(v, prof)
+                if d is None:
+                    return None
+                h.update(k.encode("utf-8", "replace") + d)
+        elif isinstance(obj, ArrayObject):
+            h.update(b"A")
+            for v in obj:
+                d = self._digest(v, prof)
+                if d is None:
+                    return None
+                h.update(d)
+        else:
+            h.update(f"{type(obj).__name__}:{obj!r}".encode("utf-8", "replace"))
+        return h.digest()
+
+def _recursos_compartilhaveis(pdf_path: str) -> Dict[bytes, int]:
+    """
+    hash -> bytes de cada stream deduplicável (≥ UNIAO_DEDUP_MIN_BYTES) alcançável pelas páginas:
+    o que a UniaoStreaming deixaria de gravar se outro arquivo da mesma parte tiver o mesmo recurso.
+    """
+    try:
+        return {d: n for d, (_, _, n) in _mapear_recursos(PdfReader(pdf_path)).items()}
+    except Exception:
+        return {}
+
+def _mapear_recursos(reader: PdfReader) -> Dict[bytes, Tuple[int, int, int]]:
+    """
+    hash -> (número do objeto, geração, bytes) dos streams deduplicáveis alcançáveis pelas páginas.
+    """
+    recursos: Dict[bytes, Tuple[int, int, int]] = {}
+    try:
+        hasher = _HashEstrutural()
+        vistos = set()
+        pilha = [v for page in reader.pages for k, v in page.items() if k not in _CHAVES_NAO_SEGUIR]
+        while pilha:
+            obj = pilha.pop()
+            if isinstance(obj, IndirectObject):
+                chave = (obj.idnum, obj.generation)
+                if chave in vistos:
+                    continue
+                vistos.add(chave)
+                alvo = obj.get_object()
+                if isinstance(alvo, StreamObject) and len(alvo._data or b"") >= UNIAO_DEDUP_MIN_BYTES:
+                    d = hasher.de_ref(obj)
+                    if d is not None:
+                        recursos.setdefault(d, (obj.idnum, obj.generation, len(alvo._data)))
+                obj = alvo
+            if isinstance(obj, DictionaryObject):
+                if obj.get("/Type") in ("/Page", "/Pages"):
+                    continue
+                pilha.extend(v for k, v in obj.items() if k not in _CHAVES_NAO_SEGUIR)
+            elif isinstance(obj, ArrayObject):
+                pilha.extend(obj)
+    except Exception:
+        pass
+    return recursos
+
+class UniaoStreaming:
+    """
+    União sem recompressão com memória limitada: cada objeto é copiado e gravado no destino
+    assim que é alcançado, e o PdfReader de cada origem é descartado quando suas páginas
+    terminam. Em memória ficam só os offsets da xref e os números das páginas (alguns bytes
+    por objeto) — o pico fica ~constante em relação ao total de páginas, limitado pelo
+    maior objeto isolado e por STREAMING_CACHE_OBJETOS objetos resolvidos da origem atual.
+
+    compacto (padrão PDF_OBJETOS_COMPACTOS): objetos que não são stream vão, de OBJSTM_OBJETOS em
+    OBJSTM_OBJETOS, para object streams comprimidos, e a xref sai como stream (PDF 1.5). Em
+    documentos de muitas páginas de texto isso corta boa parte do overhead por objeto.
+
+    deduplicar (padrão UNIAO_DEDUP_RECURSOS): streams ≥ UNIAO_DEDUP_MIN_BYTES com o mesmo hash
+    estrutural (fontes, imagens, timbres, perfis ICC de cada documento comprimido à parte) são
+    gravados uma vez só e todas as páginas apontam para essa cópia. Custa ~40 bytes por recurso.
+    """
+    def __init__(self, destino: BinaryIO, compacto: Optional[bool] = None, deduplicar: Optional[bool] = None):
+        self.f = destino
+        self.compacto = PDF_OBJETOS_COMPACTOS if compacto is None else compacto
+        self.deduplicar = UNIAO_DEDUP_RECURSOS if deduplicar is None else deduplicar
+        self._por_hash: Dict[bytes, int] = {}    # hash estrutural -> número do objeto no destino
+        self._hasher: Optional[_HashEstrutural] = None
+        self.bytes_deduplicados = 0
+        # índice = número do objeto no destino; valor = offset, (object stream, índice) ou None (livre)
+        self._offsets: List[object] = [None]
+        self._paginas: List[int] = []
+        self._objstm_id: Optional[int] = None
+        self._objstm_pendentes: List[Tuple[int, bytes]] = []
+        self._iniciar()
+
+    def _iniciar(self):
+        self._id_pages = self._reservar()
+        self.f.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def n_paginas(self) -> int:
+        return len(self._paginas)
+
+    def _reservar(self) -> int:
+        self._offsets.append(None)
+        return len(self._offsets) - 1
+
+    def marcar(self) -> Tuple:
+        """
+        Estado atual, para desfazer() tudo o que vier depois (documentos acrescentados e até o
+        finalizar): permite medir o tamanho final e continuar acrescentando. O destino precisa
+        aceitar truncate (BytesIO ou arquivo aberto para escrita).
+        """
+        return (self.f.tell(), list(self._offsets), len(self._paginas), dict(self._por_hash),
+                self.bytes_deduplicados, self._objstm_id, list(self._objstm_pendentes))
+
+    def desfazer(self, marca: Tuple):
+        pos, offsets, n_paginas, por_hash, deduplicados, objstm_id, pendentes = marca
+        self.f.seek(pos)
+        self.f.truncate()
+        self._offsets = list(offsets)
+        del self._paginas[n_paginas:]
+        self._por_hash = dict(por_hash)
+        self.bytes_deduplicados = deduplicados
+        self._objstm_id = objstm_id
+        self._objstm_pendentes = list(pendentes)
+
+    def _gravar(self, idnum: int, obj):
+        obj = obj if obj is not None else NullObject()
+        if self.compacto and not isinstance(obj, StreamObject):
+            if self._objstm_id is None:
+                self._objstm_id = self._reservar()
+            buf = io.BytesIO()
+            obj.write_to_stream(buf, None)
+            self._offsets[idnum] = (self._objstm_id, len(self._objstm_pendentes))
+            self._objstm_pendentes.append((idnum, buf.getvalue()))
+            if len(self._objstm_pendentes) >= OBJSTM_OBJETOS:
+                self._fechar_objstm()
+            return
+        self._offsets[idnum] = self.f.tell()
+        self.f.write(f"{idnum} 0 obj\n".encode("ascii"))
+        obj.write_to_stream(self.f, None)
+        self.f.write(b"\nendobj\n")
+
+    def _gravar_stream(self, idnum: int, dicionario: str, dados: bytes):
+        self._offsets[idnum] = self.f.tell()
+        self.f.write(f"{idnum} 0 obj\n<< {dicionario} /Filter /FlateDecode /Length {len(dados)} >>\nstream\n".encode("ascii"))
+        self.f.write(dados)
+        self.f.write(b"\nendstream\nendobj\n")
+
+    def _fechar_objstm(self):
+        if not self._objstm_pendentes:
+            return
+        cabecalho, corpo, pos = [], [], 0
+        for idnum, dados in self._objstm_pendentes:
+            cabecalho.append(f"{idnum} {pos}")
+            corpo.append(dados)
+            pos += len(dados) + 1
+        primeiro = (" ".join(cabecalho) + "\n").encode("ascii")
+        dados = zlib.compress(primeiro + b"\n".join(corpo) + b"\n", 6)
+        self._gravar_stream(self._objstm_id, f"/Type /ObjStm /N {len(self._objstm_pendentes)} /First {len(primeiro)}", dados)
+        self._objstm_id = None
+        self._objstm_pendentes = []
+
+    def _copiar(self, obj, mapa: Dict[Tuple[int, int], int], fila: deque):
+        """
+        Cópia rasa do objeto com as referências renumeradas; referências novas entram na fila.
+        Páginas fora da seleção (ex.: destino de um link) viram null em vez de arrastar a árvore.
+        """
+        if isinstance(obj, IndirectObject):
+            chave = (obj.idnum, obj.generation)
+            novo = mapa.get(chave)
+            if novo is None:
+                try:
+                    alvo = obj.get_object()
+                except Exception:
+                    alvo = None
+                if isinstance(alvo, DictionaryObject) and alvo.get("/Type") in ("/Page", "/Pages"):
+                    return NullObject()
+                d = None
+                if (self._hasher is not None and isinstance(alvo, StreamObject)
+                        and len(alvo._data or b"") >= UNIAO_DEDUP_MIN_BYTES):
+                    d = self._hasher.de_ref(obj)
+                    if d is not None and d in self._por_hash:
+                        novo = mapa[chave] = self._por_hash[d]
+                        self.bytes_deduplicados += len(alvo._data)
+                        return IndirectObject(novo, 0, None)
+                novo = mapa[chave] = self._reservar()
+                if d is not None:
+                    self._por_hash[d] = novo
+                fila.append(obj)
+            return IndirectObject(novo, 0, None)
+        if isinstance(obj, StreamObject):
+            copia = EncodedStreamObject() if isinstance(obj, EncodedStreamObject) else DecodedStreamObject()
+            copia._data = obj._data
+            for k, v in obj.items():
+                if k != "/Length":
+                    copia[k] = self._copiar(v, mapa, fila)
+            return copia
+        if isinstance(obj, DictionaryObject):
+            copia = DictionaryObject()
+            for k, v in obj.items():
+                copia[k] = self._copiar(v, mapa, fila)
+            return copia
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._copiar(v, mapa, fila) for v in obj)
+        return obj
+
+    def adicionar(self, pdf_path: str, paginas: Optional[Iterable[int]] = None) -> int:
+        """
+        Acrescenta as páginas (todas, ou os índices dados) de pdf_path. Retorna quantas entraram.
+        """
+        reader = PdfReader(pdf_path)
+        if reader.is_encrypted:
+            reader.decrypt("")
+        n = self.adicionar_do_reader(reader, paginas)
+        # PdfReader/PageObject formam ciclos: sem coletar, cada origem ficaria na memória até o próximo gc
+        del reader
+        gc.collect()
+        return n
+
+    def adicionar_do_reader(self, reader: PdfReader, paginas: Optional[Iterable[int]] = None,
+                            limitar_cache: bool = True) -> int:
+        """
+        Como adicionar, a partir de um PdfReader já aberto (ex.: IndicePaginas, que reaproveita
+        o parse entre várias escritas). limitar_cache=False mantém os objetos já resolvidos do reader.
+        """
+        indices = list(range(len(reader.pages))) if paginas is None else list(paginas)
+        mapa: Dict[Tuple[int, int], int] = {}
+        ids: List[int] = []
+        # reserva primeiro o número de todas as páginas: anotações/links entre elas apontam certo
+        for j in indices:
+            ref = reader.pages[j].indirect_reference
+            nid = self._reservar()
+            if ref is not None:
+                mapa[(ref.idnum, ref.generation)] = nid
+            ids.append(nid)
+        self._hasher = _HashEstrutural(dict(mapa)) if self.deduplicar else None
+
+        fila: deque = deque()
+        pai = IndirectObject(self._id_pages, 0, None)
+        for j, nid in zip(indices, ids):
+            page = reader.pages[j]
+            copia = DictionaryObject()
+            for k, v in page.items():
+                if k != "/Parent":
+                    copia[k] = self._copiar(v, mapa, fila)
+            copia[NameObject("/Parent")] = pai
+            self._gravar(nid, copia)
+            self._paginas.append(nid)
+            while fila:
+                ref = fila.popleft()
+                try:
+                    obj = ref.get_object()
+                except Exception:
+                    obj = None
+                self._gravar(mapa[(ref.idnum, ref.generation)], self._copiar(obj, mapa, fila) if obj is not None else None)
+            cache = getattr(reader, "resolved_objects", None)
+            if limitar_cache and cache is not None and len(cache) > STREAMING_CACHE_OBJETOS:
+                cache.clear()
+        self._hasher = None
+        return len(ids)
+
+    def finalizar(self):
+        pages = DictionaryObject()
+        pages[NameObject("/Type")] = NameObject("/Pages")
+        pages[NameObject("/Kids")] = ArrayObject(IndirectObject(i, 0, None) for i in self._paginas)
+        pages[NameObject("/Count")] = NumberObject(len(self._paginas))
+        self._gravar(self._id_pages, pages)
+
+        id_catalogo = self._reservar()
+        catalogo = DictionaryObject()
+        catalogo[NameObject("/Type")] = NameObject("/Catalog")
+        catalogo[NameObject("/Pages")] = IndirectObject(self._id_pages, 0, None)
+        self._gravar(id_catalogo, catalogo)
+
+        if self.compacto:
+            self._finalizar_xref_stream(id_catalogo)
+            return
+        pos_xref = self.f.tell()
+        self.f.write(f"xref\n0 {len(self._offsets)}\n".encode("ascii"))
+        self.f.write(b"0000000000 65535 f \n")
+        for off in self._offsets[1:]:
+            if off is None:
+                self.f.write(b"0000000000 00000 f \n")
+            else:
+                self.f.write(f"{off:010d} 00000 n \n".encode("ascii"))
+        self.f.write(f"trailer\n<< /Size {len(self._offsets)} /Root {id_catalogo} 0 R >>\n"
+                     f"startxref\n{pos_xref}\n%%EOF\n".encode("ascii"))
+
+    def _finalizar_xref_stream(self, id_catalogo: int):
+        self._fechar_objstm()
+        id_xref = self._reservar()
+        pos_xref = self.f.tell()
+        self._offsets[id_xref] = pos_xref
+        largura = max(1, (pos_xref.bit_length() + 7) // 8)
+        linhas = [b"\x00" + bytes(largura) + b"\xff\xff"]
+        for entrada in self._offsets[1:]:
+            if entrada is None:
+                linhas.append(b"\x00" + bytes(largura) + b"\x00\x00")
+            elif isinstance(entrada, tuple):
+                linhas.append(b"\x02" + entrada[0].to_bytes(largura, "big") + entrada[1].to_bytes(2, "big"))
+            else:
+                linhas.append(b"\x01" + entrada.to_bytes(largura, "big") + b"\x00\x00")
+        self._gravar_stream(id_xref, f"/Type /XRef /Size {len(self._offsets)} /W [1 {largura} 2] /Root {id_catalogo} 0 R",
+                            zlib.compress(b"".join(linhas), 6))
+        self.f.write(f"startxref\n{pos_xref}\n%%EOF\n".encode("ascii"))
+
+def _serializar_string_pdf(s) -> str:
+    dados = s if isinstance(s, bytes) else s.get_original_bytes()
+    return f"<{dados.hex()}>"
+
+def _intervalos_xref(numeros: List[int]) -> List[Tuple[int, int]]:
+    """
+    Números de objeto (ordenados) -> subseções contíguas (primeiro, quantidade) da xref.
+    """
+    intervalos: List[Tuple[int, int]] = []
+    for n in numeros:
+        if intervalos and intervalos[-1][0] + intervalos[-1][1] == n:
+            intervalos[-1] = (intervalos[-1][0], intervalos[-1][1] + 1)
+        else:
+            intervalos.append((n, 1))
+    return intervalos
+
+class AtualizacaoIncremental(UniaoStreaming):
+    """
+    Acrescenta páginas a um PDF existente por atualização incremental: os bytes originais ficam
+    intactos (viram a revisão anterior) e só o novo vai ao fim — os objetos das páginas novas,
+    uma raiz de páginas por cima da árvore antiga, o catálogo atualizado e uma seção de xref
+    do mesmo tipo da original (tabela clássica, ou xref stream com object streams), com /Prev.
+    Streams iguais a recursos que o arquivo já tem (fontes, timbres) apontam para os existentes.
+    Tudo é montado em memória: bytes_novos() é o trecho a anexar e len(dados()) o tamanho final.
+    """
+    _ORIGINAL = "original"   # entrada da xref que continua valendo a da revisão anterior
+
+    def __init__(self, existente: bytes, deduplicar: Optional[bool] = None):
+        self.existente = existente
+        self.base = PdfReader(io.BytesIO(existente))
+        if self.base.is_encrypted:
+            raise ValueError("PDF criptografado não aceita acréscimo incremental")
+        achados = re.findall(rb"startxref\s+(\d+)", existente[-2048:])
+        if not achados:
+            raise ValueError("startxref não encontrado")
+        self._xref_anterior = int(achados[-1])
+        xref_stream = not existente[self._xref_anterior:self._xref_anterior + 4].startswith(b"xref")
+        buf = io.BytesIO()
+        buf.write(existente)
+        if not existente.endswith(b"\n"):
+            buf.write(b"\n")
+        super().__init__(buf, compacto=xref_stream, deduplicar=deduplicar)
+
+    def _iniciar(self):
+        # xref stream não leva /Size ao trailer do PyPDF2: o maior número conhecido também vale
+        numeros = [n for g in self.base.xref.values() for n in g] + list(getattr(self.base, "xref_objStm", {}))
+        tamanho = max([int(self.base.trailer.get("/Size", 0))] + [n + 1 for n in numeros])
+        self._offsets = [self._ORIGINAL] * tamanho
+        self._offsets[0] = None
+        self._id_pages = self._reservar()   # nó das páginas novas
+        if self.deduplicar:
+            self._por_hash = {d: idnum for d, (idnum, geracao, _) in _mapear_recursos(self.base).items()
+                              if geracao == 0}
+
+    def _regravar(self, ref: IndirectObject, obj):
+        # nova versão de um objeto da revisão anterior, com o mesmo número
+        if ref.generation != 0:
+            raise ValueError(f"objeto {ref.idnum} com geração {ref.generation} não pode ser regravado")
+        self._gravar(ref.idnum, obj)
+
+    def finalizar(self):
+        ref_catalogo = self.base.trailer.raw_get("/Root")
+        catalogo_antigo = ref_catalogo.get_object()
+        ref_pages = catalogo_antigo.raw_get("/Pages")
+        pages_antigo = ref_pages.get_object()
+        n_antigas = int(pages_antigo.get("/Count", len(self.base.pages)))
+
+        # raiz nova: [árvore antiga, nó das novas]; cada lado mantém seus atributos herdáveis
+        id_raiz = self._reservar()
+        raiz = IndirectObject(id_raiz, 0, None)
+        novas = DictionaryObject()
+        novas[NameObject("/Type")] = NameObject("/Pages")
+        novas[NameObject("/Kids")] = ArrayObject(IndirectObject(i, 0, None) for i in self._paginas)
+        novas[NameObject("/Count")] = NumberObject(len(self._paginas))
+        novas[NameObject("/Parent")] = raiz
+        self._gravar(self._id_pages, novas)
+
+        antigo = DictionaryObject(pages_antigo)
+        antigo[NameObject("/Parent")] = raiz
+        self._regravar(ref_pages, antigo)
+
+        pages = DictionaryObject()
+        pages[NameObject("/Type")] = NameObject("/Pages")
+        pages[NameObject("/Kids")] = ArrayObject([IndirectObject(ref_pages.idnum, 0, None),
+                                                  IndirectObject(self._id_pages, 0, None)])
+        pages[NameObject("/Count")] = NumberObject(n_antigas + len(self._paginas))
+        self._gravar(id_raiz, pages)
+
+        catalogo = DictionaryObject(catalogo_antigo)
+        catalogo[NameObject("/Pages")] = raiz
+        self._regravar(ref_catalogo, catalogo)
+
+        extras = f" /Root {ref_catalogo.idnum} 0 R /Prev {self._xref_anterior}"
+        info = self.base.trailer.raw_get("/Info") if "/Info" in self.base.trailer else None
+        if isinstance(info, IndirectObject):
+            extras += f" /Info {info.idnum} {info.generation} R"
+        ids = self.base.trailer.get("/ID")
+        if isinstance(ids, ArrayObject) and len(ids) == 2:
+            extras += f" /ID [{_serializar_string_pdf(ids[0])} {_serializar_string_pdf(ids[1])}]"
+
+        if self.compacto:
+            self._fechar_objstm()
+            id_xref = self._reservar()
+            pos_xref = self.f.tell()
+            self._offsets[id_xref] = pos_xref
+        else:
+            pos_xref = self.f.tell()
+        numeros = [n for n, off in enumerate(self._offsets) if n > 0 and off is not self._ORIGINAL]
+
+        if not self.compacto:
+            # a seção começa pelo objeto 0: leitores que exigem xref "zero-indexada" não renumeram nada
+            intervalos = _intervalos_xref([0] + numeros)
+            self.f.write(b"xref\n")
+            for primeiro, quantos in intervalos:
+                self.f.write(f"{primeiro} {quantos}\n".encode("ascii"))
+                for n in range(primeiro, primeiro + quantos):
+                    off = self._offsets[n]
+                    if n == 0:
+                        self.f.write(b"0000000000 65535 f \n")
+                    elif off is None:
+                        self.f.write(b"0000000000 00000 f \n")
+                    else:
+                        self.f.write(f"{off:010d} 00000 n \n".encode("ascii"))
+            self.f.write(f"trailer\n<< /Size {len(self._offsets)}{extras} >>\n"
+                         f"startxref\n{pos_xref}\n%%EOF\n".encode("ascii"))
+            return
+
+        intervalos = _intervalos_xref(numeros)
+        largura = max(1, (pos_xref.bit_length() + 7) // 8)
+        linhas = []
+        for n in numeros:
+            entrada = self._offsets[n]
+            if entrada is None:
+                linhas.append(b"\x00" + bytes(largura) + b"\x00\x00")
+            elif isinstance(entrada, tuple):
+                linhas.append(b"\x02" + entrada[0].to_bytes(largura, "big") + entrada[1].to_bytes(2, "big"))
+            else:
+                linhas.append(b"\x01" + entrada.to_bytes(largura, "big") + b"\x00\x00")
+        indice = " ".join(f"{a} {b}" for a, b in intervalos)
+        self._gravar_stream(id_xref, f"/Type /XRef /Size {len(self._offsets)} /W [1 {largura} 2] /Index [{indice}]{extras}",
+                            zlib.compress(b"".join(linhas), 6))
+        self.f.write(f"startxref\n{pos_xref}\n%%EOF\n".encode("ascii"))
+
+    def dados(self) -> bytes:
+        return self.f.getvalue()
+
+    def bytes_novos(self) -> bytes:
+        return self.f.getvalue()[len(self.existente):]
+
+# ===================== Unir sem recomprimir =====================
+
+def unir_pdfs_sem_recomprimir(pdf_paths: List[str], out_path: str, streaming: bool = False,
+                              notify: Optional[Notifier] = None) -> bool:
+    """
+    Une PDFs já comprimidos (saída do GS) copiando páginas com PyPDF2.
+    É bem rápido e não reprocessa imagens.
+    Com streaming=True usa UniaoStreaming: memória ~constante, indicado para uniões grandes.
+    Se a UniaoStreaming falhar (PDF exótico), avisa em notify e refaz com o PdfWriter do PyPDF2.
+    """
+    if streaming:
+        tmp = out_path + ".tmp"
+        try:
+            with open(tmp, "wb") as fo:
+                uniao = UniaoStreaming(fo)
+                for p in pdf_paths:
+                    uniao.adicionar(p)
+                if uniao.n_paginas == 0:
+                    return False
+                uniao.finalizar()
+            os.replace(tmp, out_path)
+            return True
+        except Exception as e:
+            if notify is not None:
+                notify.warn(f"União em streaming falhou ({e}); unido pelo PyPDF2, com mais memória.")
+        finally:
+            if os.path.exists(tmp):
+                try: os.remove(tmp)
+                except Exception: pass
+
+    writer = PdfWriter()
+    total = 0
+    for p in pdf_paths:
+        r = PdfReader(p)
+        for pg in r.pages:
+            writer.add_page(pg)
+            total += 1
+    if total == 0:
+        return False
+    with open(out_path, "wb") as fo:
+        writer.write(fo)
+    return True
+
+def _unir_em_memoria(pdf_paths: List[str]) -> Optional[bytes]:
+    """
+    Mesma união de unir_pdfs_sem_recomprimir (streaming, com recursos deduplicados), mas em um
+    buffer: o tamanho real fica conhecido antes de gravar qualquer coisa em disco.
+    """
+    buf = io.BytesIO()
+    uniao = UniaoStreaming(buf)
+    for p in pdf_paths:
+        uniao.adicionar(p)
+    if uniao.n_paginas == 0:
+        return None
+    uniao.finalizar()
+    return buf.getvalue()
+
+# ===================== Particionamento ótimo (ordem preservada) =====================
+
+def _medir_contribuicoes(pdf_paths: List[str]) -> Tuple[int, List[int]]:
+    """
+    Mede, em memória, quanto cada PDF acrescenta a uma união sem recompressão.
+    Retorna (overhead fixo de um PDF vazio, contribuição de cada arquivo em bytes).
+    """
+    buf = io.BytesIO()
+    UniaoStreaming(buf).finalizar()
+    base = len(buf.getvalue())
+    contrib = []
+    for p in pdf_paths:
+        dados = _unir_em_memoria([p])
+        contrib.append(max(0, len(dados) - base) if dados else 0)
+    return base, contrib
+
+def _economia_dedup(recursos: List[Dict[bytes, int]], a: int, b: int) -> int:
+    # bytes de recursos repetidos em [a, b) que a união grava uma vez só
+    vistos: set = set()
+    economia = 0
+    for r in recursos[a:b]:
+        for h, n in r.items():
+            if h in vistos:
+                economia += n
+            else:
+                vistos.add(h)
+    return economia
+
+def particionar_ordenado(tamanhos: List[int], limite: int, base: int,
+                         recursos: Optional[List[Dict[bytes, int]]] = None) -> List[Tuple[int, int]]:
+    """
+    Programação dinâmica sobre as somas acumuladas: divide a sequência em intervalos
+    contíguos [a, b) com base + soma ≤ limite, usando o MENOR número de partes e, entre
+    as soluções com esse número, a de menor parte máxima (mais folga contra estouro).
+    Um item sozinho acima do limite forma uma parte própria.
+    recursos (de _recursos_compartilhaveis, um por item): desconta de cada intervalo os
+    recursos que a união deduplica, o que pode juntar documentos que não caberiam somados.
+    """
+    n = len(tamanhos)
+    inf = (float("inf"), float("inf"))
+    melhor: List[Tuple[float, float]] = [inf] * (n + 1)
+    corte = [0] * (n + 1)
+    melhor[0] = (0, 0)
+    for j in range(1, n + 1):
+        soma = base
+        vistos: set = set()
+        for i in range(j - 1, -1, -1):
+            soma += tamanhos[i]
+            if recursos is not None:
+                # andando para trás: o que i tem em comum com [i+1, j) sai da soma
+                for h, nb in recursos[i].items():
+                    if h in vistos:
+                        soma -= nb
+                    else:
+                        vistos.add(h)
+            if soma > limite and i < j - 1:
+                break
+            if melhor[i][0] == float("inf"):
+                continue
+            cand = (melhor[i][0] + 1, max(melhor[i][1], soma))
+            if cand < melhor[j]:
+                melhor[j] = cand
+                corte[j] = i
+    grupos: List[Tuple[int, int]] = []
+    j = n
+    while j > 0:
+        grupos.append((corte[j], j))
+        j = corte[j]
+    grupos.reverse()
+    return grupos
+
+# ===================== Escrita parcial (PyPDF2) =====================
+
+class IndicePaginas:
+    """
+    Um PDF de origem aberto uma vez para várias extrações de intervalos (sondagens do divisor):
+    o parse da xref, a lista de páginas, os objetos já resolvidos e a checagem de branco de cada
+    página ficam em memória, e cada intervalo é copiado em streaming (UniaoStreaming) sem
+    reabrir o arquivo. O PdfReader não é thread-safe: as escritas passam por um lock.
+    """
+    def __init__(self, input_pdf: str):
+        self.input_pdf = input_pdf
+        self.reader = PdfReader(input_pdf)
+        if self.reader.is_encrypted:
+            self.reader.decrypt("")
+        self.n_paginas = len(self.reader.pages)
+        self._brancas: Dict[int, bool] = {}
+        self._lock = threading.Lock()
+
+    def _branca(self, j: int) -> bool:
+        if j not in self._brancas:
+            try:
+                self._brancas[j] = is_page_blank_fast(self.reader.pages[j])
+            except Exception:
+                self._brancas[j] = False
+        return self._brancas[j]
+
+    def escrever_intervalo(self, start_idx: int, end_idx: int, out_path: str, remover_brancos: bool = True) -> int:
+        """
+        Grava as páginas [start_idx, end_idx) em out_path. Retorna quantas páginas foram gravadas.
+        """
+        with self._lock:
+            indices = [j for j in range(start_idx, end_idx) if not (remover_brancos and self._branca(j))]
+            with open(out_path, "wb") as f:
+                # arquivo temporário que o GS reescreve: xref clássica, sem custo de object streams
+                uniao = UniaoStreaming(f, compacto=False)
+                uniao.adicionar_do_reader(self.reader, indices, limitar_cache=False)
+                uniao.finalizar()
+            return len(indices)
+
+    def intervalo_em_memoria(self, start_idx: int, end_idx: int, remover_brancos: bool = False,
+                             compacto: Optional[bool] = None) -> Tuple[bytes, int]:
+        """
+        Une as páginas [start_idx, end_idx) num buffer, no formato final (object streams e
+        recursos deduplicados): o tamanho exato da parte sem tocar o disco.
+        compacto=False para o que o GS vai reescrever. Retorna (bytes do PDF, páginas incluídas).
+        """
+        with self._lock:
+            indices = [j for j in range(start_idx, end_idx) if not (remover_brancos and self._branca(j))]
+            buf = io.BytesIO()
+            uniao = UniaoStreaming(buf, compacto=compacto)
+            uniao.adicionar_do_reader(self.reader, indices, limitar_cache=False)
+            uniao.finalizar()
+            return buf.getvalue(), len(indices)
+
+def escrever_intervalo_de_paginas(input_pdf: str, start_idx: int, end_idx: int, out_path: str, remover_brancos: bool = True):
+    # extração avulsa; para várias do mesmo arquivo use um IndicePaginas
+    IndicePaginas(input_pdf).escrever_intervalo(start_idx, end_idx, out_path, remover_brancos)
+
+# ===================== Estimativa de tamanho por página =====================
+
+PDF_OVERHEAD_BASE = 1024            # header, catálogo, árvore de páginas e trailer (bytes)
+PDF_OVERHEAD_PAGINA = 64            # entrada na xref + referência em /Kids (bytes)
+
+# chaves que apontam para fora da página (árvore, outras páginas, outline) — não seguir
+_CHAVES_NAO_SEGUIR = ("/Parent", "/P", "/Dest", "/D", "/Prev", "/Next", "/First", "/Last", "/B")
+
+def _tamanhos_objetos_xref(reader: PdfReader, tamanho_arquivo: int) -> Dict[int, float]:
+    """
+    Usa os offsets da xref para medir cada objeto: bytes até o início do próximo objeto.
+    Objetos dentro de object streams recebem uma fração do stream que os contém.
+    """
+    offsets = sorted((off, idnum) for objs in reader.xref.values() for idnum, off in objs.items())
+    fim_objetos = max(0, tamanho_arquivo - 20 * len(offsets) - 128)   # desconta a própria xref/trailer
+    tamanhos: Dict[int, float] = {}
+    for j, (off, idnum) in enumerate(offsets):
+        fim = offsets[j + 1][0] if j + 1 < len(offsets) else max(off, fim_objetos)
+        tamanhos[idnum] = float(max(0, fim - off))
+
+    em_stream = getattr(reader, "xref_objStm", {}) or {}
+    por_stream: Dict[int, int] = {}
+    for stm, _ in em_stream.values():
+        por_stream[stm] = por_stream.get(stm, 0) + 1
+    for idnum, (stm, _) in em_stream.items():
+        tamanhos[idnum] = tamanhos.get(stm, 0.0) / por_stream[stm]
+    return tamanhos
+
+def _objetos_da_pagina(page) -> set:
+    """
+    Conjunto de objetos indiretos alcançáveis a partir da página (conteúdo, recursos, anotações).
+    """
+    vistos = set()
+    ref = getattr(page, "indirect_reference", None) or getattr(page, "indirect_ref", None)
+    if ref is not None:
+        vistos.add(ref.idnum)
+    pilha = [page]
+    while pilha:
+        obj = pilha.pop()
+        if isinstance(obj, IndirectObject):
+            if obj.idnum in vistos:
+                continue
+            vistos.add(obj.idnum)
+            try:
+                obj = obj.get_object()
+            except Exception:
+                continue
+        if isinstance(obj, DictionaryObject):
+            for k, v in obj.items():
+                if k not in _CHAVES_NAO_SEGUIR:
+                    pilha.append(v)
+        elif isinstance(obj, ArrayObject):
+            pilha.extend(obj)
+    return vistos
+
+class EstimadorTamanho:
+    """
+    Prevê o tamanho de um intervalo de páginas a partir de um PDF já comprimido,
+    somando os objetos alcançáveis por cada página (medidos pela xref).
+    Recursos compartilhados (fontes, timbres) contam uma vez por intervalo.
+    Se a xref não puder ser lida, cai para uma média uniforme por página.
+    """
+    def __init__(self, pdf_comprimido: str):
+        self.fator = 1.0   # calibração real/previsto, atualizada a cada parte gerada pelo GS
+        self.objetos: List[set] = []
+        self.tamanhos: Dict[int, float] = {}
+        try:
+            reader = PdfReader(pdf_comprimido)
+            self.tamanhos = _tamanhos_objetos_xref(reader, os.path.getsize(pdf_comprimido))
+            self.objetos = [_objetos_da_pagina(p) for p in reader.pages]
+        except Exception:
+            try:
+                n = len(PdfReader(pdf_comprimido).pages)
+            except Exception:
+                n = 0
+            media = os.path.getsize(pdf_comprimido) / max(1, n) if n else 0.0
+            self.objetos = [{-(j + 1)} for j in range(n)]
+            self.tamanhos = {-(j + 1): media for j in range(n)}
+
+    @property
+    def n_paginas(self) -> int:
+        return len(self.objetos)
+
+    def bytes_intervalo(self, ini: int, fim: int) -> float:
+        vistos = set()
+        for j in range(ini, fim):
+            vistos |= self.objetos[j]
+        return PDF_OVERHEAD_BASE + PDF_OVERHEAD_PAGINA * (fim - ini) + sum(self.tamanhos.get(o, 0.0) for o in vistos)
+
+    def paginas_que_cabem(self, ini: int, limite_bytes: float) -> int:
+        """
+        Maior k tal que [ini, ini+k) caiba em limite_bytes segundo a previsão (0 se nem uma página cabe).
+        """
+        vistos = set()
+        soma = float(PDF_OVERHEAD_BASE)
+        k = 0
+        for j in range(ini, self.n_paginas):
+            novos = self.objetos[j] - vistos
+            soma += PDF_OVERHEAD_PAGINA + sum(self.tamanhos.get(o, 0.0) for o in novos)
+            if soma * self.fator > limite_bytes:
+                break
+            vistos |= novos
+            k += 1
+        return k
+
+    def calibrar(self, ini: int, fim: int, bytes_reais: float):
+        previsto = self.bytes_intervalo(ini, fim)
+        if previsto > 0 and bytes_reais > 0:
+            # média com o fator anterior para não oscilar com uma única parte atípica
+            self.fator = 0.5 * self.fator + 0.5 * (bytes_reais / previsto)
+
+# ===================== Cache de compressão em disco =====================
+
+@contextmanager
+def _trava_entre_processos(path: str):
+    """
+    Trava exclusiva num arquivo (flock no POSIX, msvcrt no Windows) enquanto o bloco roda.
+    Sem suporte a trava no sistema de arquivos, segue sem ela.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    travado = False
+    try:
+        try:
+            if _is_windows():
+                import msvcrt
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            travado = True
+        except Exception:
+            pass
+        yield
+    finally:
+        if travado and _is_windows():
+            try:
+                import msvcrt
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            except Exception:
+                pass
+        os.close(fd)
+
+class CacheDisco:
+    """
+    Cache persistente de PDFs comprimidos, endereçado pelo conteúdo:
+    chave = SHA-256(bytes da entrada + qualidade + opções do motor de compressão).
+    Limitado a max_mb; ao estourar, remove os menos usados recentemente (mtime = último uso).
+    A mesma pasta é compartilhada pelo app, vigiar_pasta.py e unir_comprimir_lote.py:
+    - obter/guardar deixam um <chave>.<pid>.uso; a poda não apaga entrada com uso de processo vivo
+      (usos de processos mortos ou mais velhos que AREA_ORFA_HORAS não contam e são apagados)
+    - obter e podar rodam sob a trava .trava, então uma entrada não some entre o obter e o uso
+    """
+    def __init__(self, pasta: Optional[str] = None, max_mb: float = CACHE_MAX_MB):
+        self.pasta = pasta or os.path.join(_pasta_dados_app(), "cache_gs")
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._em_uso: set = set()   # chaves tocadas nesta execução não são despejadas
+        os.makedirs(self.pasta, exist_ok=True)
+        atexit.register(self._soltar_usos)
+
+    def chave(self, caminho: str, qualidade: str, motor: str = "gs", resolucao: Optional[int] = None) -> str:
+        h = hashlib.sha256()
+        h.update(_sha256_arquivo(caminho).encode("ascii"))
+        h.update(qualidade.encode("utf-8"))
+        if motor == "imagens":
+            parametros = [motor, repr(IMAGENS_PARAMETROS.get(qualidade)), str(IMAGENS_GANHO_MIN), str(resolucao)]
+        else:
+            parametros = _gs_opcoes(qualidade, resolucao)
+        h.update("\0".join(parametros).encode("utf-8"))
+        return h.hexdigest()
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.pasta, f"{chave}.pdf")
+
+    def _trava(self):
+        return _trava_entre_processos(os.path.join(self.pasta, ".trava"))
+
+    def _marcar_uso(self, chave: str):
+        with open(os.path.join(self.pasta, f"{chave}.{os.getpid()}.uso"), "w", encoding="ascii"):
+            pass
+        with self._lock:
+            self._em_uso.add(chave)
+
+    def _soltar_usos(self):
+        with self._lock:
+            chaves, self._em_uso = self._em_uso, set()
+        for chave in chaves:
+            try: os.remove(os.path.join(self.pasta, f"{chave}.{os.getpid()}.uso"))
+            except Exception: pass
+
+    def obter(self, chave: str) -> Optional[str]:
+        path = self._caminho(chave)
+        with self._trava():
+            if not os.path.isfile(path):
+                return None
+            try:
+                os.utime(path, None)   # marca uso recente (LRU)
+                self._marcar_uso(chave)
+            except Exception:
+                pass
+        return path
+
+    def caminho_temporario(self, chave: str) -> str:
+        return os.path.join(self.pasta, f"{chave}.{os.getpid()}_{threading.get_ident()}.tmp")
+
+    def guardar(self, chave: str, arquivo_tmp: str) -> str:
+        """
+        Move (atomicamente) o resultado gerado em caminho_temporario() para o cache.
+        """
+        path = self._caminho(chave)
+        with self._trava():
+            os.replace(arquivo_tmp, path)
+            try: self._marcar_uso(chave)
+            except Exception: pass
+        return path
+
+    def _usos_vivos(self, nomes: List[str]) -> set:
+        """
+        Chaves com uso de algum processo vivo; apaga os usos que não valem mais.
+        """
+        vivas = set()
+        agora = time.time()
+        for nome in nomes:
+            partes = nome.split(".")
+            if len(partes) != 3 or partes[2] != "uso":
+                continue
+            path = os.path.join(self.pasta, nome)
+            try:
+                pid = int(partes[1])
+                if pid == os.getpid() or (_pid_vivo(pid) and agora - os.path.getmtime(path) < AREA_ORFA_HORAS * 3600):
+                    vivas.add(partes[0])
+                else:
+                    os.remove(path)
+            except Exception:
+                pass
+        return vivas
+
+    def podar(self):
+        """
+        Remove entradas menos usadas até o cache ficar abaixo de 90% do teto, sem tocar nas que
+        algum processo vivo está usando.
+        """
+        with self._trava():
+            try:
+                nomes = os.listdir(self.pasta)
+                entradas = []
+                for nome in nomes:
+                    if not nome.endswith(".pdf"):
+                        continue
+                    path = os.path.join(self.pasta, nome)
+                    st = os.stat(path)
+                    entradas.append((st.st_mtime, st.st_size, nome[:-4], path))
+            except Exception:
+                return
+            total = sum(e[1] for e in entradas)
+            if total <= self.max_bytes:
+                return
+            em_uso = self._usos_vivos(nomes)
+            with self._lock:
+                em_uso |= self._em_uso
+            alvo = int(self.max_bytes * 0.9)
+            for _, tamanho, chave, path in sorted(entradas):
+                if total <= alvo:
+                    break
+                if chave in em_uso:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= tamanho
+                except Exception:
+                    pass
+
+# ===================== Cache de compressão (paralelo) =====================
+
+class CompressCache:
+    """
+    Pré-comprime cada arquivo individualmente (em paralelo) e mede o tamanho.
+    caminho_original -> {"cleaned": caminho_entrada, "compressed": caminho_comp, "mb": tamanho}
+    Os resultados ficam no CacheDisco: reexecutar o mesmo conjunto só comprime o que mudou.
+    """
+    def __init__(self, qualidade: str, remover_brancos: bool, max_workers: Optional[int], notify: Notifier,
+                 cache_disco: Optional[CacheDisco] = None, stage: Optional[AreaStaging] = None,
+                 executor: Optional[Executor] = None, motor: str = "gs", resolucao: Optional[int] = None,
+                 cancel_flag: Optional[threading.Event] = None):
+        self.qualidade = qualidade
+        self.cancel_flag = cancel_flag
+        self.motor = motor
+        self.resolucao = resolucao
+        self.stage = stage
+        self.executor = executor   # pool compartilhado (lote); sem ele, cria um por build_many
+        self.remover_brancos = remover_brancos
+        self.cache: Dict[str, Dict] = {}
+        self.max_workers = max_workers or max(2, min(MAX_WORKERS_DEFAULT, (os.cpu_count() or 4)))
+        self.notify = notify
+        self.disco = cache_disco
+        if self.disco is None:
+            try:
+                self.disco = CacheDisco()
+            except Exception as e:
+                notify.warn(f"Cache de compressão em disco indisponível (segue sem cache): {e}")
+
+    def _clean_if_needed(self, caminho: str) -> str:
+        # a checagem por renderização só roda nas páginas candidatas e fica em cache por conteúdo
+        return limpar_brancos_para_arquivo(caminho, area=self.stage) if self.remover_brancos else caminho
+
+    def _build_one(self, caminho: str) -> Optional[Tuple[str, Dict]]:
+        with self.notify.span("pre_compressao_arquivo", arquivo=os.path.basename(caminho), bytes_in=_tamanho(caminho)) as sp:
+            res = self._build_one_medido(caminho)
+            sp["bytes_out"] = _tamanho(res[1]["compressed"]) if res else 0
+            return res
+
+    def _build_one_medido(self, caminho: str) -> Optional[Tuple[str, Dict]]:
+        if self.cancel_flag is not None and self.cancel_flag.is_set():
+            return None
+        try:
+            cleaned = self._clean_if_needed(caminho)
+            if self.disco is None:
+                if self.stage is not None:
+                    temp_out = self.stage.novo_caminho("comp_ind_", ".pdf", _tamanho(cleaned))
+                else:
+                    fd, temp_out = tempfile.mkstemp(prefix="temp_comp_ind_", suffix=".pdf")
+                    os.close(fd)
+                ok = comprimir_para_pdf([cleaned], temp_out, qualidade=self.qualidade, notify=self.notify, stage=self.stage,
+                                        motor=self.motor, resolucao=self.resolucao, cancel_flag=self.cancel_flag)
+                if not ok:
+                    return None
+                return caminho, {"cleaned": cleaned, "compressed": temp_out, "mb": _mb(temp_out)}
+
+            chave = self.disco.chave(cleaned, self.qualidade, self.motor, self.resolucao)
+            comp = self.disco.obter(chave)
+            self.notify.anotar(cache=comp is not None)
+            if comp is None:
+                temp_out = self.disco.caminho_temporario(chave)
+                ok = comprimir_para_pdf([cleaned], temp_out, qualidade=self.qualidade, notify=self.notify, stage=self.stage,
+                                        motor=self.motor, resolucao=self.resolucao, cancel_flag=self.cancel_flag)
+                if not ok:
+                    try: os.remove(temp_out)
+                    except Exception: pass
+                    return None
+                comp = self.disco.guardar(chave, temp_out)
+            info = {"cleaned": cleaned, "compressed": comp, "mb": _mb(comp)}
+            return caminho, info
+        except Exception as e:
+            print(f"[CompressCache] Falha em {caminho}: {e}")
+            return None
+
+    def build_many(self, caminhos: List[str]) -> List[Dict]:
+        self.notify.text("Pré-compressão paralela (modo preciso)")
+        self.notify.set_total(len(caminhos))
+        self.notify.step_to(0)
+
+        faltam = [c for c in caminhos if c not in self.cache]
+        done = 0
+        if faltam:
+            pool = nullcontext(self.executor) if self.executor else ThreadPoolExecutor(max_workers=self.max_workers)
+            with pool as ex:
+                futs = {ex.submit(self._build_one, c): c for c in faltam}
+                for fut in as_completed(futs):
+                    res = fut.result()
+                    if res:
+                        key, info = res
+                        self.cache[key] = info
+                    else:
+                        c = futs[fut]
+                        self.cache[c] = {"cleaned": c, "compressed": None, "mb": float("inf")}
+                    done += 1
+                    self.notify.step_to(done)
+        if done < len(caminhos):
+            self.notify.step_to(len(caminhos))
+        if self.disco is not None:
+            self.disco.podar()
+        return [self.cache.get(c, {"cleaned": c, "compressed": None, "mb": float("inf")}) for c in caminhos]
+
+# ===================== Compressão paralela em fatias de páginas =====================
+
+def _planejar_fatias(paginas_por_arquivo: List[Tuple[str, int]], n_fatias: int) -> List[List[Tuple[str, int, int]]]:
+    """
+    Corta a sequência concatenada de páginas em n_fatias intervalos contíguos de tamanho parecido.
+    Cada fatia é uma lista de (arquivo, início, fim) — pode atravessar a fronteira entre arquivos.
+    """
+    total = sum(n for _, n in paginas_por_arquivo)
+    fatias: List[List[Tuple[str, int, int]]] = []
+    atual: List[Tuple[str, int, int]] = []
+    cabe = 0
+    restantes = total
+    for path, n in paginas_por_arquivo:
+        ini = 0
+        while ini < n:
+            if cabe == 0:
+                cabe = -(-restantes // (n_fatias - len(fatias)))   # divisão com teto
+            fim = min(n, ini + cabe)
+            atual.append((path, ini, fim))
+            cabe -= fim - ini
+            restantes -= fim - ini
+            ini = fim
+            if cabe == 0:
+                fatias.append(atual)
+                atual = []
+    if atual:
+        fatias.append(atual)
+    return fatias
+
+def _escrever_fatia(fatia: List[Tuple[str, int, int]], out_path: str):
+    writer = PdfWriter()
+    for path, ini, fim in fatia:
+        reader = PdfReader(path)
+        for j in range(ini, fim):
+            writer.add_page(reader.pages[j])
+    with open(out_path, "wb") as f:
+        writer.write(f)
+
+def gs_comprimir_em_fatias(input_files: List[str], output_pdf: str, qualidade: str, notify: Notifier,
+                           cancel_flag: threading.Event, max_workers: Optional[int] = None,
+                           stage: Optional[AreaStaging] = None, executor: Optional[Executor] = None,
+                           resolucao: Optional[int] = None,
+                           ao_paginar: Optional[Callable[[int], None]] = None) -> bool:
+    """
+    Comprime o conjunto cortando-o em fatias de páginas, uma chamada ao GS por fatia, em paralelo,
+    e costura as fatias comprimidas sem recomprimir (mesmas páginas, mesma ordem do caminho serial).
+    Recursos iguais em fatias diferentes (fontes, timbres) são gravados uma vez por fatia.
+    Cai para gs_comprimir_para_pdf quando o conjunto é pequeno, algum PDF não abre ou uma fatia falha.
+    ao_paginar(n) recebe o total de páginas já percorridas somando todas as fatias.
+    """
+    workers = max_workers or MAX_WORKERS_DEFAULT
+    try:
+        paginas = [(p, len(PdfReader(p).pages)) for p in input_files]
+    except Exception:
+        return gs_comprimir_para_pdf(input_files, output_pdf, qualidade=qualidade, notify=notify, stage=stage,
+                                     resolucao=resolucao, cancel_flag=cancel_flag, ao_paginar=ao_paginar)
+    total = sum(n for _, n in paginas)
+    n_fatias = min(workers, total // FATIA_MIN_PAGINAS)
+    if total < FATIAS_MIN_PAGINAS or n_fatias < 2:
+        return gs_comprimir_para_pdf(input_files, output_pdf, qualidade=qualidade, notify=notify, stage=stage,
+                                     resolucao=resolucao, cancel_flag=cancel_flag, ao_paginar=ao_paginar)
+
+    fatias = _planejar_fatias(paginas, n_fatias)
+    tamanho_entradas = sum(_tamanho(p) for p in input_files)
+    if stage is not None:
+        tmp_dir = stage.novo_diretorio("fatias_", 2 * tamanho_entradas)
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix=f"gs_fatias_{os.getpid()}_")
+    saidas = [os.path.join(tmp_dir, f"fatia_{j:03d}_comp.pdf") for j in range(len(fatias))]
+
+    # progresso por página somando o que cada fatia já percorreu
+    progresso = [0] * len(fatias)
+    progresso_lock = threading.Lock()
+
+    def paginar_fatia(j: int, n: int):
+        with progresso_lock:
+            progresso[j] = n
+            if ao_paginar is not None:
+                ao_paginar(min(total, sum(progresso)))
+
+    def comprimir_fatia(j: int) -> bool:
+        if cancel_flag.is_set():
+            return False
+        with notify.span("fatia", fatia=j, paginas=sum(fim - ini for _, ini, fim in fatias[j])) as sp:
+            src = os.path.join(tmp_dir, f"fatia_{j:03d}.pdf")
+            _escrever_fatia(fatias[j], src)
+            sp["bytes_in"] = _tamanho(src)
+            try:
+                ok = gs_comprimir_para_pdf([src], saidas[j], qualidade=qualidade, notify=notify, stage=stage,
+                                           resolucao=resolucao, cancel_flag=cancel_flag,
+                                           ao_paginar=lambda n: paginar_fatia(j, n))
+                sp["bytes_out"] = _tamanho(saidas[j]) if ok else 0
+                return ok
+            finally:
+                try: os.remove(src)
+                except Exception: pass
+
+    try:
+        notify.subtext(f"Comprimindo {len(fatias)} fatias de páginas em paralelo")
+        ok_todas = True
+        pool = nullcontext(executor) if executor else ThreadPoolExecutor(max_workers=min(workers, len(fatias)))
+        with pool as ex:
+            futs = [ex.submit(comprimir_fatia, j) for j in range(len(fatias))]
+            for fut in as_completed(futs):
+                try:
+                    ok_todas = fut.result() and ok_todas
+                except Exception:
+                    ok_todas = False
+        if cancel_flag.is_set():
+            return False
+        if ok_todas:
+            with notify.span("uniao", arquivos=len(saidas), paginas=total,
+                             bytes_in=sum(_tamanho(p) for p in saidas)) as sp:
+                unido = unir_pdfs_sem_recomprimir(saidas, output_pdf, streaming=True)
+                sp["bytes_out"] = _tamanho(output_pdf) if unido else 0
+            if unido and len(PdfReader(output_pdf).pages) == total:
+                return True
+        notify.subtext("Fatias falharam — comprimindo o conjunto inteiro")
+        return gs_comprimir_para_pdf(input_files, output_pdf, qualidade=qualidade, notify=notify, stage=stage,
+                                     resolucao=resolucao, cancel_flag=cancel_flag, ao_paginar=ao_paginar)
+    finally:
+        if stage is not None:
+            stage.liberar(tmp_dir)
+        else:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+# ===================== Motor de imagens (sem Ghostscript) =====================
+
+_FILTROS_TEXTO = ("/ASCII85Decode", "/ASCIIHexDecode")
+
+def _filtros_da_imagem(img) -> List[str]:
+    filtros = img.get("/Filter")
+    if filtros is None:
+        return []
+    return [str(f) for f in filtros] if isinstance(filtros, ArrayObject) else [str(filtros)]
+
+def _modo_da_imagem(img) -> Optional[str]:
+    """
+    "L"/"RGB" se a imagem pode ser recodificada como JPEG sem mudar a aparência; senão None.
+    Ficam de fora máscaras, /Decode, cores indexadas/CMYK, bits != 8 e filtros com parâmetros.
+    """
+    if img.get("/ImageMask") or "/Mask" in img or "/Decode" in img:
+        return None
+    if img.get("/BitsPerComponent") != 8:
+        return None
+    filtros = _filtros_da_imagem(img)
+    if any(f not in _FILTROS_TEXTO for f in filtros[:-1]) or filtros[-1:] not in ([], ["/FlateDecode"], ["/DCTDecode"]):
+        return None
+    if img.get("/DecodeParms"):
+        return None
+    cs = img.get("/ColorSpace")
+    if cs == "/DeviceGray":
+        return "L"
+    if cs == "/DeviceRGB":
+        return "RGB"
+    try:
+        cs = cs.get_object()
+        if isinstance(cs, ArrayObject) and cs[0] == "/ICCBased":
+            return {1: "L", 3: "RGB"}.get(cs[1].get_object().get("/N"))
+    except Exception:
+        pass
+    return None
+
+_IDENTIDADE = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+def _multiplicar(m, n) -> Tuple[float, ...]:
+    a, b, c, d, e, f = m
+    A, B, C, D, E, F = n
+    return (a * A + b * C, a * B + b * D, c * A + d * C, c * B + d * D, e * A + f * C + E, e * B + f * D + F)
+
+def _tamanhos_desenhados(conteudo, recursos, reader: PdfReader, ctm, tamanhos: Dict[int, Tuple[float, float]],
+                         prof: int = 0):
+    """
+    Segue q/Q/cm/Do de um stream de conteúdo (página ou Form, recursivo com a /Matrix) e guarda em
+    `tamanhos` idnum -> (largura, altura) em polegadas do maior desenho de cada imagem.
+    """
+    if conteudo is None or prof > 8:
+        return
+    try:
+        xobjs = recursos.get_object().get("/XObject") if recursos is not None else None
+        xobjs = xobjs.get_object() if xobjs is not None else {}
+        operacoes = (conteudo if isinstance(conteudo, ContentStream) else ContentStream(conteudo, reader)).operations
+    except Exception:
+        return
+    pilha = []
+    for operandos, operador in operacoes:
+        try:
+            if operador == b"q":
+                pilha.append(ctm)
+            elif operador == b"Q":
+                ctm = pilha.pop() if pilha else ctm
+            elif operador == b"cm":
+                ctm = _multiplicar(tuple(float(x) for x in operandos), ctm)
+            elif operador == b"Do":
+                ref = xobjs.get(operandos[0])
+                o = ref.get_object() if ref is not None else None
+                if o is None:
+                    continue
+                if o.get("/Subtype") == "/Image" and isinstance(ref, IndirectObject):
+                    largura = math.hypot(ctm[0], ctm[1]) / 72.0
+                    altura = math.hypot(ctm[2], ctm[3]) / 72.0
+                    antes = tamanhos.get(ref.idnum, (0.0, 0.0))
+                    tamanhos[ref.idnum] = (max(largura, antes[0]), max(altura, antes[1]))
+                elif o.get("/Subtype") == "/Form":
+                    matriz = tuple(float(x) for x in o.get("/Matrix", _IDENTIDADE))
+                    _tamanhos_desenhados(o, o.get("/Resources", recursos), reader, _multiplicar(matriz, ctm),
+                                         tamanhos, prof + 1)
+        except Exception:
+            continue
+
+def _imagens_recomprimiveis(reader: PdfReader) -> Dict[int, Tuple[object, str, Tuple[float, float]]]:
+    """
+    idnum -> (imagem, modo, (largura, altura) desenhada em polegadas), incluindo imagens dentro de Forms.
+    O tamanho sai da matriz (cm) no operador Do; se o conteúdo não puder ser seguido, supõe a
+    imagem ocupando o maior lado da página. Uma imagem usada várias vezes fica com o maior
+    desenho (DPI efetivo mais conservador).
+    """
+    achadas: Dict[int, Tuple[object, str, Tuple[float, float]]] = {}
+    for page in reader.pages:
+        try:
+            lado = max(float(page.mediabox.width), float(page.mediabox.height)) / 72.0
+        except Exception:
+            continue
+        da_pagina: Dict[int, Tuple[object, str]] = {}
+        pilha = [page.get("/Resources")]
+        vistos: set = set()
+        while pilha:
+            try:
+                recursos = pilha.pop()
+                xobj = recursos.get_object().get("/XObject") if recursos is not None else None
+                itens = list(xobj.get_object().values()) if xobj else []
+            except Exception:
+                continue
+            for ref in itens:
+                if not isinstance(ref, IndirectObject) or ref.idnum in vistos:
+                    continue
+                vistos.add(ref.idnum)
+                o = ref.get_object()
+                if o.get("/Subtype") == "/Form":
+                    pilha.append(o.get("/Resources"))
+                elif o.get("/Subtype") == "/Image" and len(o._data or b"") >= IMAGENS_MIN_BYTES:
+                    modo = _modo_da_imagem(o)
+                    if modo is not None:
+                        da_pagina[ref.idnum] = (o, modo)
+        if not da_pagina:
+            continue
+        desenhos: Dict[int, Tuple[float, float]] = {}
+        try:
+            _tamanhos_desenhados(page.get_contents(), page.get("/Resources"), reader, _IDENTIDADE, desenhos)
+        except Exception:
+            pass
+        for idnum, (o, modo) in da_pagina.items():
+            tamanho = desenhos.get(idnum)
+            if not tamanho or min(tamanho) <= 0:
+                escala = lado / max(int(o["/Width"]), int(o["/Height"]), 1)
+                tamanho = (int(o["/Width"]) * escala, int(o["/Height"]) * escala)
+            anterior = achadas.get(idnum)
+            if anterior:
+                tamanho = (max(tamanho[0], anterior[2][0]), max(tamanho[1], anterior[2][1]))
+            achadas[idnum] = (o, modo, tamanho)
+    return achadas
+
+def _recomprimir_imagem(dados: bytes, filtros: List[str], largura: int, altura: int, modo: str,
+                        escala: float, qualidade_jpeg: int) -> Optional[Tuple[bytes, int, int, str]]:
+    """
+    Roda num processo do pool: decodifica, reduz para a escala pedida e regrava em JPEG.
+    Imagens coloridas que na prática são cinza (scan de papel branco) viram escala de cinza.
+    Retorna (jpeg, largura, altura, modo) ou None se não houve ganho suficiente.
+    """
+    from PyPDF2.filters import ASCII85Decode, ASCIIHexDecode
+    tamanho_original = len(dados)
+    filtro = filtros[-1] if filtros else None
+    for f in filtros[:-1]:
+        dados = ASCII85Decode.decode(dados) if f == "/ASCII85Decode" else ASCIIHexDecode.decode(dados)
+        dados = dados.encode("latin-1") if isinstance(dados, str) else dados
+    if filtro == "/DCTDecode":
+        img = Image.open(io.BytesIO(dados))
+        img.load()
+        if img.mode != modo:
+            return None
+    else:
+        bruto = zlib.decompress(dados) if filtro == "/FlateDecode" else dados
+        esperado = largura * altura * len(modo)
+        if len(bruto) < esperado:
+            return None
+        img = Image.frombytes(modo, (largura, altura), bruto[:esperado])
+    if escala < 1.0:
+        img = img.resize((max(1, round(img.width * escala)), max(1, round(img.height * escala))), Image.LANCZOS)
+    if modo == "RGB" and np is not None:
+        amostra = np.asarray(img, dtype=np.int16)[::4, ::4]
+        if amostra.size and np.percentile(amostra.max(axis=2) - amostra.min(axis=2), 99) < 12:
+            img, modo = img.convert("L"), "L"
+    saida = io.BytesIO()
+    img.save(saida, format="JPEG", quality=qualidade_jpeg, optimize=True)
+    novo = saida.getvalue()
+    if len(novo) > tamanho_original * IMAGENS_GANHO_MIN:
+        return None
+    return novo, img.width, img.height, modo
+
+_pool_processos: Optional[ProcessPoolExecutor] = None
+_pool_processos_lock = threading.Lock()
+
+def _obter_pool_processos() -> Optional[ProcessPoolExecutor]:
+    global _pool_processos
+    with _pool_processos_lock:
+        if _pool_processos is None:
+            try:
+                # spawn, não fork: o app tem threads (Tk, workers) e um fork herdaria locks travados
+                _pool_processos = ProcessPoolExecutor(max_workers=MAX_WORKERS_DEFAULT,
+                                                      mp_context=multiprocessing.get_context("spawn"))
+                atexit.register(_pool_processos.shutdown, wait=False, cancel_futures=True)
+            except Exception:
+                return None
+        return _pool_processos
+
+def _recomprimir_imagens_arquivo(entrada_pdf: str, saida_pdf: str, dpi: int, qualidade_jpeg: int,
+                                 notify: Notifier, cancel_flag: Optional[threading.Event] = None) -> int:
+    """
+    Recodifica as imagens grandes de um PDF e grava o resultado; texto e vetores ficam intactos.
+    Retorna quantas imagens foram trocadas (cancelado: para sem gravar nada).
+    """
+    reader = PdfReader(entrada_pdf)
+    imagens = _imagens_recomprimiveis(reader)
+    pool = _obter_pool_processos()
+    trocadas = 0
+
+    def aplicar(img, res):
+        jpeg, largura, altura, modo = res
+        img._data = jpeg
+        if hasattr(img, "decoded_self"):
+            img.decoded_self = None
+        img[NameObject("/Filter")] = NameObject("/DCTDecode")
+        img.pop(NameObject("/DecodeParms"), None)
+        img[NameObject("/Width")] = NumberObject(largura)
+        img[NameObject("/Height")] = NumberObject(altura)
+        if modo == "L":
+            img[NameObject("/ColorSpace")] = NameObject("/DeviceGray")
+
+    # janela de tarefas em voo: limita a memória das cópias enviadas aos processos
+    pendentes: deque = deque()
+    janela = 2 * MAX_WORKERS_DEFAULT
+    itens = list(imagens.values())
+    for n, (img, modo, (larg_pol, alt_pol)) in enumerate(itens, start=1):
+        if cancel_flag is not None and cancel_flag.is_set():
+            for _, fut in pendentes:
+                fut.cancel()
+            return trocadas
+        largura, altura = int(img["/Width"]), int(img["/Height"])
+        dpi_efetivo = min(largura / max(larg_pol, 0.01), altura / max(alt_pol, 0.01))
+        escala = dpi / dpi_efetivo if dpi_efetivo > dpi * 1.1 else 1.0
+        args = (img._data, _filtros_da_imagem(img), largura, altura, modo, escala, qualidade_jpeg)
+        if pool is None:
+            res = _recomprimir_imagem(*args)
+            if res:
+                aplicar(img, res); trocadas += 1
+        else:
+            pendentes.append((img, pool.submit(_recomprimir_imagem, *args)))
+        while pendentes and (len(pendentes) >= janela or n == len(itens)):
+            img_p, fut = pendentes.popleft()
+            try:
+                res = fut.result()
+            except Exception:
+                res = None
+            if res:
+                aplicar(img_p, res); trocadas += 1
+        if n % 10 == 0 or n == len(itens):
+            notify.subtext(f"{os.path.basename(entrada_pdf)}: {n}/{len(itens)} imagens")
+
+    writer = PdfWriter()
+    for page in reader.pages:
+        writer.add_page(page)
+    with open(saida_pdf, "wb") as fo:
+        writer.write(fo)
+    return trocadas
+
+def imagens_comprimir_para_pdf(input_files: List[str], output_pdf: str, qualidade: str, notify: Notifier,
+                               stage: Optional[AreaStaging] = None, resolucao: Optional[int] = None,
+                               cancel_flag: Optional[threading.Event] = None) -> bool:
+    """
+    Alternativa ao Ghostscript para PDFs de scans/fotos: recodifica só as imagens embutidas
+    (DPI/qualidade de IMAGENS_PARAMETROS; `resolucao` substitui o DPI) num pool de processos
+    e une os arquivos sem recomprimir.
+    Arquivo que o motor não consegue ler vai pelo GS; sem Pillow, tudo vai pelo GS.
+    """
+    if Image is None:
+        notify.warn("Pillow não instalado: usando o Ghostscript para comprimir.")
+        return gs_comprimir_para_pdf(input_files, output_pdf, qualidade=qualidade, notify=notify, stage=stage,
+                                     resolucao=resolucao, cancel_flag=cancel_flag)
+    dpi, qualidade_jpeg = IMAGENS_PARAMETROS.get(qualidade, IMAGENS_PARAMETROS["/ebook"])
+    dpi = resolucao or dpi
+    out_norm = _norm(output_pdf)
+    os.makedirs(os.path.dirname(out_norm) or ".", exist_ok=True)
+
+    saidas: List[str] = []
+    try:
+        for entrada in input_files:
+            if cancel_flag is not None and cancel_flag.is_set():
+                return False
+            if stage is not None:
+                tmp = stage.novo_caminho("img_", ".pdf")
+            else:
+                fd, tmp = tempfile.mkstemp(prefix="temp_img_", suffix=".pdf")
+                os.close(fd)
+            saidas.append(tmp)
+            try:
+                with notify.span("imagens", arquivo=os.path.basename(entrada), dpi=dpi, bytes_in=_tamanho(entrada)) as sp:
+                    sp["trocadas"] = _recomprimir_imagens_arquivo(entrada, tmp, dpi, qualidade_jpeg, notify, cancel_flag)
+                    sp["bytes_out"] = _tamanho(tmp)
+            except Exception as e:
+                notify.subtext(f"Motor de imagens não leu {os.path.basename(entrada)} ({e}); usando o GS")
+                if not gs_comprimir_para_pdf([entrada], tmp, qualidade=qualidade, notify=notify, stage=stage,
+                                             resolucao=resolucao, cancel_flag=cancel_flag):
+                    saidas.pop()
+                    try: os.remove(tmp)
+                    except Exception: pass
+        if not saidas or (cancel_flag is not None and cancel_flag.is_set()):
+            return False
+        if len(saidas) == 1:
+            shutil.move(saidas.pop(), out_norm)
+            return True
+        with notify.span("uniao", arquivos=len(saidas), bytes_in=sum(_tamanho(p) for p in saidas)) as sp:
+            ok = unir_pdfs_sem_recomprimir(saidas, out_norm, streaming=True)
+            sp["bytes_out"] = _tamanho(out_norm) if ok else 0
+            return ok
+    finally:
+        for tmp in saidas:
+            try: os.remove(tmp)
+            except Exception: pass
+
+def comprimir_para_pdf(input_files: List[str], output_pdf: str, qualidade: str, notify: Notifier,
+                       stage: Optional[AreaStaging] = None, motor: str = "gs", resolucao: Optional[int] = None,
+                       cancel_flag: Optional[threading.Event] = None,
+                       ao_paginar: Optional[Callable[[int], None]] = None) -> bool:
+    if motor == "imagens":
+        return imagens_comprimir_para_pdf(input_files, output_pdf, qualidade=qualidade, notify=notify, stage=stage,
+                                          resolucao=resolucao, cancel_flag=cancel_flag)
+    return gs_comprimir_para_pdf(input_files, output_pdf, qualidade=qualidade, notify=notify, stage=stage,
+                                 resolucao=resolucao, cancel_flag=cancel_flag, ao_paginar=ao_paginar)
+
+_gs_pipe_indisponivel = False   # GS que não lê PDF do stdin: o pipe falhou onde os arquivos funcionaram
+
+def comprimir_para_bytes(dados: bytes, qualidade: str, notify: Notifier, stage: Optional[AreaStaging] = None,
+                        motor: str = "gs", resolucao: Optional[int] = None,
+                        cancel_flag: Optional[threading.Event] = None) -> Optional[bytes]:
+    """
+    Como comprimir_para_pdf, de buffer para buffer (sondagens e amostras que só precisam do tamanho).
+    Com o GS e até GS_PIPE_MAX_MB, vai por pipes; senão (ou se o pipe falhar) passa por
+    arquivos na área de trabalho, apagados em seguida.
+    """
+    global _gs_pipe_indisponivel
+    pipe_falhou = False
+    erros_pipe: List[str] = []
+    if motor == "gs" and GS_PIPE_ATIVO and not _gs_pipe_indisponivel and len(dados) <= GS_PIPE_MAX_MB * 1024 * 1024:
+        resultado = gs_comprimir_em_memoria(dados, qualidade, notify, resolucao=resolucao, cancel_flag=cancel_flag,
+                                            erros=erros_pipe)
+        if resultado is not None or (cancel_flag is not None and cancel_flag.is_set()):
+            return resultado
+        pipe_falhou = True
+    area_propria = stage is None
+    if area_propria:
+        stage = AreaStaging()
+    entrada = stage.novo_caminho("buf_in_", ".pdf", len(dados))
+    saida = stage.novo_caminho("buf_out_", ".pdf", len(dados))
+    try:
+        with open(entrada, "wb") as f:
+            f.write(dados)
+        if not comprimir_para_pdf([entrada], saida, qualidade=qualidade, notify=notify, stage=stage, motor=motor,
+                                  resolucao=resolucao, cancel_flag=cancel_flag):
+            if erros_pipe and erros_pipe[0]:
+                notify.warn(f"Ghostscript por pipe também falhou.\n\n[stderr]\n{erros_pipe[0]}")
+            return None
+        if pipe_falhou:
+            _gs_pipe_indisponivel = True   # a entrada era boa: o problema é o pipe deste GS
+        with open(saida, "rb") as f:
+            return f.read()
+    finally:
+        stage.liberar(entrada)
+        stage.liberar(saida)
+        if area_propria:
+            stage.fechar()
+
+# ===================== Qualidade automática =====================
+
+def _preset_para_resolucao(resolucao: int) -> str:
+    if resolucao >= 200:
+        return "/printer"
+    if resolucao >= 100:
+        return "/ebook"
+    return "/screen"
+
+def _amostrar_paginas(paginas_por_arquivo: List[Tuple[str, int]], n_amostra: int) -> List[Tuple[str, List[int]]]:
+    """
+    Páginas espaçadas uniformemente pelo conjunto (na ordem), agrupadas por arquivo.
+    """
+    total = sum(n for _, n in paginas_por_arquivo)
+    n_amostra = min(n_amostra, total)   # conjunto menor que a amostra: entra inteiro
+    globais = sorted({int((i + 0.5) * total / n_amostra) for i in range(n_amostra)})
+    grupos: List[Tuple[str, List[int]]] = []
+    inicio = 0
+    for path, n in paginas_por_arquivo:
+        locais = [g - inicio for g in globais if inicio <= g < inicio + n]
+        if locais:
+            grupos.append((path, locais))
+        inicio += n
+    return grupos
+
+def escolher_qualidade_auto(arquivos: List[str], notify: Notifier, stage: Optional[AreaStaging] = None,
+                            motor: str = "gs", cancel_flag: Optional[threading.Event] = None) -> Tuple[str, int]:
+    """
+    Escolhe (preset, resolução) para o modo "auto" com 2 compressões de uma amostra pequena:
+    comprime AUTO_AMOSTRA_PAGINAS páginas no maior e no menor degrau de AUTO_RESOLUCOES, ajusta
+    tamanho ≈ a + b·dpi² (imagens crescem com a área em pixels; texto e fontes são o termo fixo)
+    e extrapola para o conjunto pela razão bytes da amostra / bytes das entradas.
+    Fica com a maior resolução que ainda dá o menor número possível de partes de LIMITE_MB.
+    """
+    padrao = ("/ebook", GS_RESOLUCAO_PADRAO)
+    notify.text("Qualidade automática: amostrando páginas")
     try:
-        contents = page.get_contents()
-        if contents is None:
-            return True
-        if isinstance(contents, list):
-            data = b"".join([c.get_data() for c in contents if hasattr(c, "get_data")])
-        else:
-            data = contents.get_data()
-        return len(data.strip()) == 0
+        paginas = [(p, len(PdfReader(p).pages)) for p in arquivos]
+        total_bytes = sum(os.path.getsize(p) for p in arquivos)
     except Exception:
-        return False
+        return padrao
+    if not any(n for _, n in paginas):
+        return padrao
 
-def limpar_brancos_para_arquivo(entrada_pdf: str) -> str:
     try:
-        reader = PdfReader(entrada_pdf)
+        # amostra e compressões só são medidas: ficam em memória (GS por pipes)
+        buf = io.BytesIO()
+        uniao = UniaoStreaming(buf)
+        for path, indices in _amostrar_paginas(paginas, AUTO_AMOSTRA_PAGINAS):
+            uniao.adicionar(path, indices)
+        uniao.finalizar()
+        amostra = buf.getvalue()
+        bytes_amostra = len(amostra)
+
+        medidas: List[Tuple[int, int]] = []
+        for r in (AUTO_RESOLUCOES[0], AUTO_RESOLUCOES[-1]):
+            notify.subtext(f"Amostra a {r} dpi")
+            comprimida = comprimir_para_bytes(amostra, _preset_para_resolucao(r), notify, stage=stage,
+                                              motor=motor, resolucao=r, cancel_flag=cancel_flag)
+            if comprimida is None:
+                return padrao
+            medidas.append((r, len(comprimida)))
     except Exception:
-        return entrada_pdf
+        return padrao
 
-    writer = PdfWriter()
-    removidos = 0
-    for p in reader.pages:
-        if is_page_blank_fast(p):
-            removidos += 1
-            continue
-        writer.add_page(p)
+    (r1, s1), (r2, s2) = medidas
+    b = max(0.0, (s1 - s2) / float(r1 * r1 - r2 * r2))
+    a = max(0.0, s2 - b * r2 * r2)
+    escala = total_bytes / max(1, bytes_amostra)
+    limite = LIMITE_MB * 1024 * 1024 * FATOR_PREVISAO
 
-    if removidos == 0:
-        return entrada_pdf
+    def partes(r: int) -> int:
+        return max(1, math.ceil((a + b * r * r) * escala / limite))
 
-    tmp_out = os.path.join(tempfile.gettempdir(), f"temp_clean_{os.getpid()}_{os.path.basename(entrada_pdf)}")
-    with open(tmp_out, "wb") as f:
-        writer.write(f)
-    return tmp_out
+    minimo = partes(AUTO_RESOLUCOES[-1])
+    for r in AUTO_RESOLUCOES:
+        if partes(r) == minimo:
+            return _preset_para_resolucao(r), r
+    return padrao
 
-# ===================== Unir sem recomprimir =====================
+# ===================== Análise prévia (pre-flight) =====================
 
-def unir_pdfs_sem_recomprimir(pdf_paths: List[str], out_path: str) -> bool:
-    """
-    Une PDFs já comprimidos (saída do GS) copiando páginas com PyPDF2.
-    É bem rápido e não reprocessa imagens.
-    """
-    writer = PdfWriter()
+def _bytes_fontes(reader: PdfReader) -> int:
+    vistos = set()
     total = 0
-    for p in pdf_paths:
-        r = PdfReader(p)
-        for pg in r.pages:
-            writer.add_page(pg)
-            total += 1
-    if total == 0:
-        return False
-    with open(out_path, "wb") as fo:
-        writer.write(fo)
-    return True
-
-# ===================== Escrita parcial (PyPDF2) =====================
-
-def escrever_intervalo_de_paginas(input_pdf: str, start_idx: int, end_idx: int, out_path: str, remover_brancos: bool = True):
-    reader = PdfReader(input_pdf)
-    writer = PdfWriter()
-    for i in range(start_idx, end_idx):
-        p = reader.pages[i]
-        if remover_brancos and is_page_blank_fast(p):
+    for page in reader.pages:
+        try:
+            fontes = page["/Resources"].get_object().get("/Font")
+            fontes = fontes.get_object().values() if fontes else []
+        except Exception:
             continue
-        writer.add_page(p)
-    with open(out_path, "wb") as f:
-        writer.write(f)
-
-# ===================== Cache de compressão (paralelo) =====================
+        for f in fontes:
+            try:
+                f = f.get_object()
+                descritores = [f.get("/FontDescriptor")]
+                for d in f.get("/DescendantFonts", []) or []:
+                    descritores.append(d.get_object().get("/FontDescriptor"))
+                for desc in descritores:
+                    if desc is None:
+                        continue
+                    desc = desc.get_object()
+                    for chave in ("/FontFile", "/FontFile2", "/FontFile3"):
+                        ref = desc.get(chave)
+                        if ref is None or getattr(ref, "idnum", None) in vistos:
+                            continue
+                        vistos.add(getattr(ref, "idnum", id(ref)))
+                        total += len(ref.get_object()._data or b"")
+            except Exception:
+                continue
+    return total
 
-class CompressCache:
+def analisar_pdf(caminho: str) -> Dict:
     """
-    Pré-comprime cada arquivo individualmente (em paralelo) e mede o tamanho.
-    caminho_original -> {"cleaned": caminho_entrada, "compressed": caminho_comp, "mb": tamanho}
+    Raio-x de um PDF antes de processar (roda num processo do pool): páginas, senha, xref
+    reconstruída, imagens (bytes e DPI estimado supondo a imagem na página inteira) e fontes.
+    Nada aqui chama o Ghostscript.
     """
-    def __init__(self, qualidade: str, remover_brancos: bool, max_workers: Optional[int], notify: Notifier):
-        self.qualidade = qualidade
-        self.remover_brancos = remover_brancos
-        self.cache: Dict[str, Dict] = {}
-        self.max_workers = max_workers or max(2, min(MAX_WORKERS_DEFAULT, (os.cpu_count() or 4)))
-        self.notify = notify
-
-    def _clean_if_needed(self, caminho: str) -> str:
-        # IMPORTANTE: remover páginas em branco é custoso; use com parcimônia
-        return limpar_brancos_para_arquivo(caminho) if self.remover_brancos else caminho
-
-    def _build_one(self, caminho: str) -> Optional[Tuple[str, Dict]]:
+    info = {"caminho": caminho, "bytes": _tamanho(caminho), "paginas": 0, "criptografado": False,
+            "senha": False, "xref_quebrada": False, "erro": None,
+            "imagens": [], "bytes_imagens": 0, "dpi_max": 0, "bytes_fontes": 0}
+    try:
         try:
-            cleaned = self._clean_if_needed(caminho)
-            temp_out = os.path.join(tempfile.gettempdir(), f"temp_comp_ind_{os.getpid()}_{threading.get_ident()}_{os.path.basename(cleaned)}")
-            ok = gs_comprimir_para_pdf([cleaned], temp_out, qualidade=self.qualidade, notify=self.notify)
-            if not ok:
-                return None
-            info = {"cleaned": cleaned, "compressed": temp_out, "mb": _mb(temp_out)}
-            return caminho, info
-        except Exception as e:
-            print(f"[CompressCache] Falha em {caminho}: {e}")
-            return None
+            reader = PdfReader(caminho, strict=True)
+            if not reader.is_encrypted:
+                len(reader.pages)
+        except Exception:
+            # o modo tolerante reconstrói a xref: o arquivo abre, mas o GS pode reclamar
+            info["xref_quebrada"] = True
+            reader = PdfReader(caminho, strict=False)
+        if reader.is_encrypted:
+            info["criptografado"] = True
+            try:
+                if not reader.decrypt(""):
+                    info["senha"] = True
+                    return info
+            except Exception:
+                info["senha"] = True
+                return info
+        info["paginas"] = len(reader.pages)
+        vistas = set()
+        for page in reader.pages:
+            try:
+                larg_pol = float(page.mediabox.width) / 72.0
+                alt_pol = float(page.mediabox.height) / 72.0
+            except Exception:
+                larg_pol = alt_pol = 0.0
+            for img in _imagens_da_pagina(page):
+                ref = getattr(img, "indirect_reference", None)
+                chave = (ref.idnum, ref.generation) if ref is not None else id(img)
+                if chave in vistas:
+                    continue
+                vistas.add(chave)
+                n = len(img._data or b"")
+                try:
+                    dpi = max(int(img.get("/Width", 0)) / larg_pol, int(img.get("/Height", 0)) / alt_pol) if larg_pol and alt_pol else 0
+                except Exception:
+                    dpi = 0
+                info["imagens"].append((n, int(dpi)))
+                info["bytes_imagens"] += n
+                if n >= IMAGENS_MIN_BYTES:
+                    info["dpi_max"] = max(info["dpi_max"], int(dpi))
+        info["bytes_fontes"] = _bytes_fontes(reader)
+    except Exception as e:
+        info["erro"] = str(e) or e.__class__.__name__
+    return info
 
-    def build_many(self, caminhos: List[str]) -> List[Dict]:
-        self.notify.text("Pré-compressão paralela (modo preciso)")
-        self.notify.set_total(len(caminhos))
-        self.notify.step_to(0)
+def estimar_tamanho(info: Dict, qualidade: str, motor: str = "gs", resolucao: Optional[int] = None) -> int:
+    """
+    Estimativa grosseira (bytes) do PDF comprimido no preset: imagens caem com (DPI alvo / DPI)²
+    e com a qualidade JPEG do preset; fontes e o restante por fatores fixos (ANALISE_FATOR_*).
+    DPI alvo = resolucao (escolhida ou do modo auto); sem ela, o que a compressão usaria:
+    GS_RESOLUCAO_PADRAO no GS (ver _gs_opcoes), o DPI do preset no motor de imagens.
+    """
+    dpi_alvo, q = IMAGENS_PARAMETROS[qualidade]
+    if resolucao:
+        dpi_alvo = resolucao
+    elif motor == "gs":
+        dpi_alvo = GS_RESOLUCAO_PADRAO
+    fator_q = min(1.0, q / 75.0)
+    imagens = 0.0
+    for n, dpi in info.get("imagens", []):
+        escala = min(1.0, (dpi_alvo / dpi) ** 2) if dpi else 1.0
+        imagens += n * min(1.0, escala * fator_q) if n >= IMAGENS_MIN_BYTES else n
+    fontes = info.get("bytes_fontes", 0)
+    resto = max(0, info.get("bytes", 0) - info.get("bytes_imagens", 0) - fontes)
+    return int(imagens + fontes * ANALISE_FATOR_FONTES + resto * ANALISE_FATOR_TEXTO)
 
-        faltam = [c for c in caminhos if c not in self.cache]
-        done = 0
-        if faltam:
-            with ThreadPoolExecutor(max_workers=self.max_workers) as ex:
-                futs = {ex.submit(self._build_one, c): c for c in faltam}
-                for fut in as_completed(futs):
-                    res = fut.result()
-                    if res:
-                        key, info = res
-                        self.cache[key] = info
-                    else:
-                        c = futs[fut]
-                        self.cache[c] = {"cleaned": c, "compressed": None, "mb": float("inf")}
-                    done += 1
-                    self.notify.step_to(done)
-        if done < len(caminhos):
-            self.notify.step_to(len(caminhos))
-        return [self.cache.get(c, {"cleaned": c, "compressed": None, "mb": float("inf")}) for c in caminhos]
+def recomendar(analises: List[Dict], motor: str = "gs", resolucao: Optional[int] = None) -> Dict:
+    """
+    A partir das análises da lista: arquivos que vão falhar, preset, modo e nº de partes previsto.
+    {"problemas": [...], "avisos": [...], "qualidade", "turbo", "partes", "estimativas": {preset: bytes},
+     "resolucao_auto", "motivo"}
+    resolucao: a que a compressão vai usar (None = a de cada preset, ver estimar_tamanho).
+    resolucao_auto: degrau de AUTO_RESOLUCOES (com o preset correspondente) em que o modo auto deve parar.
+    """
+    limite = LIMITE_MB * 1024 * 1024
+    problemas, avisos = [], []
+    validas = []
+    for a in analises:
+        nome = os.path.basename(a["caminho"])
+        if a.get("erro"):
+            problemas.append(f"{nome}: ilegível ({a['erro']})")
+        elif a.get("senha"):
+            problemas.append(f"{nome}: protegido por senha")
+        else:
+            if a.get("xref_quebrada"):
+                avisos.append(f"{nome}: estrutura danificada (reparada na leitura)")
+            validas.append(a)
+    estimativas = {q: sum(estimar_tamanho(a, q, motor, resolucao) for a in validas) for q in QUALIDADES_GS}
+    rec = {"problemas": problemas, "avisos": avisos, "estimativas": estimativas,
+           "qualidade": "/screen", "turbo": True, "partes": 0, "resolucao_auto": AUTO_RESOLUCOES[-1], "motivo": ""}
+    if not validas:
+        return rec
+    # o modo auto desce os degraus até caber (mesmo critério de escolher_qualidade_auto)
+    rec["resolucao_auto"] = next(
+        (r for r in AUTO_RESOLUCOES
+         if sum(estimar_tamanho(a, _preset_para_resolucao(r), motor, r) for a in validas) <= limite * FATOR_PREVISAO),
+        AUTO_RESOLUCOES[-1])
+    original = sum(a.get("bytes", 0) for a in validas)
+    # o melhor preset que ainda cabe num arquivo; senão o menor
+    cabem = [q for q in QUALIDADES_GS if estimativas[q] <= limite * FATOR_PREVISAO]
+    rec["qualidade"] = cabem[-1] if cabem else QUALIDADES_GS[0]
+    total = estimativas[rec["qualidade"]]
+    rec["partes"] = max(1, math.ceil(total / limite))
+    if original <= limite:
+        rec["motivo"] = "Já cabe sem comprimir: \"Somente unir\" basta."
+    elif rec["partes"] == 1:
+        rec["motivo"] = "Deve caber num arquivo só: modo turbo (uma passada) é o mais rápido."
+    elif len(validas) > 1 and all(estimar_tamanho(a, rec["qualidade"], motor, resolucao) <= limite for a in validas):
+        rec["turbo"] = False
+        rec["motivo"] = "Cada documento cabe inteiro numa parte: o modo preciso evita cortar documentos no meio."
+    else:
+        rec["motivo"] = "Há documento maior que o limite: o modo turbo divide por páginas mais rápido."
+    if validas and sum(a.get("bytes_imagens", 0) for a in validas) < 0.1 * original:
+        avisos.append("Quase sem imagens: a compressão vai ganhar pouco.")
+    return rec
 
 # ===================== Lógica principal (worker) =====================
 
 def _split_single_pdf_por_paginas(input_pdf: str, base_saida: str, qualidade: str, start_ind: int,
-                                  remover_brancos: bool, notify: Notifier, cancel_flag: threading.Event) -> List[str]:
+                                  remover_brancos: bool, notify: Notifier, cancel_flag: threading.Event,
+                                  comprimido_pdf: Optional[str] = None,
+                                  stage: Optional[AreaStaging] = None, motor: str = "gs",
+                                  resolucao: Optional[int] = None) -> List[str]:
     """
-    Divide um único PDF em pedaços ≤ LIMITE_MB (saltos exponenciais + busca binária).
+    Divide um único PDF em pedaços ≤ LIMITE_MB.
+    As páginas são comprimidas UMA vez (comprimido_pdf, ou feita aqui se não for informada).
+    Quando essa compressão corresponde página a página à entrada, cada sondagem é só uma união
+    em memória de páginas já comprimidas (tamanho exato, sem GS) e as partes saem dela.
+    Senão, as fronteiras são previstas pelo EstimadorTamanho e o GS roda para gerar/confirmar
+    cada parte prevista, corrigindo a fronteira quando a previsão erra (~1 GS por parte).
     """
     out_paths: List[str] = []
-    reader = PdfReader(input_pdf)
-    N = len(reader.pages)
+    indice = IndicePaginas(input_pdf)   # parse único; cada sondagem só copia o intervalo
+    N = indice.n_paginas
     i = 0
     indice_parte = start_ind
 
     notify.text("Dividindo PDF grande por páginas")
     notify.subtext(os.path.basename(input_pdf))
 
-    def comp_range(k: int) -> Tuple[Optional[str], float]:
-        tmp_unido = os.path.join(tempfile.gettempdir(), f"temp_chunk_{os.getpid()}_{threading.get_ident()}.pdf")
-        escrever_intervalo_de_paginas(input_pdf, i, min(i + k, N), tmp_unido, remover_brancos=remover_brancos)
-        tmp_out = os.path.join(tempfile.gettempdir(), f"temp_chunk_comp_{os.getpid()}_{threading.get_ident()}.pdf")
-        ok = gs_comprimir_para_pdf([tmp_unido], tmp_out, qualidade=qualidade, notify=notify)
-        try: os.remove(tmp_unido)
-        except Exception: pass
-        if not ok:
-            return None, 0.0
-        return tmp_out, _mb(tmp_out)
-
-    while i < N and not cancel_flag.is_set():
-        best_ok = 0
-        high = 1
-
-        # crescimento exponencial
-        while not cancel_flag.is_set():
-            tmp_path, size_mb = comp_range(high)
-            if tmp_path is None:
-                break
-            if size_mb <= LIMITE_MB:
-                best_ok = high
-                try: os.remove(tmp_path)
-                except Exception: pass
-                high *= 2
-                if i + best_ok >= N:
+    # sondagens e temporários vão para a área do job (ou uma própria, apagada no fim)
+    area_propria = stage is None
+    if area_propria:
+        stage = AreaStaging()
+    tmp_base = None
+    comprimido_ok = comprimido_pdf is not None
+    if comprimido_pdf is None:
+        tmp_base = stage.novo_caminho("base_", ".pdf", _tamanho(input_pdf))
+        comprimido_ok = comprimir_para_pdf([input_pdf], tmp_base, qualidade=qualidade, notify=notify, stage=stage,
+                                           motor=motor, resolucao=resolucao, cancel_flag=cancel_flag)
+        comprimido_pdf = tmp_base if comprimido_ok else input_pdf
+    estimador = EstimadorTamanho(comprimido_pdf)
+    alinhado = estimador.n_paginas == N
+    if not alinhado:
+        # páginas não correspondem (ex.: brancos removidos só na versão comprimida): estima pela própria entrada
+        estimador = EstimadorTamanho(input_pdf)
+
+    # páginas já comprimidas, endereçáveis uma a uma: as partes saem delas sem novo GS
+    fatias: Optional[IndicePaginas] = None
+    if comprimido_ok and alinhado:
+        try:
+            fatias = indice if os.path.abspath(comprimido_pdf) == os.path.abspath(input_pdf) else IndicePaginas(comprimido_pdf)
+        except Exception:
+            fatias = None
+
+    def medir(k: int) -> Tuple[bytes, int]:
+        with notify.span("sondagem", pagina_inicial=i + 1, paginas=min(k, N - i), tentativa="memoria") as sp:
+            dados, n = fatias.intervalo_em_memoria(i, min(i + k, N), remover_brancos=remover_brancos)
+            sp["bytes_out"] = len(dados)
+            return dados, n
+
+    def comp_range(k: int, tag: str) -> Optional[bytes]:
+        # intervalo e resultado em memória (GS por pipes): só a parte aceita vai para o disco
+        with notify.span("sondagem", pagina_inicial=i + 1, paginas=min(k, N - i), tentativa=tag) as sp:
+            bruto, _ = indice.intervalo_em_memoria(i, min(i + k, N), remover_brancos=remover_brancos, compacto=False)
+            sp["bytes_in"] = len(bruto)
+            comprimido = comprimir_para_bytes(bruto, qualidade, notify, stage=stage, motor=motor,
+                                              resolucao=resolucao, cancel_flag=cancel_flag)
+            sp["bytes_out"] = len(comprimido) if comprimido is not None else 0
+            return comprimido
+
+    limite_bytes = LIMITE_MB * 1024 * 1024
+    try:
+        try:
+            while fatias is not None and i < N and not cancel_flag.is_set():
+                k = max(1, min(N - i, estimador.paginas_que_cabem(i, limite_bytes * FATOR_PREVISAO)))
+                dados, n = medir(k)
+                while len(dados) > limite_bytes and k > 1 and not cancel_flag.is_set():
+                    estimador.calibrar(i, i + k, len(dados))
+                    k = max(1, min(k - 1, int(k * (limite_bytes / len(dados)) * FATOR_PREVISAO)))
+                    dados, n = medir(k)
+                if cancel_flag.is_set():
                     break
-            else:
-                try: os.remove(tmp_path)
-                except Exception: pass
+                # medir é barato: avança em passos dobrados e fecha por busca binária no maior k que cabe
+                if len(dados) <= limite_bytes:
+                    estimador.calibrar(i, i + k, len(dados))
+                    lo, hi = k, N - i + 1
+                    passo = max(1, estimador.paginas_que_cabem(i, limite_bytes) - k)
+                    while lo < N - i and not cancel_flag.is_set():
+                        t = min(N - i, lo + passo)
+                        d, nt = medir(t)
+                        if len(d) > limite_bytes:
+                            hi = t
+                            break
+                        lo, dados, n = t, d, nt
+                        passo *= 2
+                    while hi - lo > 1 and not cancel_flag.is_set():
+                        meio = (lo + hi) // 2
+                        d, nm = medir(meio)
+                        if len(d) > limite_bytes:
+                            hi = meio
+                        else:
+                            lo, dados, n = meio, d, nm
+                    k = lo
+                if cancel_flag.is_set():
+                    break
+                if n:
+                    saida = _nome_parte(base_saida, indice_parte)
+                    with open(saida, "wb") as f:
+                        f.write(dados)
+                    out_paths.append(saida)
+                    indice_parte += 1
+                    notify.subtext(f"Gerada parte {indice_parte - start_ind}")
+                i += k
+        except Exception as e:
+            # cópia em memória falhou (PDF exótico): o restante segue pelo caminho com GS
+            notify.warn(f"Divisão sem GS falhou ({e}); seguindo com GS por parte.")
+
+        while i < N and not cancel_flag.is_set():
+            k = max(1, min(N - i, estimador.paginas_que_cabem(i, limite_bytes * FATOR_PREVISAO)))
+
+            # confirma a previsão; se estourar, reduz proporcionalmente ao excesso
+            dados_ok = comp_range(k, "a")
+            while dados_ok is not None and len(dados_ok) > limite_bytes and k > 1 and not cancel_flag.is_set():
+                estimador.calibrar(i, i + k, len(dados_ok))
+                k = max(1, min(k - 1, int(k * (limite_bytes / len(dados_ok)) * FATOR_PREVISAO)))
+                dados_ok = comp_range(k, "a")
+            if dados_ok is None:
+                if not cancel_flag.is_set():
+                    notify.error(f"Falha ao comprimir páginas {i + 1}–{i + k} de {os.path.basename(input_pdf)}.")
                 break
+            estimador.calibrar(i, i + k, len(dados_ok))
+
+            # previsão pessimista demais: uma tentativa de crescer com o fator já calibrado
+            if len(dados_ok) < limite_bytes * 0.85 and i + k < N and not cancel_flag.is_set():
+                k2 = min(N - i, estimador.paginas_que_cabem(i, limite_bytes * FATOR_PREVISAO))
+                if k2 > k:
+                    dados_maior = comp_range(k2, "b")
+                    if dados_maior is not None and len(dados_maior) <= limite_bytes:
+                        dados_ok, k = dados_maior, k2
 
-        if best_ok == 0:
-            tmp_single, _ = comp_range(1)
             saida = _nome_parte(base_saida, indice_parte)
-            shutil.move(tmp_single, saida)
+            with open(saida, "wb") as f:
+                f.write(dados_ok)
             out_paths.append(saida)
             indice_parte += 1
-            i += 1
+            i += k
             notify.subtext(f"Gerada parte {indice_parte - start_ind}")
-            continue
-
-        lo, hi = best_ok, min(high, N - i)
-        while lo < hi and not cancel_flag.is_set():
-            mid = (lo + hi + 1) // 2
-            tmp_mid, size_mb = comp_range(mid)
-            if tmp_mid is None:
-                break
-            if size_mb <= LIMITE_MB:
-                try: os.remove(tmp_mid)
-                except Exception: pass
-                lo = mid
-            else:
-                try: os.remove(tmp_mid)
-                except Exception: pass
-                hi = mid - 1
-
-        tmp_ok, _ = comp_range(lo)
-        saida = _nome_parte(base_saida, indice_parte)
-        shutil.move(tmp_ok, saida)
-        out_paths.append(saida)
-        indice_parte += 1
-        i += lo
-        notify.subtext(f"Gerada parte {indice_parte - start_ind}")
+    finally:
+        stage.liberar(tmp_base)
+        if area_propria:
+            stage.fechar()
 
     return out_paths
 
 def processar_com_limite_worker(arquivos_ordenados: List[str], destino_final: str, qualidade: str,
                                 remover_brancos: bool, modo_turbo: bool,
-                                notify: Notifier, cancel_flag: threading.Event) -> List[str]:
+                                notify: Notifier, cancel_flag: threading.Event,
+                                compressao_paralela: bool = False, executor: Optional[Executor] = None,
+                                cache_disco: Optional[CacheDisco] = None, motor: str = "gs",
+                                duplicatas: str = "desligado") -> List[str]:
+    """
+    executor/cache_disco permitem que vários jobs (lote) compartilhem o pool de threads
+    e o cache de compressão; sem eles, cada job cria os seus.
+    motor: "gs" (Ghostscript) ou "imagens" (recodifica só as imagens embutidas, ver MOTORES).
+    qualidade pode ser QUALIDADE_AUTO: preset e resolução são escolhidos por amostragem.
+    duplicatas: um de DUPLICATAS_MODOS; o relatório vai para <destino>.duplicatas.json.
+    """
     if cancel_flag.is_set():
         return []
+    with _rastro_do_job(notify):
+        with notify.span("job", arquivos=len(arquivos_ordenados), qualidade=qualidade, motor=motor,
+                         modo="turbo" if modo_turbo else "preciso",
+                         bytes_in=sum(_tamanho(p) for p in arquivos_ordenados)) as sp:
+            # um único diretório de staging para todas as chamadas ao GS deste job
+            with AreaStaging() as stage:
+                partes = _processar_com_limite(arquivos_ordenados, destino_final, qualidade, remover_brancos, modo_turbo,
+                                               notify, cancel_flag, compressao_paralela, stage, executor, cache_disco, motor,
+                                               duplicatas)
+            sp["partes"] = len(partes)
+            sp["bytes_out"] = sum(_tamanho(p) for p in partes)
+            return partes
+
+@contextmanager
+def _rastro_do_job(notify: Notifier):
+    # um rastro (spans JSONL) por job, a não ser que quem chamou já tenha posto um no notify
+    rastreador_proprio = None
+    if RASTROS_ATIVO and notify.rastreador is None:
+        try:
+            rastreador_proprio = notify.rastreador = Rastreador()
+        except Exception:
+            pass
+    try:
+        yield
+    finally:
+        if rastreador_proprio is not None:
+            rastreador_proprio.fechar()
+            notify.rastreador = None
+
+def _processar_com_limite(arquivos_ordenados: List[str], destino_final: str, qualidade: str,
+                          remover_brancos: bool, modo_turbo: bool,
+                          notify: Notifier, cancel_flag: threading.Event,
+                          compressao_paralela: bool, stage: AreaStaging,
+                          executor: Optional[Executor], cache_disco: Optional[CacheDisco],
+                          motor: str = "gs", duplicatas: str = "desligado") -> List[str]:
 
     # 0) Remoção de brancos (opcional – custa I/O/CPU)
     notify.text("Preparando documentos")
-    cleaned_inputs = [limpar_brancos_para_arquivo(p) for p in arquivos_ordenados] if remover_brancos else list(arquivos_ordenados)
+    cleaned_inputs = list(arquivos_ordenados)
+    if remover_brancos:
+        cleaned_inputs = []
+        for p in arquivos_ordenados:
+            with notify.span("brancos", arquivo=os.path.basename(p), bytes_in=_tamanho(p)) as sp:
+                limpo = limpar_brancos_para_arquivo(p, notify=notify, area=stage)
+                sp["bytes_out"] = _tamanho(limpo)
+            cleaned_inputs.append(limpo)
 
-    # 1) Comprime tudo em um só (sempre fazemos isso — é 1 chamada ao GS)
+    # 0b) Páginas/documentos repetidos no conjunto (a primeira ocorrência fica)
+    if duplicatas != "desligado":
+        cleaned_inputs = deduplicar_arquivos(cleaned_inputs, duplicatas, notify,
+                                             relatorio_json=os.path.splitext(destino_final)[0] + ".duplicatas.json",
+                                             area=stage)
+        if not cleaned_inputs:
+            notify.error("Nenhuma página restou após remover as duplicatas.")
+            return []
+        if cancel_flag.is_set():
+            return []
+
+    resolucao = None
+    if qualidade == QUALIDADE_AUTO:
+        with notify.span("auto") as sp:
+            qualidade, resolucao = escolher_qualidade_auto(cleaned_inputs, notify, stage=stage, motor=motor,
+                                                           cancel_flag=cancel_flag)
+            sp.update(qualidade=qualidade, resolucao=resolucao)
+        notify.subtext(f"Qualidade automática: {qualidade} a {resolucao} dpi")
+        if cancel_flag.is_set():
+            return []
+
+    if not modo_turbo:
+        return _processar_preciso(cleaned_inputs, destino_final, qualidade, notify, cancel_flag, stage,
+                                  executor, cache_disco, motor, resolucao)
+
+    # 1) MODO TURBO: comprime tudo em um só (1 chamada ao GS, ou uma por fatia de páginas em paralelo)
     notify.text("Comprimindo conjunto inteiro")
     notify.subtext("Passo 1/2")
-    notify.set_total(1); notify.step_to(0)
+    total_paginas = _contar_paginas(cleaned_inputs)
+    notify.set_total(max(1, total_paginas)); notify.step_to(0)
+    ao_paginar = (lambda n: notify.step_to(min(n, total_paginas))) if total_paginas else None
 
-    if not gs_comprimir_para_pdf(cleaned_inputs, destino_final, qualidade=qualidade, notify=notify):
+    with notify.span("passo1", arquivos=len(cleaned_inputs), bytes_in=sum(_tamanho(p) for p in cleaned_inputs)) as sp:
+        if compressao_paralela and motor == "gs":   # o motor de imagens já paraleliza por imagem
+            ok = gs_comprimir_em_fatias(cleaned_inputs, destino_final, qualidade=qualidade, notify=notify, cancel_flag=cancel_flag, stage=stage,
+                                        executor=executor, resolucao=resolucao, ao_paginar=ao_paginar)
+        else:
+            ok = comprimir_para_pdf(cleaned_inputs, destino_final, qualidade=qualidade, notify=notify, stage=stage, motor=motor,
+                                    resolucao=resolucao, cancel_flag=cancel_flag, ao_paginar=ao_paginar)
+        sp["bytes_out"] = _tamanho(destino_final) if ok else 0
+    if not ok:
+        if cancel_flag.is_set():
+            return []
         notify.error("Falha ao comprimir PDF único.")
         return []
-    notify.step_to(1)
+    notify.step_to(max(1, total_paginas))
     tam = _mb(destino_final)
     if tam <= LIMITE_MB:
         notify.info(f"✅ PDF comprimido salvo com {tam:.2f} MB\n\n{destino_final}")
         return [destino_final]
 
-    # 2A) MODO TURBO: dividir o PDF já comprimido por páginas (bem rápido, pouquíssimos GS)
-    if modo_turbo:
-        notify.text("Modo Turbo: dividindo por páginas")
+    # 2) dividir o PDF já comprimido por páginas (bem rápido, pouquíssimos GS)
+    notify.text("Modo Turbo: dividindo por páginas")
+    with notify.span("divisao", arquivo=os.path.basename(destino_final), bytes_in=_tamanho(destino_final)) as sp:
         partes = _split_single_pdf_por_paginas(destino_final, destino_final, qualidade,
-                                               start_ind=1, remover_brancos=False, notify=notify, cancel_flag=cancel_flag)
-        # opcional: remover o "inteiro" que estourou
-        try:
-            if os.path.exists(destino_final) and partes:
-                os.remove(destino_final)
-        except Exception:
-            pass
-        return _finalizar_partes_existentes(partes, notify)
+                                               start_ind=1, remover_brancos=False, notify=notify, cancel_flag=cancel_flag,
+                                               comprimido_pdf=destino_final, stage=stage, motor=motor, resolucao=resolucao)
+        sp["partes"] = len(partes)
+    # opcional: remover o "inteiro" que estourou
+    try:
+        if os.path.exists(destino_final) and partes:
+            os.remove(destino_final)
+    except Exception:
+        pass
+    return _finalizar_partes_existentes(partes, notify)
 
-    # 2B) MODO PRECISO: pré-comprime cada PDF em paralelo e une sem recomprimir
+def _processar_preciso(cleaned_inputs: List[str], destino_final: str, qualidade: str, notify: Notifier,
+                       cancel_flag: threading.Event, stage: AreaStaging, executor: Optional[Executor],
+                       cache_disco: Optional[CacheDisco], motor: str, resolucao: Optional[int]) -> List[str]:
+    """
+    MODO PRECISO: pré-comprime cada PDF em paralelo e une sem recomprimir. Não passa o conjunto
+    inteiro pelo GS: cada arquivo sai do CacheDisco quando o caso é refeito, e se tudo couber
+    numa parte ela é gravada no próprio destino.
+    """
     notify.text("Modo Preciso: pré-compressão paralela")
-    cache = CompressCache(qualidade=qualidade, remover_brancos=False, max_workers=None, notify=notify)
-    infos = cache.build_many(cleaned_inputs)
+    cache = CompressCache(qualidade=qualidade, remover_brancos=False, max_workers=None, notify=notify, stage=stage,
+                          cache_disco=cache_disco, executor=executor, motor=motor, resolucao=resolucao,
+                          cancel_flag=cancel_flag)
+    with notify.span("pre_compressao", arquivos=len(cleaned_inputs)):
+        infos = cache.build_many(cleaned_inputs)
 
     # filtra falhas
     validos: List[Dict] = []
-    grandoes: List[str] = []
+    grandoes: List[Dict] = []
     for info in infos:
         if info["compressed"] is None or info["mb"] == float("inf"):
             continue
         # se um arquivo já comprimido continuar > 5MB, marca para dividir por páginas
         if info["mb"] > LIMITE_MB:
-            grandoes.append(info["cleaned"])
+            grandoes.append(info)
         else:
             validos.append(info)
 
@@ -516,70 +3781,150 @@ def processar_com_limite_worker(arquivos_ordenados: List[str], destino_final: st
         notify.error("Nenhum PDF pôde ser processado.")
         return []
 
-    # trata arquivos que ainda estão > 5MB individualmente
+    partes_saida = _gerar_partes_preciso(validos, grandoes, destino_final, qualidade, notify, cancel_flag, stage,
+                                         executor, cache.max_workers, motor, resolucao, inteiro_no_destino=True)
+    if partes_saida is None:
+        return []
+    if partes_saida == [destino_final]:
+        notify.info(f"✅ PDF comprimido salvo com {_mb(destino_final):.2f} MB\n\n{destino_final}")
+        return partes_saida
+    return _finalizar_partes_existentes(partes_saida, notify)
+
+def _gerar_partes_preciso(validos: List[Dict], grandoes: List[Dict], destino_final: str, qualidade: str,
+                          notify: Notifier, cancel_flag: threading.Event, stage: AreaStaging,
+                          executor: Optional[Executor], max_workers: int, motor: str, resolucao: Optional[int],
+                          primeira: int = 1, inteiro_no_destino: bool = False,
+                          sobrescrever: bool = True) -> Optional[List[str]]:
+    """
+    Parte final do modo preciso, sobre documentos já comprimidos (infos do CompressCache): divide
+    os grandões por páginas e agrupa os demais sem recomprimir. As partes são numeradas a partir
+    de `primeira`. Com inteiro_no_destino, se tudo couber numa parte só ela é gravada em
+    destino_final (sem sufixo). sobrescrever=False recusa gravar sobre uma parte que já exista.
+    None em falha ou cancelamento.
+    """
+    # trata arquivos que ainda estão > 5MB individualmente (em paralelo, no mesmo pool da pré-compressão)
     partes_saida: List[str] = []
-    for src in grandoes:
-        notify.subtext(f"Dividindo documento grande: {os.path.basename(src)}")
-        partes = _split_single_pdf_por_paginas(src, destino_final, qualidade,
-                                               start_ind=len(partes_saida) + 1,
-                                               remover_brancos=False, notify=notify, cancel_flag=cancel_flag)
-        partes_saida.extend(partes)
-
-    # agrupa os demais (já comprimidos) somando tamanhos
-    # usa margem para evitar que o arquivo final ultrapasse por overhead da junção
-    budget = LIMITE_MB - MARGEM_MB
-    grupos: List[List[str]] = []
-    atual: List[str] = []
-    soma = 0.0
-    for info in validos:
-        if soma + info["mb"] <= budget:
-            atual.append(info["compressed"]); soma += info["mb"]
-        else:
-            if atual:
-                grupos.append(atual)
-            atual = [info["compressed"]]; soma = info["mb"]
-    if atual:
-        grupos.append(atual)
+    if grandoes:
+        partes_saida = _dividir_grandoes(grandoes, destino_final, qualidade, notify, cancel_flag, stage,
+                                         executor, max_workers, motor, resolucao, primeira, sobrescrever)
+        if partes_saida is None or cancel_flag.is_set():
+            return None
 
-    # gera cada parte unindo sem recomprimir
-    if grupos:
+    # agrupa os demais (já comprimidos) no menor número de partes, mantendo a ordem;
+    # o overhead da junção é medido em memória em vez de estimado por uma margem fixa
+    if validos:
         notify.text("Gerando partes (sem recompressão)")
-        notify.set_total(len(grupos)); notify.step_to(0)
-        for i, grupo in enumerate(grupos, start=1):
-            saida = _nome_parte(destino_final, len(partes_saida) + 1)
-            ok = unir_pdfs_sem_recomprimir(grupo, saida)
-            if not ok:
-                # se por algum motivo ultrapassar, faz “refino” dividindo o grupo
-                notify.warn(f"Parte {i}: união direta falhou — tentando dividir grupo.")
-                # divide pela metade até dar
-                left = grupo
-                while left:
-                    chunk = left[:max(1, len(left)//2)]
-                    left = left[len(chunk):]
-                    saida = _nome_parte(destino_final, len(partes_saida) + 1)
-                    if unir_pdfs_sem_recomprimir(chunk, saida) and _mb(saida) <= LIMITE_MB:
-                        partes_saida.append(saida)
-                    else:
-                        # fallback final: recomprime esse pedaço via GS
-                        if os.path.exists(saida):
-                            try: os.remove(saida)
-                            except Exception: pass
-                        if not gs_comprimir_para_pdf(chunk, saida, qualidade=qualidade, notify=notify):
-                            notify.error("Falha ao gerar parte mesmo após divisão/refino.")
-                            return []
-                        partes_saida.append(saida)
+        comprimidos = [info["compressed"] for info in validos]
+        limite = int(LIMITE_MB * 1024 * 1024)
+        base, contrib = _medir_contribuicoes(comprimidos)
+        recursos = [_recursos_compartilhaveis(p) for p in comprimidos] if UNIAO_DEDUP_RECURSOS else None
+        pendentes = particionar_ordenado(contrib, limite, base, recursos)
+        notify.set_total(len(pendentes)); notify.step_to(0)
+        geradas = 0
+        while pendentes:
+            a, b = pendentes.pop(0)
+            with notify.span("uniao", arquivos=b - a, bytes_in=sum(_tamanho(p) for p in comprimidos[a:b])) as sp:
+                dados = _unir_em_memoria(comprimidos[a:b])
+                sp["bytes_out"] = len(dados) if dados is not None else 0
+            if dados is None:
+                notify.error("Falha ao gerar parte: nenhuma página encontrada.")
+                return None
+            if len(dados) > limite and b - a > 1:
+                # raro: a união real passou do medido — reparticiona só este trecho descontando o excesso
+                previsto = base + sum(contrib[a:b]) - (_economia_dedup(recursos, a, b) if recursos else 0)
+                excesso = len(dados) - previsto
+                sub = particionar_ordenado(contrib[a:b], limite - max(1, excesso), base,
+                                           recursos[a:b] if recursos else None)
+                if len(sub) == 1:
+                    meio = (b - a) // 2
+                    sub = [(0, meio), (meio, b - a)]
+                pendentes = [(a + x, a + y) for x, y in sub] + pendentes
+                notify.set_total(geradas + len(pendentes))
                 continue
 
-            # checa tamanho final; se por algum motivo passou, recomprime só esta parte
-            if _mb(saida) > LIMITE_MB:
-                notify.subtext(f"Ajustando parte {len(partes_saida) + 1}…")
-                if not gs_comprimir_para_pdf(grupo, saida, qualidade=qualidade, notify=notify):
+            if inteiro_no_destino and not grandoes and (a, b) == (0, len(comprimidos)) and len(dados) <= limite:
+                with open(destino_final, "wb") as fo:
+                    fo.write(dados)
+                return [destino_final]
+            saida = _nome_parte(destino_final, primeira + len(partes_saida))
+            if not sobrescrever and os.path.exists(saida):
+                notify.error(f"{os.path.basename(saida)} já existe e não foi sobrescrito.")
+                return None
+            if len(dados) > limite:
+                # arquivo único que passou do limite só na reescrita: último recurso é o GS
+                notify.subtext(f"Ajustando parte {primeira + len(partes_saida)}…")
+                if not comprimir_para_pdf(comprimidos[a:b], saida, qualidade=qualidade, notify=notify, stage=stage, motor=motor,
+                                          resolucao=resolucao, cancel_flag=cancel_flag):
                     notify.error("Falha ao ajustar parte.")
-                    return []
+                    return None
+            else:
+                with open(saida, "wb" if sobrescrever else "xb") as fo:
+                    fo.write(dados)
             partes_saida.append(saida)
-            notify.step_to(i)
+            geradas += 1
+            notify.step_to(geradas)
 
-    return _finalizar_partes_existentes(partes_saida, notify)
+    return partes_saida
+
+def _dividir_grandoes(grandoes: List[Dict], destino_final: str, qualidade: str, notify: Notifier,
+                      cancel_flag: threading.Event, stage: AreaStaging, executor: Optional[Executor],
+                      max_workers: int, motor: str, resolucao: Optional[int], primeira: int = 1,
+                      sobrescrever: bool = True) -> Optional[List[str]]:
+    """
+    Divide por páginas cada documento que continuou acima do limite após a pré-compressão, todos ao
+    mesmo tempo. Cada divisão grava numa pasta própria da área do job; só no fim as partes vão para
+    _parte_01, _parte_02… (a partir de `primeira`) na ordem dos documentos — os mesmos nomes da divisão um a um.
+    Se qualquer divisão falhar (exceção ou páginas faltando) nada vai para o destino e retorna None,
+    como no cancelamento: o conjunto nunca sai sem as páginas de um documento.
+    sobrescrever=False: se algum desses nomes já existir, nada é movido e retorna None.
+    """
+    pastas: Dict[int, str] = {}
+
+    def dividir(n: int, info: Dict) -> List[str]:
+        with notify.span("divisao", arquivo=os.path.basename(info["cleaned"]), bytes_in=_tamanho(info["cleaned"])) as sp:
+            pasta = pastas[n] = stage.novo_diretorio(f"divisao{n:02d}_", _tamanho(info["compressed"]))
+            partes = _split_single_pdf_por_paginas(info["cleaned"], os.path.join(pasta, "divisao.pdf"), qualidade,
+                                                   start_ind=1, remover_brancos=False, notify=notify, cancel_flag=cancel_flag,
+                                                   comprimido_pdf=info["compressed"], stage=stage, motor=motor,
+                                                   resolucao=resolucao)
+            sp["partes"] = len(partes)
+            if not cancel_flag.is_set() and _contar_paginas(partes) != _contar_paginas([info["cleaned"]]):
+                raise RuntimeError("divisão incompleta, faltam páginas")
+            return partes
+
+    notify.text(f"Dividindo {len(grandoes)} documento(s) grande(s)")
+    resultados: Dict[int, List[str]] = {}
+    falhou = False
+    pool = nullcontext(executor) if executor else ThreadPoolExecutor(max_workers=min(max_workers, len(grandoes)))
+    with pool as ex:
+        futs = {ex.submit(dividir, n, info): n for n, info in enumerate(grandoes)}
+        for fut in as_completed(futs):
+            try:
+                resultados[futs[fut]] = fut.result()
+            except Exception as e:
+                if not falhou:
+                    notify.error(f"Falha ao dividir {os.path.basename(grandoes[futs[fut]]['cleaned'])}: {e}")
+                falhou = True
+                for outro in futs:
+                    outro.cancel()   # as que ainda não começaram nem rodam
+
+    temporarias = [p for n in sorted(resultados) for p in resultados[n]]
+    ocupados = [] if sobrescrever or falhou else [_nome_parte(destino_final, primeira + i) for i in range(len(temporarias))
+                                                 if os.path.exists(_nome_parte(destino_final, primeira + i))]
+    if falhou or cancel_flag.is_set() or ocupados:
+        for pasta in pastas.values():
+            stage.liberar(pasta)   # inclusive as partes que uma divisão com falha já tinha gravado
+        if ocupados:
+            notify.error("Já existem e não foram sobrescritos:\n" + "\n".join(os.path.basename(p) for p in ocupados))
+        return None
+    partes: List[str] = []
+    for p in temporarias:
+        saida = _nome_parte(destino_final, primeira + len(partes))
+        shutil.move(p, saida)   # a área pode estar em RAM (outro sistema de arquivos)
+        partes.append(saida)
+    for pasta in pastas.values():
+        stage.liberar(pasta)
+    return partes
 
 def _finalizar_partes_existentes(partes_geradas: List[str], notify: Notifier) -> List[str]:
     if partes_geradas:
@@ -587,6 +3932,145 @@ def _finalizar_partes_existentes(partes_geradas: List[str], notify: Notifier) ->
         notify.info(f"✅ Excedeu {LIMITE_MB:.0f} MB e foi fragmentado em {len(partes_geradas)} parte(s):\n\n{lista_str}")
     return partes_geradas
 
+# ===================== Acréscimo a um conjunto já gerado =====================
+
+def _partes_numeradas(destino_final: str) -> List[Tuple[int, str]]:
+    """
+    (número, caminho) de cada parte já gerada para destino_final, em ordem. O próprio destino_final
+    é a parte 1 quando não há _parte_01 (o conjunto coube num arquivo só e depois ganhou partes).
+    """
+    pasta = os.path.dirname(destino_final)
+    base, ext = os.path.splitext(os.path.basename(destino_final))
+    padrao = re.compile(re.escape(base) + r"_parte_(\d+)" + re.escape(ext))
+    try:
+        nomes = os.listdir(pasta or ".")
+    except Exception:
+        nomes = []
+    partes = []
+    for nome in nomes:
+        m = padrao.fullmatch(nome)
+        if m and int(m.group(1)) > 0 and os.path.isfile(os.path.join(pasta, nome)):
+            partes.append((int(m.group(1)), os.path.join(pasta, nome)))
+    if os.path.isfile(destino_final) and not any(n == 1 for n, _ in partes):
+        partes.append((1, destino_final))
+    return sorted(partes)
+
+def partes_existentes(destino_final: str) -> List[str]:
+    """
+    Partes já geradas para destino_final, na ordem: destino_final (se coube num arquivo só) e/ou
+    _parte_NN. Vazio se ainda não há nada.
+    """
+    return [p for _, p in _partes_numeradas(destino_final)]
+
+def acrescentar_worker(novos: List[str], destino_final: str, qualidade: str, remover_brancos: bool,
+                       notify: Notifier, cancel_flag: threading.Event, executor: Optional[Executor] = None,
+                       cache_disco: Optional[CacheDisco] = None, motor: str = "gs") -> List[str]:
+    """
+    Acrescenta documentos a um conjunto já comprimido sem reprocessar o que existe: só os novos
+    são comprimidos; os que couberem entram, na ordem, na última parte por atualização incremental
+    (os bytes já protocolados ficam intactos, só há acréscimo no fim) e o resto vira partes novas,
+    numeradas depois da maior existente (nunca sobre uma que já exista), pelo caminho do modo preciso. As partes anteriores à última
+    nunca são tocadas. Sem conjunto existente, é o processar_com_limite_worker (modo preciso).
+    Retorna todas as partes do conjunto, na ordem.
+    """
+    if cancel_flag.is_set():
+        return []
+    existentes = partes_existentes(destino_final)
+    if not existentes:
+        return processar_com_limite_worker(novos, destino_final, qualidade, remover_brancos, False, notify, cancel_flag,
+                                           executor=executor, cache_disco=cache_disco, motor=motor)
+    with _rastro_do_job(notify):
+        with notify.span("acrescimo", arquivos=len(novos), partes_existentes=len(existentes), qualidade=qualidade,
+                         motor=motor, bytes_in=sum(_tamanho(p) for p in novos)) as sp:
+            with AreaStaging() as stage:
+                partes = _acrescentar(novos, destino_final, existentes, qualidade, remover_brancos, notify, cancel_flag,
+                                      stage, executor, cache_disco, motor)
+            sp["partes"] = len(partes)
+            return partes
+
+def _acrescentar(novos: List[str], destino_final: str, existentes: List[str], qualidade: str, remover_brancos: bool,
+                 notify: Notifier, cancel_flag: threading.Event, stage: AreaStaging,
+                 executor: Optional[Executor], cache_disco: Optional[CacheDisco], motor: str) -> List[str]:
+    notify.text("Preparando documentos novos")
+    entradas = list(novos)
+    if remover_brancos:
+        entradas = [limpar_brancos_para_arquivo(p, notify=notify, area=stage) for p in novos]
+    resolucao = None
+    if qualidade == QUALIDADE_AUTO:
+        qualidade, resolucao = escolher_qualidade_auto(entradas, notify, stage=stage, motor=motor, cancel_flag=cancel_flag)
+
+    cache = CompressCache(qualidade=qualidade, remover_brancos=False, max_workers=None, notify=notify, stage=stage,
+                          cache_disco=cache_disco, executor=executor, motor=motor, resolucao=resolucao,
+                          cancel_flag=cancel_flag)
+    with notify.span("pre_compressao", arquivos=len(entradas)):
+        infos = [info for info in cache.build_many(entradas) if info["compressed"] is not None and info["mb"] != float("inf")]
+    if cancel_flag.is_set():
+        return []
+    if not infos:
+        notify.error("Nenhum PDF novo pôde ser processado.")
+        return []
+    if len(infos) < len(entradas):
+        notify.warn(f"{len(entradas) - len(infos)} PDF(s) novo(s) não puderam ser comprimidos e ficaram de fora.")
+
+    # 1) completa a última parte, na ordem, enquanto o documento seguinte couber inteiro: uma só
+    #    atualização recebe um documento por vez; o que estoura é desfeito e fica para as partes novas
+    numerada = _partes_numeradas(destino_final)
+    ultima = existentes[-1]
+    limite = int(LIMITE_MB * 1024 * 1024)
+    notify.text(f"Completando {os.path.basename(ultima)}")
+    with open(ultima, "rb") as f:
+        original = f.read()
+    cabem, incremento = 0, b""
+    try:
+        atualizacao = AtualizacaoIncremental(original)
+    except Exception as e:
+        notify.warn(f"Não foi possível acrescentar a {os.path.basename(ultima)} ({e}); os novos vão para partes novas.")
+        atualizacao = None
+    while (atualizacao is not None and cabem < len(infos) and infos[cabem]["mb"] <= LIMITE_MB
+           and not cancel_flag.is_set()):
+        with notify.span("incremental", documento=cabem + 1, bytes_in=_tamanho(infos[cabem]["compressed"])) as sp:
+            antes = atualizacao.marcar()
+            try:
+                atualizacao.adicionar(infos[cabem]["compressed"])
+                sem_final = atualizacao.marcar()
+                atualizacao.finalizar()
+            except Exception as e:
+                notify.warn(f"Não foi possível acrescentar a {os.path.basename(ultima)} ({e}); os novos vão para partes novas.")
+                break
+            tamanho = len(atualizacao.dados())
+            sp["bytes_out"] = tamanho
+        if tamanho > limite:
+            atualizacao.desfazer(antes)
+            break
+        cabem, incremento = cabem + 1, atualizacao.bytes_novos()
+        atualizacao.desfazer(sem_final)   # tira o fechamento para poder acrescentar o próximo
+    if cancel_flag.is_set():
+        return []
+
+    # 2) o que sobrou vira partes novas, numeradas depois da maior existente, sem sobrescrever nada;
+    #    a última parte só é tocada depois que elas existirem
+    novas: List[str] = []
+    resto = infos[cabem:]
+    if resto:
+        validos = [info for info in resto if info["mb"] <= LIMITE_MB]
+        grandoes = [info for info in resto if info["mb"] > LIMITE_MB]
+        novas = _gerar_partes_preciso(validos, grandoes, destino_final, qualidade, notify, cancel_flag, stage,
+                                      executor, cache.max_workers, motor, resolucao, primeira=numerada[-1][0] + 1,
+                                      sobrescrever=False)
+        if novas is None:
+            return []
+    if incremento:
+        with open(ultima, "ab") as f:
+            f.write(incremento)
+
+    linhas = []
+    if incremento:
+        linhas.append(f"- {os.path.basename(ultima)} ({_mb(ultima):.2f} MB): +{cabem} documento(s), acréscimo incremental")
+    linhas += [f"- {os.path.basename(p)} ({_mb(p):.2f} MB): nova" for p in novas]
+    notify.info(f"✅ {len(infos)} documento(s) acrescentado(s); {len(existentes) - (1 if incremento else 0)} "
+                f"parte(s) anterior(es) intacta(s):\n\n" + "\n".join(linhas))
+    return existentes + novas
+
 # ===================== Diálogo de Progresso (UI, com %) =====================
 
 class ProgressDialog:
@@ -679,12 +4163,12 @@ class App:
     def __init__(self, root):
         self.root = root
         self.root.title("Compressor de PDFs")
-        self.root.geometry("680x520")
+        self.root.geometry("680x590")
         self.root.resizable(False, False)
 
         # Centralizar
         self.root.update_idletasks()
-        w, h = 680, 520
+        w, h = 680, 590
         x = (self.root.winfo_screenwidth() // 2) - (w // 2)
         y = (self.root.winfo_screenheight() // 2) - (h // 2)
         self.root.geometry(f"{w}x{h}+{x}+{y}")
@@ -698,8 +4182,17 @@ class App:
         self.qualidade = tk.StringVar(value="/ebook")
         self.remover_brancos = tk.BooleanVar(value=False)   # DESLIGADO por padrão (mais rápido)
         self.modo_turbo = tk.BooleanVar(value=True)         # LIGADO por padrão (bem mais rápido)
+        self.compressao_paralela = tk.BooleanVar(value=True)  # fatias em paralelo para PDFs grandes
+        self.motor = tk.StringVar(value="gs")                 # "imagens": recodifica só as imagens (scans/fotos)
+        self.duplicatas = tk.StringVar(value="desligado")     # ver DUPLICATAS_MODOS
+
+        # análise prévia: caminho -> resultado de analisar_pdf (None enquanto roda)
+        self.analises: Dict[str, Optional[Dict]] = {}
+        self._fila_analise: Queue = Queue()
+        self._recomendacao: Optional[Dict] = None
 
         self._construir_layout()
+        self._poll_analise()
 
     def _construir_layout(self):
         frame = tk.Frame(self.root, padx=14, pady=12); frame.pack(fill="both", expand=True)
@@ -708,6 +4201,7 @@ class App:
 
         self.lista = tk.Listbox(frame, selectmode=tk.EXTENDED, width=72, height=16)
         self.lista.grid(row=1, column=0, columnspan=5, sticky="nsew", padx=(0, 8))
+        self.lista.bind("<<ListboxSelect>>", lambda e: self._mostrar_analise())
 
         scroll = tk.Scrollbar(frame, orient="vertical", command=self.lista.yview)
         scroll.grid(row=1, column=5, sticky="ns")
@@ -720,38 +4214,59 @@ class App:
         tk.Button(col_btns, text="Mover ↓", width=18, command=self.mover_para_baixo).pack(pady=3)
         tk.Button(col_btns, text="Limpar lista", width=18, command=self.limpar_lista).pack(pady=3)
 
+        # Análise prévia (detalhe do item selecionado ou recomendação para a lista)
+        analise_frame = tk.Frame(frame); analise_frame.grid(row=2, column=0, columnspan=7, sticky="we", pady=(6, 0))
+        self.lbl_analise = tk.Label(analise_frame, text="", justify="left", anchor="w", wraplength=520, height=3)
+        self.lbl_analise.pack(side="left", fill="x", expand=True)
+        self.btn_recomendacao = tk.Button(analise_frame, text="Aplicar recomendação", state="disabled",
+                                          command=self.aplicar_recomendacao)
+        self.btn_recomendacao.pack(side="right")
+
         # Destino
-        destino_frame = tk.Frame(frame); destino_frame.grid(row=2, column=0, columnspan=7, sticky="we", pady=(10, 0))
+        destino_frame = tk.Frame(frame); destino_frame.grid(row=3, column=0, columnspan=7, sticky="we", pady=(10, 0))
         destino_frame.columnconfigure(1, weight=1)
         tk.Label(destino_frame, text="Salvar como:").grid(row=0, column=0, sticky="w")
         tk.Entry(destino_frame, textvariable=self.destino).grid(row=0, column=1, sticky="we", padx=6)
         tk.Button(destino_frame, text="Escolher…", command=self.escolher_destino).grid(row=0, column=2)
 
         # Opções
-        opts_frame = tk.Frame(frame); opts_frame.grid(row=3, column=0, columnspan=7, sticky="w", pady=(8, 0))
+        opts_frame = tk.Frame(frame); opts_frame.grid(row=4, column=0, columnspan=7, sticky="w", pady=(8, 0))
         tk.Label(opts_frame, text="Qualidade:").pack(side="left")
-        tk.OptionMenu(opts_frame, self.qualidade, *QUALIDADES_GS).pack(side="left", padx=6)
+        tk.OptionMenu(opts_frame, self.qualidade, *QUALIDADES_GS, QUALIDADE_AUTO).pack(side="left", padx=6)
         tk.Checkbutton(opts_frame, text="Remover páginas em branco (lento)", variable=self.remover_brancos).pack(side="left", padx=16)
         tk.Checkbutton(opts_frame, text="Modo turbo (mais rápido)", variable=self.modo_turbo).pack(side="left", padx=16)
 
+        opts2_frame = tk.Frame(frame); opts2_frame.grid(row=5, column=0, columnspan=7, sticky="w", pady=(4, 0))
+        tk.Checkbutton(opts2_frame, text="Compressão paralela (PDFs grandes)", variable=self.compressao_paralela).pack(side="left")
+        tk.Label(opts2_frame, text="Motor:").pack(side="left", padx=(16, 0))
+        tk.OptionMenu(opts2_frame, self.motor, *MOTORES).pack(side="left", padx=6)
+        tk.Label(opts2_frame, text="Duplicatas:").pack(side="left", padx=(16, 0))
+        tk.OptionMenu(opts2_frame, self.duplicatas, *DUPLICATAS_MODOS).pack(side="left", padx=6)
+
         # Rodapé
-        rodape = tk.Frame(frame); rodape.grid(row=4, column=0, columnspan=7, sticky="e", pady=(16, 0))
+        rodape = tk.Frame(frame); rodape.grid(row=6, column=0, columnspan=7, sticky="e", pady=(16, 0))
         tk.Button(rodape, text="Unir & Comprimir", width=18, command=self.unir_e_comprimir).pack(side="left", padx=(0, 8))
         tk.Button(rodape, text="Somente Unir", width=14, command=self.somente_unir).pack(side="left", padx=(0, 8))
+        tk.Button(rodape, text="Acrescentar às partes", width=18, command=self.acrescentar).pack(side="left", padx=(0, 8))
         tk.Button(rodape, text="Sair", width=10, command=self.root.destroy).pack(side="left")
 
     # --------- Ações Lista ---------
     def adicionar_pdfs(self):
         arquivos = filedialog.askopenfilenames(title="Selecione os arquivos PDF", filetypes=[("Arquivos PDF", "*.pdf")])
+        novos = []
         for a in arquivos:
             if a and a.lower().endswith(".pdf"):
                 self.lista.insert(tk.END, a)
+                novos.append(a)
+        if novos:
+            self._analisar(novos)
 
     def remover_selecionados(self):
         sel = list(self.lista.curselection())
         if not sel: return
         for idx in reversed(sel):
             self.lista.delete(idx)
+        self._mostrar_analise()
 
     def mover_para_cima(self):
         sel = list(self.lista.curselection())
@@ -779,6 +4294,105 @@ class App:
 
     def limpar_lista(self):
         self.lista.delete(0, tk.END)
+        self._mostrar_analise()
+
+    # --------- Análise prévia ---------
+    def _analisar(self, caminhos: List[str]):
+        # processos do pool (PyPDF2 é CPU puro); resultados voltam pela fila e _poll_analise os aplica
+        pendentes = [c for c in dict.fromkeys(caminhos) if c not in self.analises]
+        for c in pendentes:
+            self.analises[c] = None
+        if not pendentes:
+            self._mostrar_analise()
+            return
+
+        def rodar():
+            pool = _obter_pool_processos()
+            futs = {}
+            if pool is not None:
+                try:
+                    futs = {pool.submit(analisar_pdf, c): c for c in pendentes}
+                except Exception:
+                    futs = {}
+            for c in pendentes:
+                if c not in futs.values():
+                    self._fila_analise.put(analisar_pdf(c))
+            for fut in as_completed(futs):
+                try:
+                    self._fila_analise.put(fut.result())
+                except Exception as e:
+                    self._fila_analise.put({"caminho": futs[fut], "erro": str(e) or e.__class__.__name__})
+
+        self._mostrar_analise()
+        threading.Thread(target=rodar, daemon=True).start()
+
+    def _poll_analise(self):
+        chegou = False
+        try:
+            while True:
+                res = self._fila_analise.get_nowait()
+                self.analises[res["caminho"]] = res
+                chegou = True
+        except Empty:
+            pass
+        if chegou:
+            self._mostrar_analise()
+        self.root.after(150, self._poll_analise)
+
+    def _texto_analise(self, a: Dict) -> str:
+        nome = os.path.basename(a["caminho"])
+        if a.get("erro"):
+            return f"{nome}: ilegível ({a['erro']})"
+        if a.get("senha"):
+            return f"{nome}: protegido por senha"
+        partes = [f"{nome}: {a['paginas']} pág., {a['bytes'] / 1048576:.2f} MB"]
+        if a.get("imagens"):
+            partes.append(f"{len(a['imagens'])} imagem(ns) com {a['bytes_imagens'] / 1048576:.2f} MB"
+                          + (f" (~{a['dpi_max']} dpi)" if a.get("dpi_max") else ""))
+        if a.get("bytes_fontes"):
+            partes.append(f"fontes {a['bytes_fontes'] / 1024:.0f} KB")
+        if a.get("xref_quebrada"):
+            partes.append("estrutura danificada")
+        est = ", ".join(f"{q[1:]} {estimar_tamanho(a, q, self.motor.get()) / 1048576:.1f}" for q in QUALIDADES_GS)
+        return "; ".join(partes) + f"\nEstimativa (MB): {est}"
+
+    def _mostrar_analise(self):
+        itens = self._obter_arquivos_da_lista()
+        for i, c in enumerate(itens):
+            a = self.analises.get(c)
+            cor = "gray" if a is None else ("red" if a.get("erro") or a.get("senha")
+                                             else "darkorange" if a.get("xref_quebrada") else "black")
+            try: self.lista.itemconfig(i, fg=cor)
+            except Exception: pass
+
+        sel = list(self.lista.curselection())
+        if len(sel) == 1 and self.analises.get(itens[sel[0]]) is not None:
+            self.lbl_analise.config(text=self._texto_analise(self.analises[itens[sel[0]]]))
+            return
+        faltam = sum(1 for c in itens if self.analises.get(c) is None)
+        if not itens:
+            self._recomendacao = None
+            self.lbl_analise.config(text="")
+        elif faltam:
+            self._recomendacao = None
+            self.lbl_analise.config(text=f"Analisando {faltam} arquivo(s)…")
+        else:
+            rec = self._recomendacao = recomendar([self.analises[c] for c in itens], self.motor.get())
+            linhas = [f"Recomendado: {rec['qualidade']}, modo {'turbo' if rec['turbo'] else 'preciso'}"
+                      f" (~{rec['partes']} parte(s); no auto, ~{rec['resolucao_auto']} dpi). {rec['motivo']}"]
+            linhas += [f"⚠ {p}" for p in rec["problemas"][:2]] + rec["avisos"][:1]
+            self.lbl_analise.config(text="\n".join(linhas))
+        self.btn_recomendacao.config(state="normal" if self._recomendacao else "disabled")
+
+    def aplicar_recomendacao(self):
+        rec = self._recomendacao
+        if not rec:
+            return
+        self.qualidade.set(rec["qualidade"])
+        self.modo_turbo.set(rec["turbo"])
+        if rec["problemas"]:
+            messagebox.showwarning("Atenção", "Estes arquivos devem falhar; remova-os ou corrija antes:\n\n"
+                                   + "\n".join(rec["problemas"]))
 
     # --------- Destino / Execução ---------
     def escolher_destino(self):
@@ -801,30 +4415,33 @@ class App:
     def somente_unir(self):
         if not self._validar_pronto(exige_destino=True):
             return
-        arquivos = self._obter_arquivos_da_lista()
-        out = self.destino.get()
+        # brancos/duplicatas removidos viram temporários: somem junto com a área ao final
+        with AreaTrabalho() as area:
+            self._unir_arquivos(self._obter_arquivos_da_lista(), self.destino.get(), area)
 
-        writer = PdfWriter()
-        total = 0
-        for f in arquivos:
-            path_use = limpar_brancos_para_arquivo(f) if self.remover_brancos.get() else f
+    def _unir_arquivos(self, arquivos: List[str], out: str, area: AreaTrabalho):
+        if self.remover_brancos.get():
+            arquivos = [limpar_brancos_para_arquivo(f, area=area) for f in arquivos]
+        notify = Notifier(Queue())
+        if self.duplicatas.get() != "desligado":
             try:
-                r = PdfReader(path_use)
-                for p in r.pages:
-                    writer.add_page(p)
-                    total += 1
+                arquivos = deduplicar_arquivos(arquivos, self.duplicatas.get(), notify,
+                                               relatorio_json=os.path.splitext(out)[0] + ".duplicatas.json", area=area)
             except Exception as e:
-                messagebox.showerror("Erro", f"Falha ao ler {os.path.basename(f)}:\n{e}")
+                messagebox.showerror("Erro", f"Falha ao procurar duplicatas:\n{e}")
                 return
-        if total == 0:
-            messagebox.showwarning("Aviso", "Nenhuma página encontrada.")
-            return
+
+        # união em streaming (páginas direto para o disco, um PDF de origem por vez);
+        # se ela falhar, o PdfWriter do PyPDF2 refaz a união e o aviso vai junto na mensagem final
         try:
-            with open(out, "wb") as fo:
-                writer.write(fo)
-            messagebox.showinfo("Sucesso", f"✅ PDF unido salvo em:\n\n{out}")
+            if not unir_pdfs_sem_recomprimir(arquivos, out, streaming=True, notify=notify):
+                messagebox.showwarning("Aviso", "Nenhuma página encontrada.")
+                return
         except Exception as e:
-            messagebox.showerror("Erro", f"Falha ao salvar:\n{e}")
+            messagebox.showerror("Erro", f"Falha ao unir:\n{e}")
+            return
+        extras = "\n\n".join(m for k, m in notify.msgs if k in ("info", "warn"))
+        messagebox.showinfo("Sucesso", f"✅ PDF unido salvo em:\n\n{out}" + (f"\n\n{extras}" if extras else ""))
 
     def unir_e_comprimir(self):
         if not self._validar_pronto(exige_destino=True):
@@ -834,6 +4451,9 @@ class App:
         qualidade = self.qualidade.get()
         remover = self.remover_brancos.get()
         turbo = self.modo_turbo.get()
+        paralela = self.compressao_paralela.get()
+        motor = self.motor.get()
+        duplicatas = self.duplicatas.get()
 
         prog = ProgressDialog(self.root, title="Processando PDFs")
         notify = prog.notifier
@@ -842,7 +4462,8 @@ class App:
         def run_worker():
             try:
                 result = processar_com_limite_worker(
-                    arquivos, destino_final, qualidade, remover, turbo, notify, cancel_flag
+                    arquivos, destino_final, qualidade, remover, turbo, notify, cancel_flag,
+                    compressao_paralela=paralela, motor=motor, duplicatas=duplicatas
                 )
                 notify.done(result)
             finally:
@@ -850,9 +4471,42 @@ class App:
 
         threading.Thread(target=run_worker, daemon=True).start()
 
+    def acrescentar(self):
+        if not self._validar_pronto(exige_destino=True):
+            return
+        destino_final = self.destino.get()
+        existentes = partes_existentes(destino_final)
+        if not existentes:
+            messagebox.showwarning("Atenção", "Nenhuma parte gerada antes para este destino.\n\n"
+                                              "Use \"Unir & Comprimir\" para criar o conjunto.")
+            return
+        nomes = ", ".join(os.path.basename(p) for p in existentes[-3:])
+        if not messagebox.askyesno("Acrescentar", f"Os PDFs da lista serão acrescentados depois de {nomes}.\n\n"
+                                                  "As partes existentes não são refeitas: a última pode receber "
+                                                  "os novos no fim e o restante vira partes novas. Continuar?"):
+            return
+        arquivos = self._obter_arquivos_da_lista()
+        qualidade = self.qualidade.get()
+        remover = self.remover_brancos.get()
+        motor = self.motor.get()
+
+        prog = ProgressDialog(self.root, title="Acrescentando PDFs")
+        notify = prog.notifier
+        cancel_flag = prog.cancel_flag
+
+        def run_worker():
+            try:
+                result = acrescentar_worker(arquivos, destino_final, qualidade, remover, notify, cancel_flag, motor=motor)
+                notify.done(result)
+            finally:
+                notify.close()
+
+        threading.Thread(target=run_worker, daemon=True).start()
+
 # ===================== Execução =====================
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()   # executável congelado: os processos do motor de imagens reentram aqui
     root = tk.Tk()
     App(root)
     root.mainloop()
@@ -0,0 +1,73 @@
+"""
+PDFs mínimos gerados só com PyPDF2 para os testes: cada página tem um texto "<marca> <n>"
+e, opcionalmente, uma imagem (XObject) compartilhada — um recurso que a união pode deduplicar.
+Páginas em `brancas` (índices) saem sem conteúdo.
+"""
+import io
+import random
+from typing import Iterable, List, Optional
+
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+LADO_IMAGEM = 64   # 64x64 em cinza = 4 KiB, acima de UNIAO_DEDUP_MIN_BYTES
+
+
+def imagem(semente: int) -> bytes:
+    rnd = random.Random(semente)
+    return bytes(rnd.getrandbits(8) for _ in range(LADO_IMAGEM * LADO_IMAGEM))
+
+
+def gerar_pdf(path: str, n_paginas: int, marca: str, dados_imagem: Optional[bytes] = None,
+              brancas: Iterable[int] = ()) -> str:
+    brancas = set(brancas)
+    w = PdfWriter()
+    img_ref = None
+    if dados_imagem is not None:
+        img = DecodedStreamObject()
+        img.set_data(dados_imagem)
+        img.update({
+            NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(LADO_IMAGEM), NameObject("/Height"): NumberObject(LADO_IMAGEM),
+            NameObject("/ColorSpace"): NameObject("/DeviceGray"), NameObject("/BitsPerComponent"): NumberObject(8),
+        })
+        img_ref = w._add_object(img)
+    fonte = w._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"), NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for i in range(n_paginas):
+        page = PageObject.create_blank_page(None, 612, 792)
+        if i in brancas:
+            w.add_page(page)
+            continue
+        texto = f"BT /F1 12 Tf 72 720 Td ({marca} {i + 1}) Tj ET".encode("ascii")
+        recursos = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): fonte})})
+        if img_ref is not None:
+            texto += b" q 100 0 0 100 72 72 cm /Im0 Do Q"
+            recursos[NameObject("/XObject")] = DictionaryObject({NameObject("/Im0"): img_ref})
+        conteudo = DecodedStreamObject()
+        conteudo.set_data(texto)
+        page[NameObject("/Contents")] = w._add_object(conteudo)
+        page[NameObject("/Resources")] = recursos
+        w.add_page(page)
+    with open(path, "wb") as f:
+        w.write(f)
+    return path
+
+
+def marcas(dados: bytes) -> List[str]:
+    # "<marca> <n>" de cada página ("" nas brancas), relendo o PDF em modo estrito
+    reader = PdfReader(io.BytesIO(dados), strict=True)
+    saida = []
+    for page in reader.pages:
+        if page.get_contents() is None:
+            saida.append("")
+            continue
+        texto = page.get_contents().get_data().decode("latin-1")
+        saida.append(texto[texto.index("(") + 1:texto.index(")")])
+    return saida
+
+
+def esperado(marca: str, n_paginas: int) -> List[str]:
+    return [f"{marca} {i + 1}" for i in range(n_paginas)]
@@ -0,0 +1,175 @@
+import io
+import os
+import re
+import shutil
+import threading
+
+import pytest
+from PyPDF2 import PdfReader
+
+import testesunirecomprimirpdf as m
+from pdfs_sinteticos import esperado, gerar_pdf, imagem, marcas
+
+
+def _ler(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _startxref(dados: bytes) -> int:
+    return int(re.findall(rb"startxref\s+(\d+)", dados)[-1])
+
+
+def _prev(dados: bytes) -> int:
+    return int(re.findall(rb"/Prev (\d+)", dados)[-1])
+
+
+def _unir(caminhos, compacto) -> bytes:
+    buf = io.BytesIO()
+    uniao = m.UniaoStreaming(buf, compacto=compacto)
+    for c in caminhos:
+        uniao.adicionar(c)
+    uniao.finalizar()
+    return buf.getvalue()
+
+
+def _acrescentar(base: bytes, caminhos) -> m.AtualizacaoIncremental:
+    atualizacao = m.AtualizacaoIncremental(base)
+    for c in caminhos:
+        atualizacao.adicionar(c)
+    atualizacao.finalizar()
+    return atualizacao
+
+
+@pytest.fixture
+def docs(tmp_path):
+    timbre = imagem(7)
+    return {nome: gerar_pdf(str(tmp_path / f"{nome}.pdf"), n, nome, timbre)
+            for nome, n in (("A", 3), ("B", 2), ("C", 1))}
+
+
+# ===================== AtualizacaoIncremental =====================
+
+@pytest.mark.parametrize("compacto", [False, True])
+def test_original_fica_como_prefixo_e_prev_aponta_a_xref_anterior(docs, compacto):
+    base = _unir([docs["A"]], compacto)
+    atualizacao = _acrescentar(base, [docs["B"]])
+    dados = atualizacao.dados()
+    assert atualizacao.compacto == compacto
+    assert dados.startswith(base) and dados[len(base):] == atualizacao.bytes_novos()
+    assert _prev(dados) == _startxref(base)
+    assert marcas(dados) == esperado("A", 3) + esperado("B", 2)
+
+
+@pytest.mark.parametrize("compacto", [False, True])
+def test_incrementos_empilhados(docs, compacto):
+    um = _acrescentar(_unir([docs["A"]], compacto), [docs["B"]]).dados()
+    dois = _acrescentar(um, [docs["C"]]).dados()
+    assert dois.startswith(um)
+    assert _prev(dois) == _startxref(um)
+    assert marcas(dois) == esperado("A", 3) + esperado("B", 2) + esperado("C", 1)
+
+
+def test_recurso_que_o_arquivo_ja_tem_nao_e_regravado(docs):
+    atualizacao = _acrescentar(_unir([docs["A"]], True), [docs["B"]])
+    assert atualizacao.bytes_deduplicados == len(imagem(7))
+    assert len(atualizacao.bytes_novos()) < len(imagem(7))
+
+
+@pytest.mark.parametrize("compacto", [False, True])
+def test_desfazer_permite_medir_e_continuar(docs, compacto):
+    base = _unir([docs["A"]], compacto)
+    atualizacao = m.AtualizacaoIncremental(base)
+    atualizacao.adicionar(docs["B"])
+    sem_final = atualizacao.marcar()
+    atualizacao.finalizar()
+    so_b = atualizacao.dados()
+    atualizacao.desfazer(sem_final)
+    antes_c = atualizacao.marcar()
+    atualizacao.adicionar(docs["C"])
+    atualizacao.desfazer(antes_c)   # C "não coube": volta ao estado com só B
+    atualizacao.finalizar()
+    assert atualizacao.dados() == so_b
+    atualizacao.desfazer(sem_final)
+    atualizacao.adicionar(docs["C"])
+    atualizacao.finalizar()
+    assert atualizacao.dados() == _acrescentar(base, [docs["B"], docs["C"]]).dados()
+
+
+# ===================== Partes existentes e numeração =====================
+
+def test_partes_existentes_em_ordem_numerica(tmp_path):
+    destino = str(tmp_path / "caso.pdf")
+    for nome in ("caso_parte_10.pdf", "caso_parte_02.pdf", "caso_parte_03.pdf", "caso.resumo.json",
+                 "outro_parte_01.pdf", "caso_parte_01.pdf.tmp"):
+        (tmp_path / nome).write_bytes(b"x")
+    # lacunas (parte apagada depois de protocolada) não mudam a numeração das demais
+    assert [os.path.basename(p) for p in m.partes_existentes(destino)] == [
+        "caso_parte_02.pdf", "caso_parte_03.pdf", "caso_parte_10.pdf"]
+    (tmp_path / "caso.pdf").write_bytes(b"x")
+    assert [os.path.basename(p) for p in m.partes_existentes(destino)] == [
+        "caso.pdf", "caso_parte_02.pdf", "caso_parte_03.pdf", "caso_parte_10.pdf"]
+    (tmp_path / "caso_parte_01.pdf").write_bytes(b"x")   # destino inteiro antigo não entra na sequência
+    assert [os.path.basename(p) for p in m.partes_existentes(destino)] == [
+        "caso_parte_01.pdf", "caso_parte_02.pdf", "caso_parte_03.pdf", "caso_parte_10.pdf"]
+
+
+def test_partes_existentes_sem_nada(tmp_path):
+    assert m.partes_existentes(str(tmp_path / "caso.pdf")) == []
+
+
+def test_gerar_partes_recusa_sobrescrever(docs, tmp_path):
+    destino = str(tmp_path / "caso.pdf")
+    ocupada = tmp_path / "caso_parte_04.pdf"
+    ocupada.write_bytes(b"protocolada")
+    notify = m.NotifierConsole(stream=io.StringIO())
+    infos = [{"cleaned": docs["A"], "compressed": docs["A"], "mb": m._mb(docs["A"])}]
+    res = m._gerar_partes_preciso(infos, [], destino, "/ebook", notify, threading.Event(), None, None, 1, "gs", None,
+                                  primeira=4, sobrescrever=False)
+    assert res is None and ocupada.read_bytes() == b"protocolada"
+    assert any(k == "error" for k, _ in notify.msgs)
+
+
+@pytest.fixture
+def sem_gs(monkeypatch):
+    # a "compressão" copia o arquivo: o acréscimo é testado sem Ghostscript
+    def copiar(input_files, output_pdf, qualidade, notify, **_):
+        shutil.copyfile(input_files[0], output_pdf)
+        return True
+    monkeypatch.setattr(m, "comprimir_para_pdf", copiar)
+    monkeypatch.setattr(m, "RASTROS_ATIVO", False)
+
+
+def _acrescentar_ao_caso(novos, destino):
+    notify = m.NotifierConsole(stream=io.StringIO())
+    partes = m.acrescentar_worker(novos, destino, "/ebook", False, notify, threading.Event())
+    assert not [t for k, t in notify.msgs if k == "error"]
+    return partes
+
+
+def test_acrescimos_seguidos_a_um_destino_inteiro(sem_gs, monkeypatch, tmp_path):
+    timbre = imagem(3)
+    docs = [gerar_pdf(str(tmp_path / f"d{i}.pdf"), 2, f"D{i}", imagem(10 + i)) for i in range(6)]
+    destino = str(tmp_path / "saida" / "caso.pdf")
+    os.makedirs(os.path.dirname(destino))
+    with open(destino, "wb") as f:
+        f.write(_unir([gerar_pdf(str(tmp_path / "base.pdf"), 2, "BASE", timbre)], True))
+    # cabe o destino + ~2 documentos por parte
+    monkeypatch.setattr(m, "LIMITE_MB", (len(_ler(destino)) + 2.5 * len(_ler(docs[0]))) / 2**20)
+
+    protocolado = _ler(destino)
+    partes = _acrescentar_ao_caso(docs[:3], destino)
+    nomes = [os.path.basename(p) for p in partes]
+    assert nomes[0] == "caso.pdf" and nomes[1:] == ["caso_parte_02.pdf"]
+    assert _ler(destino).startswith(protocolado)
+    antes = {p: _ler(p) for p in partes}
+
+    partes = _acrescentar_ao_caso(docs[3:], destino)
+    assert [os.path.basename(p) for p in partes] == ["caso.pdf", "caso_parte_02.pdf", "caso_parte_03.pdf"]
+    assert _ler(destino) == antes[destino]                  # parte 1 intocada
+    assert _ler(partes[1]).startswith(antes[partes[1]])     # só a última recebe acréscimo
+    todas = [mk for p in partes for mk in marcas(_ler(p))]
+    assert todas == esperado("BASE", 2) + [mk for i in range(6) for mk in esperado(f"D{i}", 2)]
+    for p in partes:
+        assert len(_ler(p)) <= m.LIMITE_MB * 2**20
+        assert len(PdfReader(p, strict=True).pages) > 0
@@ -0,0 +1,116 @@
+import pytest
+
+import testesunirecomprimirpdf as m
+from pdfs_sinteticos import gerar_pdf
+
+MB = 1024 * 1024
+
+
+def _info(nome="a.pdf", bytes_=10 * MB, imagens=((8 * MB, 300),), fontes=0, **extra):
+    # resultado de analisar_pdf montado à mão: (bytes, dpi) de cada imagem
+    imagens = list(imagens)
+    info = {"caminho": f"/x/{nome}", "bytes": bytes_, "paginas": 10, "criptografado": False, "senha": False,
+            "xref_quebrada": False, "erro": None, "imagens": imagens,
+            "bytes_imagens": sum(n for n, _ in imagens), "dpi_max": max((d for _, d in imagens), default=0),
+            "bytes_fontes": fontes}
+    info.update(extra)
+    return info
+
+
+# ===================== estimar_tamanho =====================
+
+def test_resolucao_escolhida_entra_na_estimativa():
+    info = _info()
+    alta = m.estimar_tamanho(info, "/ebook", "gs", resolucao=200)
+    baixa = m.estimar_tamanho(info, "/ebook", "gs", resolucao=100)
+    # imagens caem com (alvo/dpi)²: de 200 para 100 dpi a parte de imagens cai a 1/4
+    resto = (info["bytes"] - info["bytes_imagens"]) * m.ANALISE_FATOR_TEXTO
+    assert (baixa - resto) == pytest.approx((alta - resto) / 4, rel=1e-6)
+
+
+def test_sem_resolucao_usa_a_da_compressao():
+    info = _info()
+    gs = {q: m.estimar_tamanho(info, q, "gs") for q in m.QUALIDADES_GS}
+    assert gs["/ebook"] == m.estimar_tamanho(info, "/ebook", "gs", resolucao=m.GS_RESOLUCAO_PADRAO)
+    # motor de imagens: cada preset com o próprio DPI
+    imagens = {q: m.estimar_tamanho(info, q, "imagens") for q in m.QUALIDADES_GS}
+    for q in m.QUALIDADES_GS:
+        assert imagens[q] == m.estimar_tamanho(info, q, "imagens", resolucao=m.IMAGENS_PARAMETROS[q][0])
+    assert imagens["/screen"] < imagens["/ebook"] < imagens["/printer"] < imagens["/prepress"]
+
+
+def test_imagem_pequena_ou_ja_em_baixa_resolucao_nao_encolhe():
+    info = _info(bytes_=1 * MB, imagens=((4096, 600), (200_000, 72)))
+    resto = (info["bytes"] - info["bytes_imagens"]) * m.ANALISE_FATOR_TEXTO
+    # a pequena fica como está; a de 72 dpi só sente a qualidade JPEG do preset (75 = sem perda)
+    assert m.estimar_tamanho(info, "/printer", "gs", resolucao=150) == int(4096 + 200_000 + resto)
+
+
+def test_fontes_e_texto_por_fatores_fixos():
+    info = _info(bytes_=3 * MB, imagens=(), fontes=1 * MB)
+    esperado = int(1 * MB * m.ANALISE_FATOR_FONTES + 2 * MB * m.ANALISE_FATOR_TEXTO)
+    assert m.estimar_tamanho(info, "/screen", "gs") == esperado
+
+
+# ===================== recomendar =====================
+
+def test_problemas_e_avisos():
+    analises = [_info("ok.pdf", bytes_=1 * MB, imagens=()),
+                _info("ruim.pdf", erro="EOF marker not found"),
+                _info("senha.pdf", senha=True),
+                _info("torto.pdf", bytes_=1 * MB, imagens=(), xref_quebrada=True)]
+    rec = m.recomendar(analises)
+    assert rec["problemas"] == ["ruim.pdf: ilegível (EOF marker not found)", "senha.pdf: protegido por senha"]
+    assert "torto.pdf: estrutura danificada (reparada na leitura)" in rec["avisos"]
+    assert "Quase sem imagens: a compressão vai ganhar pouco." in rec["avisos"]
+    assert rec["motivo"].startswith("Já cabe sem comprimir")
+
+
+def test_melhor_preset_que_cabe_e_um_arquivo_so():
+    rec = m.recomendar([_info(bytes_=12 * MB, imagens=((11 * MB, 300),))], "imagens")
+    cabem = [q for q in m.QUALIDADES_GS if rec["estimativas"][q] <= m.LIMITE_MB * MB * m.FATOR_PREVISAO]
+    assert cabem and rec["qualidade"] == cabem[-1]
+    assert rec["partes"] == 1 and rec["turbo"]
+
+
+def test_documentos_que_cabem_inteiros_vao_para_o_preciso():
+    analises = [_info(f"{n}.pdf", bytes_=4 * MB, imagens=((3 * MB, 110),)) for n in range(4)]
+    rec = m.recomendar(analises, resolucao=110)
+    assert rec["partes"] > 1 and not rec["turbo"]
+
+
+def test_documento_maior_que_o_limite_vai_para_o_turbo():
+    analises = [_info("grande.pdf", bytes_=60 * MB, imagens=((50 * MB, 150),)), _info("b.pdf", bytes_=1 * MB, imagens=())]
+    rec = m.recomendar(analises, resolucao=150)
+    assert rec["partes"] > 1 and rec["turbo"]
+
+
+def test_resolucao_da_compressao_muda_a_recomendacao():
+    analises = [_info(bytes_=40 * MB, imagens=((38 * MB, 300),))]
+    alta = m.recomendar(analises, resolucao=300)
+    baixa = m.recomendar(analises, resolucao=72)
+    assert alta["estimativas"]["/ebook"] > baixa["estimativas"]["/ebook"]
+    assert alta["partes"] > baixa["partes"]
+
+
+def test_degrau_do_modo_auto():
+    pequeno = m.recomendar([_info(bytes_=2 * MB, imagens=((1 * MB, 300),))])
+    assert pequeno["resolucao_auto"] == m.AUTO_RESOLUCOES[0]
+    info = _info(bytes_=30 * MB, imagens=((29 * MB, 300),))
+    r = m.recomendar([info])["resolucao_auto"]
+    assert r < m.AUTO_RESOLUCOES[0]
+
+    def cabe(dpi):
+        return m.estimar_tamanho(info, m._preset_para_resolucao(dpi), "gs", dpi) <= m.LIMITE_MB * MB * m.FATOR_PREVISAO
+    # o degrau escolhido cabe e o anterior não
+    assert cabe(r) and not cabe(m.AUTO_RESOLUCOES[m.AUTO_RESOLUCOES.index(r) - 1])
+
+
+# ===================== analisar_pdf =====================
+
+def test_analisar_pdf_sintetico_e_ilegivel(tmp_path):
+    info = m.analisar_pdf(gerar_pdf(str(tmp_path / "a.pdf"), 3, "A"))
+    assert (info["paginas"], info["erro"], info["senha"], info["imagens"]) == (3, None, False, [])
+    lixo = tmp_path / "lixo.pdf"
+    lixo.write_bytes(b"isto nao e um pdf")
+    assert m.analisar_pdf(str(lixo))["erro"]
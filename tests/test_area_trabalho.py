@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+
+import testesunirecomprimirpdf as m
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def raizes(tmp_path, monkeypatch):
+    # um "tmpfs" e um temp de disco só do teste
+    ram, disco = tmp_path / "ram", tmp_path / "disco"
+    ram.mkdir(); disco.mkdir()
+    monkeypatch.setattr(m, "AREA_RAM_PASTAS", (str(ram),))
+    monkeypatch.setattr(tempfile, "tempdir", str(disco))
+    monkeypatch.setattr(m, "_orfas_verificadas", True)   # a limpeza tem testes próprios
+    return str(ram), str(disco)
+
+
+def _gravar(path, n):
+    with open(path, "wb") as f:
+        f.write(b"\0" * n)
+    return path
+
+
+def _pid_morto() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+# ===================== Cota =====================
+
+def test_area_em_ram_com_dono(raizes):
+    ram, _ = raizes
+    with m.AreaTrabalho() as area:
+        assert area.em_ram and os.path.dirname(area.dir) == ram
+        assert os.path.basename(area.dir).startswith(f"{m._AREA_PREFIXO}{os.getpid()}_")
+        with open(os.path.join(area.dir, m._AREA_DONO), encoding="ascii") as f:
+            assert f.read() == str(os.getpid())
+    assert os.listdir(ram) == []
+
+
+def test_o_que_nao_cabe_na_cota_vai_para_o_disco(raizes):
+    ram, disco = raizes
+    with m.AreaTrabalho(cota_mb=1) as area:
+        vazia = area.bytes_em_ram()   # só o .dono
+        a = _gravar(area.novo_caminho("a_", ".pdf", 600 * 1024), 600 * 1024)
+        assert os.path.dirname(a) == area.dir
+        b = area.novo_caminho("b_", ".pdf", 600 * 1024)   # 600 KB já ocupados + 600 KB > 1 MB
+        assert os.path.dirname(os.path.dirname(b)) == disco
+        pasta = area.novo_diretorio("render_", 2 * MB)
+        assert os.path.dirname(os.path.dirname(pasta)) == disco
+        # liberar devolve a cota
+        area.liberar(a)
+        assert not os.path.exists(a) and area.bytes_em_ram() == vazia
+        assert os.path.dirname(area.novo_caminho("c_", ".pdf", 600 * 1024)) == area.dir
+        _gravar(b, 10)
+    assert os.listdir(ram) == [] and os.listdir(disco) == []   # fechar apaga as duas pastas
+
+
+def test_sem_ram_tudo_no_disco(raizes, monkeypatch):
+    _, disco = raizes
+    monkeypatch.setattr(m, "AREA_RAM_ATIVA", False)
+    with m.AreaTrabalho() as area:
+        assert not area.em_ram and os.path.dirname(area.dir) == disco
+        assert os.path.dirname(area.novo_caminho("a_", ".pdf", 10 * 1024 * MB)) == area.dir
+        assert area.bytes_em_ram() == 0
+
+
+def test_caminhos_unicos_entre_chamadas(raizes):
+    with m.AreaTrabalho() as area:
+        caminhos = {area.novo_caminho("x_", ".pdf") for _ in range(50)}
+        assert len(caminhos) == 50
+
+
+# ===================== Áreas órfãs =====================
+
+def _area_de(raiz, pid, idade_h=0.0, dono=True):
+    pasta = tempfile.mkdtemp(prefix=f"{m._AREA_PREFIXO}{pid}_", dir=raiz)
+    if dono:
+        with open(os.path.join(pasta, m._AREA_DONO), "w", encoding="ascii") as f:
+            f.write(str(pid))
+    _gravar(os.path.join(pasta, "00001.pdf"), 100)
+    t = time.time() - idade_h * 3600
+    os.utime(pasta, (t, t))
+    return pasta
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="no Windows só a idade decide (ver _pid_vivo)")
+def test_limpa_areas_de_processos_mortos_e_velhas(raizes, monkeypatch):
+    ram, disco = raizes
+    monkeypatch.setattr(m, "_orfas_verificadas", False)
+    morta = _area_de(ram, _pid_morto())
+    velha = _area_de(disco, os.getppid(), idade_h=m.AREA_ORFA_HORAS + 1)
+    viva = _area_de(disco, os.getppid())
+    propria = _area_de(ram, os.getpid(), idade_h=m.AREA_ORFA_HORAS + 1)
+    sem_dono = _area_de(ram, _pid_morto(), dono=False)
+    outra = tempfile.mkdtemp(prefix="outro_programa_", dir=ram)
+    m.limpar_areas_orfas()
+    assert not os.path.exists(morta) and not os.path.exists(velha)
+    assert all(os.path.exists(p) for p in (viva, propria, sem_dono, outra))
+
+
+def test_limpeza_roda_uma_vez_por_processo(raizes, monkeypatch):
+    ram, _ = raizes
+    monkeypatch.setattr(m, "_orfas_verificadas", False)
+    with m.AreaTrabalho():   # a primeira área dispara a limpeza
+        pass
+    morta = _area_de(ram, _pid_morto())
+    with m.AreaTrabalho():
+        pass
+    assert os.path.exists(morta)
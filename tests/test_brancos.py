@@ -0,0 +1,83 @@
+import pytest
+from PyPDF2 import PdfReader
+
+import testesunirecomprimirpdf as m
+from pdfs_sinteticos import gerar_pdf
+
+np = pytest.importorskip("numpy")
+
+# uma página Letter renderizada a BRANCO_DPI
+LARGURA, ALTURA = int(8.5 * m.BRANCO_DPI), int(11 * m.BRANCO_DPI)
+
+
+def _papel(tom: int = 235) -> "np.ndarray":
+    return np.full((ALTURA, LARGURA), tom, dtype=np.uint8)
+
+
+def _ruido_de_scanner(a, semente: int = 1):
+    # granulação do papel mais poeira: pixels escuros soltos, nunca dois no mesmo bloco 3x3
+    rnd = np.random.default_rng(semente)
+    a = np.clip(a.astype(np.int16) + rnd.normal(0, 6, a.shape), 0, 255).astype(np.uint8)
+    for _ in range(40):
+        y, x = rnd.integers(0, ALTURA // 3) * 3, rnd.integers(0, LARGURA // 3) * 3
+        a[y, x] = 40
+    return a
+
+
+def _brancas(a) -> bool:
+    return m._pontuar_tinta(a) < m.BRANCO_LIMIAR_TINTA
+
+
+def test_papel_liso_e_branco():
+    assert m._pontuar_tinta(_papel()) == 0.0
+
+
+def test_ruido_de_scanner_continua_branco():
+    assert _brancas(_ruido_de_scanner(_papel()))
+
+
+def test_furos_de_perfurador_na_margem_nao_contam():
+    a = _ruido_de_scanner(_papel())
+    antes = m._pontuar_tinta(a)
+    raio = max(2, m.BRANCO_DPI // 8)
+    cx = int(LARGURA * m.BRANCO_MARGEM / 2)
+    yy, xx = np.ogrid[:ALTURA, :LARGURA]
+    for cy in (ALTURA // 4, ALTURA // 2, 3 * ALTURA // 4):
+        a[(yy - cy) ** 2 + (xx - cx) ** 2 <= raio ** 2] = 15
+    assert m._pontuar_tinta(a) == antes and _brancas(a)
+
+
+def test_linha_de_texto_fraca_nao_e_branca():
+    a = _ruido_de_scanner(_papel())
+    # uma linha só, cinza-claro (lápis, carimbo apagado), com 1 px de altura a 30 DPI
+    y = ALTURA // 3
+    a[y, LARGURA // 5:4 * LARGURA // 5] = 235 - m.BRANCO_CONTRASTE - 15
+    a[y + 1, LARGURA // 5:4 * LARGURA // 5:2] = 235 - m.BRANCO_CONTRASTE - 15
+    assert not _brancas(a)
+
+
+def test_tom_do_papel_vem_da_propria_pagina():
+    # papel reciclado/amarelado, mais escuro: o contraste é medido contra ele, não contra o branco
+    assert _brancas(_ruido_de_scanner(_papel(170)))
+
+
+def test_fundo_escuro_conta_como_pagina_coberta():
+    assert m._pontuar_tinta(_papel(60)) == 1.0
+
+
+def test_detector_renderiza_so_as_candidatas_e_guarda_o_veredito(tmp_path, monkeypatch):
+    # duas páginas de texto curto (candidatas) e uma vazia (resolvida pela checagem estrutural)
+    pdf = gerar_pdf(str(tmp_path / "a.pdf"), 3, "A", brancas=[1])
+    renderizadas = []
+
+    def renderizar(self, entrada_pdf, paginas, notify):
+        renderizadas.append(list(paginas))
+        return {j: 0.5 for j in paginas}
+
+    monkeypatch.setattr(m.DetectorBrancos, "_renderizar", renderizar)
+    cache = str(tmp_path / "brancos.json")
+    assert m.DetectorBrancos(cache).paginas_em_branco(pdf, PdfReader(pdf)) == [False, True, False]
+    assert renderizadas == [[0, 2]]
+    # outro detector, mesmo arquivo de cache: nada a renderizar
+    assert m.DetectorBrancos(cache).paginas_em_branco(pdf, PdfReader(pdf)) == [False, True, False]
+    assert renderizadas == [[0, 2]]
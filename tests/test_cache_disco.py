@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import testesunirecomprimirpdf as m
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _podar_em_outro_processo(pasta: str, esperar: bool = True):
+    # outro processo (como vigiar_pasta.py ou o lote) com teto zero: tenta despejar tudo
+    codigo = f"import testesunirecomprimirpdf as m; m.CacheDisco({pasta!r}, max_mb=0).podar()"
+    proc = subprocess.Popen([sys.executable, "-c", codigo], cwd=RAIZ)
+    if esperar:
+        assert proc.wait(timeout=60) == 0
+    return proc
+
+
+def _entrada(cache: m.CacheDisco, chave: str, idade_s: float = 0, tamanho: int = 4096) -> str:
+    tmp = cache.caminho_temporario(chave)
+    with open(tmp, "wb") as f:
+        f.write(chave.encode() * (tamanho // len(chave)))
+    path = os.path.join(cache.pasta, f"{chave}.pdf")
+    os.replace(tmp, path)   # direto, sem guardar(): ninguém está usando
+    t = time.time() - idade_s
+    os.utime(path, (t, t))
+    return path
+
+
+def _pid_morto() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_entrada_em_leitura_sobrevive_a_poda_de_outro_processo(tmp_path):
+    cache = m.CacheDisco(str(tmp_path / "cache"))
+    _entrada(cache, "a" * 8, idade_s=100)
+    livre = _entrada(cache, "b" * 8, idade_s=50)
+    path = cache.obter("a" * 8)
+    with open(path, "rb") as f:
+        inicio = f.read(100)
+        _podar_em_outro_processo(cache.pasta)
+        resto = f.read()
+    assert inicio + resto == ("a" * 8).encode() * 512
+    assert os.path.exists(path)          # reabrir pelo nome ainda funciona
+    assert not os.path.exists(livre)     # a que ninguém usa foi despejada
+
+
+def test_uso_de_processo_morto_nao_protege_e_e_apagado(tmp_path):
+    cache = m.CacheDisco(str(tmp_path / "cache"))
+    path = _entrada(cache, "a" * 8)
+    uso = os.path.join(cache.pasta, f"{'a' * 8}.{_pid_morto()}.uso")
+    open(uso, "w").close()
+    _podar_em_outro_processo(cache.pasta)
+    assert not os.path.exists(path) and not os.path.exists(uso)
+
+
+def test_poda_espera_a_trava_de_quem_esta_obtendo(tmp_path):
+    cache = m.CacheDisco(str(tmp_path / "cache"))
+    path = _entrada(cache, "a" * 8)
+    with cache._trava():
+        proc = _podar_em_outro_processo(cache.pasta, esperar=False)
+        time.sleep(1.0)
+        assert proc.poll() is None and os.path.exists(path)   # bloqueado na trava
+    assert proc.wait(timeout=60) == 0
+    assert not os.path.exists(path)
+
+
+def test_soltar_usos_libera_para_a_poda(tmp_path):
+    cache = m.CacheDisco(str(tmp_path / "cache"))
+    path = _entrada(cache, "a" * 8)
+    tmp = cache.caminho_temporario("c" * 8)
+    with open(tmp, "wb") as f:
+        f.write(b"%PDF-1.4")
+    cache.guardar("c" * 8, tmp)
+    assert cache.obter("a" * 8) == path
+    assert sorted(n for n in os.listdir(cache.pasta) if n.endswith(".uso")) == \
+        [f"{'a' * 8}.{os.getpid()}.uso", f"{'c' * 8}.{os.getpid()}.uso"]
+    cache._soltar_usos()
+    assert not [n for n in os.listdir(cache.pasta) if n.endswith(".uso")]
+    _podar_em_outro_processo(cache.pasta)
+    assert not [n for n in os.listdir(cache.pasta) if n.endswith(".pdf")]
+
+
+@pytest.mark.parametrize("teto_kb, sobram", [(100, 3), (10, 2)])
+def test_poda_lru_no_proprio_processo(tmp_path, teto_kb, sobram):
+    cache = m.CacheDisco(str(tmp_path / "cache"), max_mb=teto_kb / 1024)
+    for n, chave in enumerate(["a", "b", "c"]):
+        _entrada(cache, chave * 8, idade_s=100 - n * 10)
+    cache.podar()
+    restantes = sorted(n[:-4] for n in os.listdir(cache.pasta) if n.endswith(".pdf"))
+    assert restantes == ["a" * 8, "b" * 8, "c" * 8][3 - sobram:]
@@ -0,0 +1,80 @@
+import os
+import shutil
+import threading
+from queue import Queue
+
+import pytest
+
+import testesunirecomprimirpdf as m
+from pdfs_sinteticos import gerar_pdf
+
+
+def _grandoes(tmp_path, nomes):
+    infos = []
+    for nome in nomes:
+        p = gerar_pdf(str(tmp_path / f"{nome}.pdf"), 3, nome)
+        infos.append({"cleaned": p, "compressed": p, "mb": 9.0})
+    return infos
+
+
+def _divisao_falsa(falhar=()):
+    # a versão comprimida inteira vira uma "parte"; os de `falhar` levantam depois de gravá-la
+    def split(input_pdf, base_saida, *a, **k):
+        nome = os.path.splitext(os.path.basename(input_pdf))[0]
+        primeira = m._nome_parte(base_saida, 1)
+        shutil.copyfile(k.get("comprimido_pdf") or input_pdf, primeira)
+        if nome in falhar:
+            raise RuntimeError("GS caiu")
+        return [primeira]
+    return split
+
+
+def _dividir(tmp_path, grandoes, stage, **k):
+    destino = str(tmp_path / "saida" / "conjunto.pdf")
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    notify = m.Notifier(Queue())
+    partes = m._dividir_grandoes(grandoes, destino, "ebook", notify, threading.Event(), stage, None, 2, "gs", None, **k)
+    return partes, destino, notify
+
+
+def test_partes_saem_na_ordem_dos_documentos_e_a_area_fica_limpa(tmp_path, monkeypatch):
+    monkeypatch.setattr(m, "_split_single_pdf_por_paginas", _divisao_falsa())
+    with m.AreaStaging() as stage:
+        partes, destino, _ = _dividir(tmp_path, _grandoes(tmp_path, ["A", "B"]), stage, primeira=3)
+        assert partes == [m._nome_parte(destino, 3), m._nome_parte(destino, 4)]
+        assert sorted(os.listdir(os.path.dirname(destino))) == ["conjunto_parte_03.pdf", "conjunto_parte_04.pdf"]
+        assert not [n for n in os.listdir(stage.dir) if n.startswith("divisao")]
+
+
+@pytest.mark.parametrize("falha", ["excecao", "paginas_faltando"])
+def test_falha_em_uma_divisao_nao_entrega_nada_e_apaga_as_temporarias(tmp_path, monkeypatch, falha):
+    grandoes = _grandoes(tmp_path, ["A", "B", "C"])
+    if falha == "excecao":
+        split = _divisao_falsa(falhar={"B"})
+    else:
+        # a "divisão" devolve só 2 das 3 páginas, sem erro (como um GS que desiste no meio)
+        grandoes[1]["compressed"] = gerar_pdf(str(tmp_path / "B_comprimido.pdf"), 2, "B")
+        split = _divisao_falsa()
+    monkeypatch.setattr(m, "_split_single_pdf_por_paginas", split)
+    with m.AreaStaging() as stage:
+        partes, destino, notify = _dividir(tmp_path, grandoes, stage)
+        assert partes is None
+        assert os.listdir(os.path.dirname(destino)) == []   # nada ao lado do destino
+        assert not [n for n in os.listdir(stage.dir) if n.startswith("divisao")]
+    assert any(tipo == "error" and "B.pdf" in s for tipo, s in notify.msgs)
+
+
+def test_cancelamento_devolve_none(tmp_path, monkeypatch):
+    cancel = threading.Event()
+
+    def split(input_pdf, base_saida, *a, **k):
+        cancel.set()
+        return _divisao_falsa()(input_pdf, base_saida)
+
+    monkeypatch.setattr(m, "_split_single_pdf_por_paginas", split)
+    destino = str(tmp_path / "conjunto.pdf")
+    with m.AreaStaging() as stage:
+        partes = m._dividir_grandoes(_grandoes(tmp_path, ["A"]), destino, "ebook", m.Notifier(Queue()),
+                                     cancel, stage, None, 1, "gs", None)
+    assert partes is None
+    assert not os.path.exists(m._nome_parte(destino, 1))
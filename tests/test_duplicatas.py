@@ -0,0 +1,168 @@
+import json
+import random
+from queue import Queue
+
+import pytest
+from PIL import Image
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, DictionaryObject, FloatObject, NameObject
+
+import testesunirecomprimirpdf as m
+from pdfs_sinteticos import gerar_pdf
+
+
+def _stream(dados: bytes, **chaves) -> DecodedStreamObject:
+    s = DecodedStreamObject()
+    s.set_data(dados)
+    s.update({NameObject(k): v for k, v in chaves.items()})
+    return s
+
+
+def _pdf_com_formularios(path, textos) -> str:
+    # como sai de impressora virtual/scanner: cada página só desenha um Form XObject "/Fm0",
+    # o texto de verdade fica dentro do formulário
+    w = PdfWriter()
+    fonte = w._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"), NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for texto in textos:
+        form = _stream(f"BT /F1 12 Tf 72 720 Td ({texto}) Tj ET".encode("ascii"),
+                       **{"/Type": NameObject("/XObject"), "/Subtype": NameObject("/Form"),
+                          "/BBox": ArrayObject([FloatObject(0), FloatObject(0), FloatObject(612), FloatObject(792)]),
+                          "/Resources": DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): fonte})})})
+        page = PageObject.create_blank_page(None, 612, 792)
+        page[NameObject("/Contents")] = w._add_object(_stream(b"q /Fm0 Do Q"))
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/XObject"): DictionaryObject({NameObject("/Fm0"): w._add_object(form)})})
+        w.add_page(page)
+    with open(path, "wb") as f:
+        w.write(f)
+    return path
+
+
+def _textos(path):
+    saida = []
+    for page in PdfReader(path).pages:
+        form = page["/Resources"]["/XObject"]["/Fm0"].get_object()
+        dados = form.get_data().decode("latin-1")
+        saida.append(dados[dados.index("(") + 1:dados.index(")")])
+    return saida
+
+
+def _notify():
+    return m.Notifier(Queue())
+
+
+# ===================== Hash exato =====================
+
+def test_formularios_diferentes_nao_colidem(tmp_path):
+    pdf = _pdf_com_formularios(str(tmp_path / "f.pdf"), ["Contrato", "Procuracao"])
+    p1, p2 = PdfReader(pdf).pages
+    assert m._hash_conteudo_pagina(p1) != m._hash_conteudo_pagina(p2)
+
+
+def test_formulario_igual_em_arquivos_diferentes_tem_o_mesmo_hash(tmp_path):
+    a = PdfReader(_pdf_com_formularios(str(tmp_path / "a.pdf"), ["Contrato"])).pages[0]
+    b = PdfReader(_pdf_com_formularios(str(tmp_path / "b.pdf"), ["Outra", "Contrato"])).pages[1]
+    assert m._hash_conteudo_pagina(a) == m._hash_conteudo_pagina(b)
+
+
+def test_fonte_diferente_muda_o_hash(tmp_path):
+    pdf = gerar_pdf(str(tmp_path / "a.pdf"), 1, "A")
+    page = PdfReader(pdf).pages[0]
+    antes = m._hash_conteudo_pagina(page)
+    page["/Resources"]["/Font"]["/F1"].get_object()[NameObject("/BaseFont")] = NameObject("/Courier")
+    assert m._hash_conteudo_pagina(page) != antes
+
+
+def test_remover_nao_apaga_paginas_de_formularios_diferentes(tmp_path):
+    pdf = _pdf_com_formularios(str(tmp_path / "f.pdf"), ["Contrato", "Procuracao"])
+    notify = _notify()
+    assert m.deduplicar_arquivos([pdf], "remover", notify) == [pdf]
+    assert _textos(pdf) == ["Contrato", "Procuracao"]
+
+
+# ===================== Remoção e relatório =====================
+
+def test_remover_tira_a_pagina_repetida(tmp_path):
+    pdf = _pdf_com_formularios(str(tmp_path / "f.pdf"), ["Contrato", "Procuracao", "Contrato"])
+    with m.AreaTrabalho() as area:
+        saida = m.deduplicar_arquivos([pdf], "remover", _notify(), area=area)
+        assert len(saida) == 1 and saida[0] != pdf
+        assert _textos(saida[0]) == ["Contrato", "Procuracao"]
+    assert _textos(pdf) == ["Contrato", "Procuracao", "Contrato"]   # o original não muda
+
+
+def test_documento_inteiro_repetido_sai_da_lista_e_vai_para_o_relatorio(tmp_path):
+    a = gerar_pdf(str(tmp_path / "a.pdf"), 2, "A")
+    b = gerar_pdf(str(tmp_path / "b.pdf"), 2, "A")
+    c = gerar_pdf(str(tmp_path / "c.pdf"), 1, "C")
+    relatorio = str(tmp_path / "dup.json")
+    notify = _notify()
+    assert m.deduplicar_arquivos([a, b, c], "remover", notify, relatorio_json=relatorio) == [a, c]
+    texto = [s for tipo, s in notify.msgs if tipo == "info"][-1]
+    assert texto.splitlines() == ["2 página(s) duplicada(s) removida(s):",
+                                  "- b.pdf: documento inteiro repete a.pdf"]
+    with open(relatorio, encoding="utf-8") as f:
+        dados = json.load(f)
+    assert dados["removidas"] is True
+    assert [(d["pagina"], d["pagina_original"], d["tipo"]) for d in dados["duplicatas"]] == [(1, 1, "exata"), (2, 2, "exata")]
+
+
+def test_relatar_nao_altera_as_entradas(tmp_path, monkeypatch):
+    monkeypatch.setattr(m, "_renderizar_paginas", lambda *a, **k: {})
+    pdf = _pdf_com_formularios(str(tmp_path / "f.pdf"), ["X", "X"])
+    notify = _notify()
+    assert m.deduplicar_arquivos([pdf], "relatar", notify) == [pdf]
+    assert "- f.pdf p.2 = f.pdf p.1" in [s for tipo, s in notify.msgs if tipo == "info"][-1]
+
+
+def test_relatorio_marca_similares_e_resume_listas_longas():
+    achadas = [{"doc": 1, "arquivo": "/x/b.pdf", "pagina": j, "doc_original": 0, "original": "/x/a.pdf",
+                "pagina_original": j, "tipo": "similar" if j == 1 else "exata"} for j in range(1, 31)]
+    texto = m._texto_relatorio_duplicatas(achadas, False, {0: 40, 1: 40})
+    linhas = texto.splitlines()
+    assert linhas[0] == "30 página(s) duplicada(s) encontrada(s):"
+    assert linhas[1] == "- b.pdf p.1 = a.pdf p.1 (similar)"
+    assert linhas[2] == "- b.pdf p.2 = a.pdf p.2"
+    assert len(linhas) == 25 and linhas[-1] == "… e mais 7 linha(s) no relatório"
+
+
+# ===================== Hash perceptual =====================
+
+def _scan(semente: int, ruido: int = 0) -> Image.Image:
+    rnd = random.Random(semente)
+    img = Image.new("L", (170, 220), 255)
+    px = img.load()
+    for _ in range(40):   # blocos de "texto" em posições fixas pela semente
+        x, y = rnd.randrange(10, 140), rnd.randrange(10, 190)
+        for i in range(x, x + 25):
+            for j in range(y, y + 8):
+                px[i, j] = 30
+    if ruido:
+        rnd = random.Random(semente + 1000)
+        for i in range(170):
+            for j in range(220):
+                px[i, j] = max(0, min(255, px[i, j] + rnd.randint(-ruido, ruido)))
+    return img
+
+
+def test_dhash_tem_256_bits_e_ignora_pagina_lisa():
+    h = m._dhash(_scan(1))
+    assert len(h) == 64 and int(h, 16) > 0
+    assert m._dhash(Image.new("L", (100, 100), 250)) == ""
+
+
+def test_distancia_hash():
+    assert m._distancia_hash("0f", "0f") == 0
+    assert m._distancia_hash("0f", "00") == 4
+    assert m._distancia_hash("f" * 64, "0" * 64) == 256
+
+
+def test_rescan_fica_dentro_do_limiar_e_outra_pagina_fora():
+    original = m._dhash(_scan(1))
+    rescan = m._dhash(_scan(1, ruido=12).resize((150, 194)))
+    outra = m._dhash(_scan(2))
+    assert m._distancia_hash(original, rescan) <= m.DUPLICATA_DISTANCIA_MAX
+    assert m._distancia_hash(original, outra) > m.DUPLICATA_DISTANCIA_MAX
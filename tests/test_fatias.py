@@ -0,0 +1,91 @@
+import os
+import threading
+from queue import Queue
+
+import pytest
+from PyPDF2 import PdfReader
+
+import testesunirecomprimirpdf as m
+from pdfs_sinteticos import esperado, gerar_pdf, marcas
+
+
+def _paginas(fatia):
+    return sum(fim - ini for _, ini, fim in fatia)
+
+
+def _achatar(fatias):
+    return [(path, j) for fatia in fatias for path, ini, fim in fatia for j in range(ini, fim)]
+
+
+@pytest.mark.parametrize("tamanhos, n", [([60], 4), ([10, 25, 7], 3), ([1, 1, 1, 40], 2), ([7, 8], 5), ([3], 8)])
+def test_fatias_cobrem_as_paginas_em_ordem_com_tamanhos_parecidos(tamanhos, n):
+    entrada = [(f"{k}.pdf", t) for k, t in enumerate(tamanhos)]
+    fatias = m._planejar_fatias(entrada, n)
+    assert _achatar(fatias) == [(p, j) for p, t in entrada for j in range(t)]
+    assert len(fatias) == min(n, sum(tamanhos))
+    por_fatia = [_paginas(f) for f in fatias]
+    assert max(por_fatia) - min(por_fatia) <= 1
+
+
+def test_fatia_atravessa_a_fronteira_entre_arquivos():
+    # 10 páginas em 3 fatias: 4 + 3 + 3
+    fatias = m._planejar_fatias([("a.pdf", 5), ("b.pdf", 5)], 3)
+    assert fatias == [[("a.pdf", 0, 4)], [("a.pdf", 4, 5), ("b.pdf", 0, 2)], [("b.pdf", 2, 5)]]
+
+
+def test_escrever_fatia_junta_os_intervalos(tmp_path):
+    a = gerar_pdf(str(tmp_path / "a.pdf"), 4, "A")
+    b = gerar_pdf(str(tmp_path / "b.pdf"), 3, "B")
+    saida = str(tmp_path / "f.pdf")
+    m._escrever_fatia([(a, 2, 4), (b, 0, 2)], saida)
+    with open(saida, "rb") as f:
+        assert marcas(f.read()) == ["A 3", "A 4", "B 1", "B 2"]
+
+
+def _gs_falso(chamadas, falhar=lambda entradas: False):
+    # "comprime" copiando: sem GS, só a orquestração das fatias
+    def gs(input_files, output_pdf, **k):
+        chamadas.append([os.path.basename(p) for p in input_files])
+        if falhar(input_files):
+            return False
+        m.unir_pdfs_sem_recomprimir(input_files, output_pdf)
+        return True
+    return gs
+
+
+def _entradas(tmp_path, n_a=40, n_b=35):
+    return [gerar_pdf(str(tmp_path / "a.pdf"), n_a, "A"), gerar_pdf(str(tmp_path / "b.pdf"), n_b, "B")]
+
+
+def test_conjunto_grande_em_fatias_paralelas_mantem_a_ordem(tmp_path, monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(m, "gs_comprimir_para_pdf", _gs_falso(chamadas))
+    saida = str(tmp_path / "saida.pdf")
+    with m.AreaStaging() as stage:
+        assert m.gs_comprimir_em_fatias(_entradas(tmp_path), saida, "/ebook", m.Notifier(Queue()),
+                                        threading.Event(), max_workers=4, stage=stage)
+        assert not [n for n in os.listdir(stage.dir) if n.startswith("fatias_")]
+    assert len(chamadas) == min(4, 75 // m.FATIA_MIN_PAGINAS)
+    assert all(len(c) == 1 and c[0].startswith("fatia_") for c in chamadas)
+    with open(saida, "rb") as f:
+        assert marcas(f.read()) == esperado("A", 40) + esperado("B", 35)
+
+
+def test_conjunto_pequeno_vai_direto_para_uma_chamada(tmp_path, monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(m, "gs_comprimir_para_pdf", _gs_falso(chamadas))
+    entradas = _entradas(tmp_path, 20, 10)
+    assert m.gs_comprimir_em_fatias(entradas, str(tmp_path / "s.pdf"), "/ebook", m.Notifier(Queue()),
+                                    threading.Event(), max_workers=4)
+    assert chamadas == [["a.pdf", "b.pdf"]]
+
+
+def test_fatia_que_falha_cai_para_o_conjunto_inteiro(tmp_path, monkeypatch):
+    chamadas = []
+    falhar = lambda entradas: os.path.basename(entradas[0]) == "fatia_001.pdf"
+    monkeypatch.setattr(m, "gs_comprimir_para_pdf", _gs_falso(chamadas, falhar))
+    saida = str(tmp_path / "saida.pdf")
+    assert m.gs_comprimir_em_fatias(_entradas(tmp_path), saida, "/ebook", m.Notifier(Queue()),
+                                    threading.Event(), max_workers=2)
+    assert chamadas[-1] == ["a.pdf", "b.pdf"]
+    assert len(PdfReader(saida).pages) == 75
@@ -0,0 +1,142 @@
+import io
+import json
+import os
+import stat
+import sys
+import threading
+from queue import Queue
+
+import pytest
+from PyPDF2 import PdfReader
+
+import testesunirecomprimirpdf as m
+from pdfs_sinteticos import gerar_pdf
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    with open(gerar_pdf(str(tmp_path / "a.pdf"), 3, "A"), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture(autouse=True)
+def _pipe_disponivel(monkeypatch):
+    monkeypatch.setattr(m, "_gs_pipe_indisponivel", False)
+
+
+def _gs_falso(tmp_path, monkeypatch, corpo: str) -> str:
+    # executável que faz o papel do GS: grava os argumentos e roda `corpo` com os bytes do stdin
+    if sys.platform.startswith("win"):
+        pytest.skip("executável de script só em POSIX")
+    argv = str(tmp_path / "argv.json")
+    script = tmp_path / "gs"
+    script.write_text(f"#!{sys.executable}\nimport json, sys\n"
+                      f"json.dump(sys.argv[1:], open({argv!r}, 'w'))\n"
+                      "dados = sys.stdin.buffer.read()\n" + corpo, encoding="utf-8")
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setattr(m, "_encontrar_ghostscript", lambda: str(script))
+    return argv
+
+
+# ===================== gs_comprimir_em_memoria =====================
+
+def test_pdf_entra_pelo_stdin_e_sai_pelo_stdout(tmp_path, monkeypatch, pdf):
+    argv = _gs_falso(tmp_path, monkeypatch, "sys.stderr.write('Page 1\\n'); sys.stdout.buffer.write(dados)")
+    paginas = []
+    assert m.gs_comprimir_em_memoria(pdf, "/ebook", m.Notifier(Queue()), ao_paginar=paginas.append) == pdf
+    with open(argv) as f:
+        args = json.load(f)
+    assert args[-3:] == ["-sstdout=%stderr", "-sOutputFile=-", "-"] and paginas == [1]
+    assert not [n for n in os.listdir(tmp_path) if n.endswith((".lst", ".pdf")) and n != "a.pdf"]
+
+
+@pytest.mark.parametrize("corpo, erro", [
+    ("sys.stdout.buffer.write(b'Error: /undefined')", "a saída não é um PDF"),
+    ("sys.stderr.write('Error: /ioerror reading stdin\\n'); sys.exit(1)", "Error: /ioerror reading stdin"),
+])
+def test_falha_no_pipe_devolve_none_e_guarda_o_erro_sem_avisar(tmp_path, monkeypatch, pdf, corpo, erro):
+    _gs_falso(tmp_path, monkeypatch, corpo)
+    notify = m.Notifier(Queue())
+    erros = []
+    assert m.gs_comprimir_em_memoria(pdf, "/ebook", notify, erros=erros) is None
+    assert erros == [erro] and notify.msgs == []
+
+
+# ===================== comprimir_para_bytes =====================
+
+def _caminhos(monkeypatch, pipe, arquivo):
+    chamadas = []
+
+    def em_memoria(dados, qualidade, notify, erros=None, **k):
+        chamadas.append("pipe")
+        if pipe is None and erros is not None:
+            erros.append("Error: /ioerror")
+        return pipe
+
+    def para_pdf(entradas, saida, **k):
+        chamadas.append("arquivo")
+        if arquivo is not None:
+            with open(saida, "wb") as f:
+                f.write(arquivo)
+        return arquivo is not None
+
+    monkeypatch.setattr(m, "gs_comprimir_em_memoria", em_memoria)
+    monkeypatch.setattr(m, "comprimir_para_pdf", para_pdf)
+    return chamadas
+
+
+def test_entrada_pequena_vai_pelo_pipe(monkeypatch, pdf):
+    chamadas = _caminhos(monkeypatch, pipe=b"%PDF-pipe", arquivo=b"%PDF-arquivo")
+    assert m.comprimir_para_bytes(pdf, "/ebook", m.Notifier(Queue())) == b"%PDF-pipe"
+    assert chamadas == ["pipe"]
+
+
+def test_entrada_grande_ou_motor_de_imagens_vai_por_arquivo(monkeypatch, pdf):
+    chamadas = _caminhos(monkeypatch, pipe=b"%PDF-pipe", arquivo=b"%PDF-arquivo")
+    monkeypatch.setattr(m, "GS_PIPE_MAX_MB", len(pdf) / (2 * 1024 * 1024))
+    assert m.comprimir_para_bytes(pdf, "/ebook", m.Notifier(Queue())) == b"%PDF-arquivo"
+    monkeypatch.setattr(m, "GS_PIPE_MAX_MB", 24)
+    assert m.comprimir_para_bytes(pdf, "/ebook", m.Notifier(Queue()), motor="imagens") == b"%PDF-arquivo"
+    assert chamadas == ["arquivo", "arquivo"]
+
+
+def test_pipe_que_falha_onde_o_arquivo_funciona_e_desligado(monkeypatch, pdf):
+    chamadas = _caminhos(monkeypatch, pipe=None, arquivo=b"%PDF-arquivo")
+    with m.AreaStaging() as stage:
+        assert m.comprimir_para_bytes(pdf, "/ebook", m.Notifier(Queue()), stage=stage) == b"%PDF-arquivo"
+        assert [n for n in os.listdir(stage.dir) if n.startswith("buf_")] == []   # temporários liberados
+    assert m._gs_pipe_indisponivel
+    m.comprimir_para_bytes(pdf, "/ebook", m.Notifier(Queue()))
+    assert chamadas == ["pipe", "arquivo", "arquivo"]
+
+
+def test_entrada_ruim_nao_desliga_o_pipe_e_avisa_com_o_erro_dele(monkeypatch, pdf):
+    _caminhos(monkeypatch, pipe=None, arquivo=None)
+    notify = m.Notifier(Queue())
+    assert m.comprimir_para_bytes(pdf, "/ebook", notify) is None
+    assert not m._gs_pipe_indisponivel
+    (tipo, msg), = notify.msgs
+    assert tipo == "warn" and "Error: /ioerror" in msg
+
+
+def test_cancelado_no_pipe_nao_tenta_por_arquivo(monkeypatch, pdf):
+    chamadas = _caminhos(monkeypatch, pipe=None, arquivo=b"%PDF-arquivo")
+    cancel = threading.Event()
+    cancel.set()
+    assert m.comprimir_para_bytes(pdf, "/ebook", m.Notifier(Queue()), cancel_flag=cancel) is None
+    assert chamadas == ["pipe"]
+
+
+@pytest.mark.skipif(m._encontrar_ghostscript() is None, reason="Ghostscript não instalado")
+def test_pipe_com_ghostscript_de_verdade(pdf):
+    paginas = []
+    saida = m.gs_comprimir_em_memoria(pdf, "/screen", m.Notifier(Queue()), ao_paginar=paginas.append)
+    assert saida is not None and len(PdfReader(io.BytesIO(saida)).pages) == 3
+    assert paginas == [1, 2, 3]
+
+
+def test_timeout_cresce_com_arquivos_e_tamanho_e_tem_teto():
+    base = m._timeout_gs(1, 0)
+    assert base >= m.GS_TIMEOUT_SEC
+    assert m._timeout_gs(10, 0) >= base and m._timeout_gs(1, 200 * 1024 * 1024) > base
+    assert m._timeout_gs(1000, 10 * 1024 ** 3) == 900
@@ -0,0 +1,54 @@
+import pytest
+
+from pdfs_sinteticos import gerar_pdf, marcas
+from testesunirecomprimirpdf import IndicePaginas, escrever_intervalo_de_paginas
+
+
+TODAS = ["P 1", "P 2", "", "P 4", "P 5", "", "P 7", "P 8"]   # índices 2 e 5 em branco
+
+
+@pytest.fixture
+def origem(tmp_path):
+    return gerar_pdf(str(tmp_path / "origem.pdf"), 8, "P", brancas={2, 5})
+
+
+def _ler(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_varios_intervalos_do_mesmo_indice(origem, tmp_path):
+    indice = IndicePaginas(origem)
+    assert indice.n_paginas == 8
+    for n, (a, b) in enumerate([(0, 2), (6, 8), (0, 8), (3, 5)]):
+        saida = str(tmp_path / f"parte_{n}.pdf")
+        assert indice.escrever_intervalo(a, b, saida, remover_brancos=False) == b - a
+        assert marcas(_ler(saida)) == TODAS[a:b]
+
+
+def test_remove_paginas_em_branco_do_intervalo(origem, tmp_path):
+    saida = str(tmp_path / "sem_brancas.pdf")
+    assert IndicePaginas(origem).escrever_intervalo(1, 7, saida, remover_brancos=True) == 4
+    assert marcas(_ler(saida)) == ["P 2", "P 4", "P 5", "P 7"]
+
+
+def test_igual_a_extracao_avulsa(origem, tmp_path):
+    indice = IndicePaginas(origem)
+    indice.escrever_intervalo(0, 3, str(tmp_path / "antes.pdf"))
+    indice.escrever_intervalo(3, 8, str(tmp_path / "indice.pdf"))
+    escrever_intervalo_de_paginas(origem, 3, 8, str(tmp_path / "avulsa.pdf"))
+    assert _ler(tmp_path / "indice.pdf") == _ler(tmp_path / "avulsa.pdf")
+
+
+def test_intervalo_em_memoria_igual_ao_arquivo_temporario(origem, tmp_path):
+    indice = IndicePaginas(origem)
+    saida = str(tmp_path / "intervalo.pdf")
+    assert indice.escrever_intervalo(1, 7, saida, remover_brancos=True) == 4
+    dados, n = indice.intervalo_em_memoria(1, 7, remover_brancos=True, compacto=False)
+    assert n == 4 and dados == _ler(saida)
+
+
+def test_intervalo_em_memoria_no_formato_final(origem):
+    dados, n = IndicePaginas(origem).intervalo_em_memoria(0, 8, compacto=True)
+    assert n == 8 and b"/ObjStm" in dados
+    assert marcas(dados) == TODAS
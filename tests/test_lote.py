@@ -0,0 +1,116 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import unir_comprimir_lote as lote
+
+
+def _manifesto(tmp_path, *linhas) -> str:
+    path = tmp_path / "casos.jsonl"
+    path.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def _pdfs(pasta, *nomes):
+    os.makedirs(pasta, exist_ok=True)
+    for nome in nomes:
+        with open(os.path.join(pasta, nome), "wb") as f:
+            f.write(b"%PDF-1.4\n")
+
+
+def _args(**k):
+    base = dict(qualidade="/ebook", remover_brancos=False, preciso=False, sem_paralelo=False,
+                motor="gs", duplicatas="desligado")
+    base.update(k)
+    return SimpleNamespace(**base)
+
+
+# ===================== Manifesto =====================
+
+def test_manifesto_ignora_vazias_e_comentarios(tmp_path):
+    path = _manifesto(tmp_path,
+                      "# casos de março",
+                      '{"destino": "/s/a.pdf", "arquivos": ["/c/1.pdf", "/c/2.pdf"]}',
+                      "",
+                      '{"destino": "/s/b.pdf", "arquivos": ["/c/3.pdf"], "obs": "campos extras não atrapalham"}')
+    assert lote.ler_manifesto(path) == [("/s/a.pdf", ["/c/1.pdf", "/c/2.pdf"]), ("/s/b.pdf", ["/c/3.pdf"])]
+
+
+@pytest.mark.parametrize("linha, erro", [
+    ('{"destino": "/s/a.pdf"', "casos.jsonl:2: linha inválida"),
+    ('{"arquivos": ["/c/1.pdf"]}', "casos.jsonl:2: linha inválida"),
+    ('{"destino": "/s/a.pdf", "arquivos": []}', "casos.jsonl:2: caso sem arquivos"),
+])
+def test_manifesto_invalido_aponta_a_linha(tmp_path, linha, erro):
+    path = _manifesto(tmp_path, "# cabeçalho", linha)
+    with pytest.raises(ValueError, match=erro):
+        lote.ler_manifesto(path)
+
+
+# ===================== Pasta =====================
+
+def test_cada_subpasta_com_pdfs_e_um_caso_em_ordem_natural(tmp_path):
+    raiz, saida = str(tmp_path / "Casos"), str(tmp_path / "saida")
+    _pdfs(os.path.join(raiz, "caso 10"), "b.pdf")
+    _pdfs(os.path.join(raiz, "caso 2"), "10.pdf", "2.PDF", "1.pdf", "notas.txt")
+    _pdfs(os.path.join(raiz, "caso 2", "anexos"), "a.pdf")
+    _pdfs(os.path.join(raiz, "vazia"))
+    casos = lote.casos_da_pasta(raiz, saida)
+    assert [os.path.relpath(d, saida) for d, _ in casos] == [
+        "caso 2.pdf", os.path.join("caso 2", "anexos") + ".pdf", "caso 10.pdf"]
+    assert [os.path.basename(a) for a in casos[0][1]] == ["1.pdf", "2.PDF", "10.pdf"]
+
+
+def test_pdfs_na_raiz_levam_o_nome_da_raiz_e_a_saida_dentro_dela_e_ignorada(tmp_path):
+    raiz = str(tmp_path / "Processo")
+    saida = os.path.join(raiz, "comprimidos")
+    _pdfs(raiz, "a.pdf")
+    _pdfs(saida, "Processo.pdf")   # resultado de uma rodada anterior
+    assert lote.casos_da_pasta(raiz, saida) == [(os.path.join(saida, "Processo.pdf"), [os.path.join(raiz, "a.pdf")])]
+
+
+# ===================== Casos e resumo =====================
+
+def test_caso_com_arquivo_faltando_falha_sem_processar_e_grava_resumo(tmp_path, monkeypatch):
+    monkeypatch.setattr(lote, "processar_com_limite_worker", lambda *a, **k: pytest.fail("não devia processar"))
+    destino = str(tmp_path / "s" / "caso.pdf")
+    resumo = lote.processar_caso(destino, [str(tmp_path / "sumiu.pdf")], _args(), None, None, None)
+    assert not resumo["ok"] and resumo["partes"] == []
+    assert resumo["mensagens"][0]["tipo"] == "error" and "sumiu.pdf" in resumo["mensagens"][0]["texto"]
+    with open(lote.caminho_resumo(destino), encoding="utf-8") as f:
+        assert json.load(f)["destino"] == destino
+
+
+def test_caso_repassa_as_opcoes_e_resume_as_partes(tmp_path, monkeypatch):
+    _pdfs(str(tmp_path), "a.pdf")
+    destino = str(tmp_path / "s" / "caso.pdf")
+    recebido = {}
+
+    def processar(arquivos, destino, qualidade, remover_brancos, turbo, notify, cancel_flag, **k):
+        recebido.update(k, qualidade=qualidade, turbo=turbo)
+        with open(destino, "wb") as f:
+            f.write(b"x" * 1024)
+        return [destino]
+
+    monkeypatch.setattr(lote, "processar_com_limite_worker", processar)
+    resumo = lote.processar_caso(destino, [str(tmp_path / "a.pdf")], _args(preciso=True, motor="imagens"),
+                                 "executor", "cache", None)
+    assert resumo["ok"] and resumo["modo"] == "preciso" and resumo["partes"][0]["arquivo"] == destino
+    assert recebido["turbo"] is False and recebido["motor"] == "imagens"
+    assert (recebido["executor"], recebido["cache_disco"]) == ("executor", "cache")
+
+
+def test_main_codigos_de_saida(tmp_path, monkeypatch, capsys):
+    assert lote.main(["--manifesto", _manifesto(tmp_path, "{quebrado")]) == 2
+    assert "linha inválida" in capsys.readouterr().err
+    assert lote.main(["--pasta", str(tmp_path / "vazia"), "--saida", str(tmp_path / "s")]) == 0
+    with pytest.raises(SystemExit):
+        lote.main(["--pasta", str(tmp_path)])   # --saida é obrigatória com --pasta
+
+    monkeypatch.setattr(lote, "processar_caso", lambda destino, *a: {"destino": destino, "ok": destino.endswith("a.pdf")})
+    casos = _manifesto(tmp_path, '{"destino": "/s/a.pdf", "arquivos": ["/c/1.pdf"]}',
+                       '{"destino": "/s/b.pdf", "arquivos": ["/c/2.pdf"]}')
+    assert lote.main(["--manifesto", casos, "--workers", "1"]) == 1
+    assert "falhou: /s/b.pdf" in capsys.readouterr().out
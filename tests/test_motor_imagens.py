@@ -0,0 +1,81 @@
+import random
+import zlib
+from queue import Queue
+
+import pytest
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, DictionaryObject, FloatObject, NameObject, NumberObject
+
+import testesunirecomprimirpdf as m
+
+LARGURA, ALTURA = 600, 400
+
+
+def _stream(dados: bytes, **chaves):
+    s = DecodedStreamObject()
+    s.set_data(dados)
+    s.update({NameObject(k): v for k, v in chaves.items()})
+    return s
+
+
+def _pdf_com_imagem(path, conteudo: bytes, em_form: bool = False) -> str:
+    # uma imagem 600x400 em cinza (ruído, ~240 KB em Flate) numa página Letter
+    rnd = random.Random(3)
+    img = _stream(b"", **{"/Type": NameObject("/XObject"), "/Subtype": NameObject("/Image"),
+                          "/Width": NumberObject(LARGURA), "/Height": NumberObject(ALTURA),
+                          "/ColorSpace": NameObject("/DeviceGray"), "/BitsPerComponent": NumberObject(8),
+                          "/Filter": NameObject("/FlateDecode")})
+    img._data = zlib.compress(bytes(rnd.getrandbits(8) for _ in range(LARGURA * ALTURA)))
+    w = PdfWriter()
+    xobjs = DictionaryObject({NameObject("/Im0"): w._add_object(img)})
+    if em_form:
+        # o Form reduz pela metade tudo o que desenha
+        form = _stream(conteudo, **{"/Type": NameObject("/XObject"), "/Subtype": NameObject("/Form"),
+                                    "/BBox": ArrayObject([FloatObject(0), FloatObject(0), FloatObject(612), FloatObject(792)]),
+                                    "/Matrix": ArrayObject([FloatObject(v) for v in (0.5, 0, 0, 0.5, 0, 0)]),
+                                    "/Resources": DictionaryObject({NameObject("/XObject"): xobjs})})
+        xobjs = DictionaryObject({NameObject("/Fm0"): w._add_object(form)})
+        conteudo = b"q 1 0 0 1 10 10 cm /Fm0 Do Q"
+    page = PageObject.create_blank_page(None, 612, 792)
+    page[NameObject("/Contents")] = w._add_object(_stream(conteudo))
+    page[NameObject("/Resources")] = DictionaryObject({NameObject("/XObject"): xobjs})
+    w.add_page(page)
+    with open(path, "wb") as f:
+        w.write(f)
+    return path
+
+
+def _tamanho_desenhado(path):
+    (_, _, tamanho), = m._imagens_recomprimiveis(PdfReader(path)).values()
+    return tamanho
+
+
+def test_tamanho_sai_da_matriz_do_desenho(tmp_path):
+    pdf = _pdf_com_imagem(str(tmp_path / "a.pdf"), b"q 2 0 0 2 0 0 cm q 72 0 0 48 36 36 cm /Im0 Do Q Q")
+    assert _tamanho_desenhado(pdf) == pytest.approx((2.0, 4 / 3))
+
+
+def test_imagem_girada_mantem_largura_e_altura(tmp_path):
+    pdf = _pdf_com_imagem(str(tmp_path / "a.pdf"), b"q 0 144 -96 0 300 100 cm /Im0 Do Q")
+    assert _tamanho_desenhado(pdf) == pytest.approx((2.0, 4 / 3))
+
+
+def test_matriz_do_form_entra_na_conta(tmp_path):
+    pdf = _pdf_com_imagem(str(tmp_path / "a.pdf"), b"q 144 0 0 96 0 0 cm /Im0 Do Q", em_form=True)
+    assert _tamanho_desenhado(pdf) == pytest.approx((1.0, 2 / 3))
+
+
+def test_sem_desenho_supoe_a_pagina_inteira(tmp_path):
+    pdf = _pdf_com_imagem(str(tmp_path / "a.pdf"), b"")
+    assert _tamanho_desenhado(pdf) == pytest.approx((11.0, 11.0 * ALTURA / LARGURA))
+
+
+def test_reduz_pelo_dpi_do_desenho_num_pool_spawn(tmp_path):
+    # 600 px em 2 polegadas = 300 DPI efetivos: a 100 DPI a imagem cai para 200x133
+    # (supondo a página inteira seriam ~55 DPI e nada seria reduzido)
+    pdf = _pdf_com_imagem(str(tmp_path / "a.pdf"), b"q 144 0 0 96 72 72 cm /Im0 Do Q")
+    saida = str(tmp_path / "b.pdf")
+    assert m._obter_pool_processos()._mp_context.get_start_method() == "spawn"
+    assert m._recomprimir_imagens_arquivo(pdf, saida, 100, 60, m.Notifier(Queue())) == 1
+    img = PdfReader(saida).pages[0]["/Resources"]["/XObject"]["/Im0"].get_object()
+    assert (img["/Width"], img["/Height"], img["/Filter"]) == (200, 133, "/DCTDecode")
@@ -0,0 +1,93 @@
+import itertools
+import random
+
+from testesunirecomprimirpdf import _economia_dedup, particionar_ordenado
+
+
+def _valido(grupos, n):
+    # intervalos contíguos, em ordem, cobrindo todos os itens
+    return [a for a, _ in grupos] == [0] + [b for _, b in grupos[:-1]] and grupos[-1][1] == n
+
+
+def _soma(tamanhos, base, recursos, a, b):
+    economia = _economia_dedup(recursos, a, b) if recursos is not None else 0
+    return base + sum(tamanhos[a:b]) - economia
+
+
+def _forca_bruta(tamanhos, limite, base):
+    # (nº de partes, maior parte) da melhor divisão contígua que respeita o limite
+    n = len(tamanhos)
+    melhor = None
+    for k in range(n):
+        for cortes in itertools.combinations(range(1, n), k):
+            bordas = (0,) + cortes + (n,)
+            grupos = list(zip(bordas, bordas[1:]))
+            somas = [base + sum(tamanhos[a:b]) for a, b in grupos]
+            if any(s > limite and b - a > 1 for s, (a, b) in zip(somas, grupos)):
+                continue
+            cand = (len(grupos), max(somas))
+            if melhor is None or cand < melhor:
+                melhor = cand
+    return melhor
+
+
+def test_tudo_cabe_em_uma_parte():
+    assert particionar_ordenado([1, 2, 3], limite=10, base=1) == [(0, 3)]
+
+
+def test_menor_numero_de_partes():
+    assert particionar_ordenado([4, 4, 4, 4], limite=10, base=1) == [(0, 2), (2, 4)]
+
+
+def test_entre_as_minimas_escolhe_a_menor_parte_maxima():
+    # guloso daria (5, 1, 1 | 5) com parte máxima 7; o ótimo equilibra em 6 + 6
+    assert particionar_ordenado([5, 1, 1, 5], limite=8, base=0) == [(0, 2), (2, 4)]
+
+
+def test_item_acima_do_limite_fica_sozinho():
+    assert particionar_ordenado([3, 20, 3], limite=10, base=0) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_sequencia_vazia():
+    assert particionar_ordenado([], limite=10, base=0) == []
+
+
+def test_recursos_deduplicados_juntam_documentos():
+    # 6 + 6 não cabe em 10, mas os dois repetem um recurso de 4 bytes que a união grava uma vez
+    assert particionar_ordenado([6, 6], limite=10, base=0) == [(0, 1), (1, 2)]
+    recursos = [{b"fonte": 4}, {b"fonte": 4}]
+    assert particionar_ordenado([6, 6], limite=10, base=0, recursos=recursos) == [(0, 2)]
+
+
+def test_recurso_repetido_tres_vezes_desconta_duas():
+    recursos = [{b"f": 3}, {b"f": 3, b"g": 2}, {b"f": 3, b"g": 2}]
+    assert _economia_dedup(recursos, 0, 3) == 3 + 3 + 2
+    assert _economia_dedup(recursos, 1, 3) == 3 + 2
+    assert particionar_ordenado([5, 5, 5], limite=8, base=0, recursos=recursos) == [(0, 3)]
+
+
+def test_igual_a_forca_bruta_em_sequencias_aleatorias():
+    rnd = random.Random(1234)
+    for _ in range(300):
+        n = rnd.randint(1, 8)
+        tamanhos = [rnd.randint(1, 12) for _ in range(n)]
+        limite, base = rnd.randint(8, 30), rnd.randint(0, 3)
+        grupos = particionar_ordenado(tamanhos, limite, base)
+        assert _valido(grupos, n)
+        somas = [_soma(tamanhos, base, None, a, b) for a, b in grupos]
+        assert all(s <= limite or b - a == 1 for s, (a, b) in zip(somas, grupos))
+        assert (len(grupos), max(somas)) == _forca_bruta(tamanhos, limite, base)
+
+
+def test_intervalos_com_dedup_respeitam_o_limite():
+    rnd = random.Random(99)
+    for _ in range(200):
+        n = rnd.randint(1, 10)
+        tamanhos = [rnd.randint(3, 12) for _ in range(n)]
+        recursos = [{h: 2 for h in rnd.sample([b"a", b"b", b"c", b"d"], rnd.randint(0, 3))} for _ in range(n)]
+        grupos = particionar_ordenado(tamanhos, 20, 1, recursos=recursos)
+        assert _valido(grupos, n)
+        for a, b in grupos:
+            assert _soma(tamanhos, 1, recursos, a, b) <= 20 or b - a == 1
+        # com dedup nunca precisa de mais partes do que sem
+        assert len(grupos) <= len(particionar_ordenado(tamanhos, 20, 1))
@@ -0,0 +1,188 @@
+import os
+import threading
+
+import pytest
+
+import testesunirecomprimirpdf as m
+
+
+class InterpretadorFalso:
+    """
+    Substitui o _InterpretadorGS: o job espera `liberar` (ou o cancelamento) e grava um PDF mínimo.
+    """
+    criados = []
+
+    def __init__(self, gs_path, leitura=frozenset(), escrita=frozenset()):
+        self.leitura, self.escrita = leitura, escrita
+        self.liberar = threading.Event()
+        self.encerrado = False
+        InterpretadorFalso.criados.append(self)
+
+    def cobre(self, leitura, escrita):
+        return leitura <= self.leitura and escrita <= self.escrita
+
+    def vivo(self):
+        return not self.encerrado
+
+    def encerrar(self):
+        self.encerrado = True
+
+    def executar(self, entradas, saida, opcoes, timeout, cancel_flag=None, ao_paginar=None):
+        while not self.liberar.wait(0.01):
+            if cancel_flag is not None and cancel_flag.is_set():
+                self.encerrado = True
+                return False, "cancelado"
+        with open(saida, "wb") as f:
+            f.write(b"%PDF-1.5\n%%EOF\n")
+        return True, ""
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    InterpretadorFalso.criados = []
+    monkeypatch.setattr(m, "_InterpretadorGS", InterpretadorFalso)
+    p = m.PoolGhostscript("gs", 1)
+    p._validado = True
+    yield p
+    for w in InterpretadorFalso.criados:
+        w.liberar.set()
+
+
+def _em_thread(pool, saida, cancel_flag=None):
+    resultado = {}
+    t = threading.Thread(target=lambda: resultado.update(
+        res=pool.executar([str(saida.parent / "in.pdf")], str(saida), [], 60, cancel_flag)), daemon=True)
+    t.start()
+    return t, resultado
+
+
+def _esperar(cond):
+    for _ in range(300):
+        if cond():
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("condição não atingida")
+
+
+def test_quem_espera_acorda_quando_o_ocupado_e_descartado(pool, tmp_path):
+    cancelar = threading.Event()
+    t1, r1 = _em_thread(pool, tmp_path / "a.pdf", cancelar)
+    _esperar(lambda: len(InterpretadorFalso.criados) == 1)
+    t2, r2 = _em_thread(pool, tmp_path / "b.pdf")
+    cancelar.set()
+    t1.join(3)
+    _esperar(lambda: len(InterpretadorFalso.criados) == 2)
+    InterpretadorFalso.criados[1].liberar.set()
+    t2.join(3)
+    assert not t1.is_alive() and not t2.is_alive()
+    assert r1["res"] == (False, "cancelado")
+    assert r2["res"] == (True, "")
+
+
+def test_encerrar_acorda_quem_espera(pool, tmp_path):
+    t1, r1 = _em_thread(pool, tmp_path / "a.pdf")
+    _esperar(lambda: len(InterpretadorFalso.criados) == 1)
+    t2, r2 = _em_thread(pool, tmp_path / "b.pdf")
+    pool.encerrar()
+    t2.join(3)
+    assert not t2.is_alive() and r2["res"] is None   # sem pool: o chamador roda o GS por processo
+    InterpretadorFalso.criados[0].liberar.set()
+    t1.join(3)
+    assert r1["res"] == (True, "")
+    assert InterpretadorFalso.criados[0].encerrado    # devolvido a um pool desativado: fechado
+
+
+def test_pasta_nao_liberada_troca_o_interpretador_livre(pool, tmp_path):
+    for n, pasta in enumerate(("x", "y"), start=1):
+        (tmp_path / pasta).mkdir()
+        t, r = _em_thread(pool, tmp_path / pasta / "saida.pdf")
+        _esperar(lambda: len(InterpretadorFalso.criados) == n)   # y não cabe no interpretador de x
+        InterpretadorFalso.criados[-1].liberar.set()
+        t.join(3)
+        assert r["res"] == (True, "")
+    primeiro, segundo = InterpretadorFalso.criados
+    assert primeiro.encerrado and not segundo.encerrado
+    assert segundo.escrita == frozenset([m._norm(str(tmp_path / "y"))])
+
+
+def test_so_conta_gs_que_rodou_no_pool(monkeypatch, tmp_path):
+    class SemDevice(InterpretadorFalso):
+        def executar(self, entradas, saida, opcoes, timeout, cancel_flag=None, ao_paginar=None):
+            return False, "erro"   # primeiro job falha: o pool se desativa e devolve None
+
+    monkeypatch.setattr(m, "_InterpretadorGS", SemDevice)
+    p = m.PoolGhostscript("gs", 1)
+    antes = m.gs_invocacoes()
+    assert p.executar([str(tmp_path / "in.pdf")], str(tmp_path / "a.pdf"), [], 60) is None
+    assert p.desativado and m.gs_invocacoes() == antes
+
+
+def test_interpretador_roda_com_safer_e_pastas_do_job():
+    args = m._args_interpretador_gs("gs", frozenset(["/casos/a", "/tmp/area"]), frozenset(["/tmp/area"]))
+    assert "-dSAFER" in args and "-dNOSAFER" not in args
+    assert "--permit-file-read=/casos/a/" in args and "--permit-file-read=/tmp/area/" in args
+    assert [a for a in args if a.startswith("--permit-file-write=")] == ["--permit-file-write=/tmp/area/"]
+    assert args[-1] == "-sDEVICE=nullpage"   # sem "-": o stdin roda linha a linha, não só no EOF
+    args = m._args_interpretador_gs("gs", frozenset(), frozenset(["/tmp/area"]), "/tmp/gs_pool_1.pdf")
+    assert [a for a in args if a.startswith("--permit-file-write=")] == \
+        ["--permit-file-write=/tmp/area/", "--permit-file-write=/tmp/gs_pool_1.pdf"]
+
+
+@pytest.mark.skipif(m._encontrar_ghostscript() is None, reason="Ghostscript não instalado")
+def test_pool_com_ghostscript_de_verdade(tmp_path):
+    from PyPDF2 import PdfReader
+    from pdfs_sinteticos import gerar_pdf
+    (tmp_path / "in").mkdir(); (tmp_path / "out").mkdir()
+    a = gerar_pdf(str(tmp_path / "in" / "a.pdf"), 3, "A")
+    b = gerar_pdf(str(tmp_path / "in" / "b.pdf"), 2, "B")
+    p = m.PoolGhostscript(m._encontrar_ghostscript(), 1)
+    paginas = []
+    try:
+        # o mesmo interpretador, sob SAFER: cada saída precisa sair fechada, com %%EOF
+        for k in range(3):
+            saida = str(tmp_path / "out" / f"s{k}.pdf")
+            ok, _ = p.executar([a, b], saida, m._gs_opcoes("/ebook"), 60, ao_paginar=paginas.append)
+            assert ok and not p.desativado and len(PdfReader(saida).pages) == 5
+        assert p._criados == 1 and paginas[:5] == [1, 2, 3, 4, 5]
+        # fora das pastas liberadas (e da temporária, que o GS sempre libera) não grava
+        w = p._livres[0]
+        fora = os.path.join(os.path.dirname(m.__file__), "_fora_do_pool.pdf")
+        w.executar([a], fora, m._gs_opcoes("/ebook"), 60)
+        assert not os.path.exists(fora)
+        descarte = w._descarte
+    finally:
+        p.encerrar()
+    assert not os.path.exists(descarte)
+
+
+def test_ps_string_escapa_o_que_fecharia_o_literal():
+    assert m._ps_string("C:/a (1)\\b.pdf") == "(C:/a \\(1\\)\\\\b.pdf)"
+    assert m._ps_string("ção\n.pdf") == "(\\303\\247\\303\\243o\\012.pdf)"
+    # nada de parêntese sem escape: o texto não sai do literal nem injeta PostScript
+    injecao = m._ps_string(") pop (x) deletefile (")
+    assert injecao.count("(") == injecao.count("\\(") + 1 and injecao.count(")") == injecao.count("\\)") + 1
+
+
+def test_opcoes_do_pdfwrite_viram_parametros_do_distiller():
+    settings, params = m._opcoes_para_distiller(
+        ["-sDEVICE=pdfwrite", "-dPDFSETTINGS=/ebook", "-dColorImageResolution=110", "-dNOPAUSE",
+         "-sOutputFile=x.pdf", "-sColorConversionStrategy=RGB"])
+    assert settings == "/ebook"
+    assert params == "<< /ColorImageResolution 110 /ColorConversionStrategy (RGB) >>"
+    assert m._opcoes_para_distiller(m._gs_opcoes("/screen", 72))[0] == "/screen"
+
+
+@pytest.mark.skipif(m._encontrar_ghostscript() is None, reason="Ghostscript não instalado")
+def test_pool_le_e_grava_caminhos_com_parenteses_e_acentos(tmp_path):
+    from PyPDF2 import PdfReader
+    from pdfs_sinteticos import gerar_pdf
+    pasta = tmp_path / "Ação (2024)"
+    pasta.mkdir()
+    entrada = gerar_pdf(str(pasta / "petição (1).pdf"), 2, "A")
+    saida = str(pasta / "saída (1).pdf")
+    p = m.PoolGhostscript(m._encontrar_ghostscript(), 1)
+    try:
+        ok, _ = p.executar([entrada], saida, m._gs_opcoes("/ebook"), 60)
+        assert ok and p._validado and len(PdfReader(saida).pages) == 2
+    finally:
+        p.encerrar()
@@ -0,0 +1,74 @@
+import os
+from queue import Queue
+
+import pytest
+
+import testesunirecomprimirpdf as m
+from pdfs_sinteticos import gerar_pdf, imagem, marcas
+
+
+# ===================== Amostragem =====================
+
+def test_amostra_espalhada_pelo_conjunto_e_agrupada_por_arquivo():
+    grupos = m._amostrar_paginas([("a.pdf", 10), ("b.pdf", 0), ("c.pdf", 30)], 4)
+    assert grupos == [("a.pdf", [5]), ("c.pdf", [5, 15, 25])]
+
+
+def test_conjunto_menor_que_a_amostra_entra_inteiro():
+    assert m._amostrar_paginas([("a.pdf", 2), ("b.pdf", 1)], 8) == [("a.pdf", [0, 1]), ("b.pdf", [0])]
+
+
+@pytest.mark.parametrize("total, n", [(1, 8), (9, 8), (100, 8), (1000, 3)])
+def test_amostra_sem_repetir_paginas(total, n):
+    (_, indices), = m._amostrar_paginas([("a.pdf", total)], n)
+    assert indices == sorted(set(indices)) and len(indices) == min(total, n)
+    assert 0 <= indices[0] and indices[-1] < total
+
+
+def test_preset_acompanha_a_resolucao():
+    assert [m._preset_para_resolucao(r) for r in (300, 200, 199, 100, 99, 72)] == \
+        ["/printer", "/printer", "/ebook", "/ebook", "/screen", "/screen"]
+
+
+# ===================== Escolha =====================
+
+def _fator(r: int) -> float:
+    # tamanho comprimido / tamanho original: parte fixa (texto, fontes) + imagens com dpi²
+    return 0.1 + 1.9 * (r / 300) ** 2
+
+
+def _entradas(tmp_path):
+    return [gerar_pdf(str(tmp_path / "a.pdf"), 20, "A", imagem(1)), gerar_pdf(str(tmp_path / "b.pdf"), 12, "B", imagem(2))]
+
+
+def test_fica_com_a_maior_resolucao_que_mantem_o_minimo_de_partes(tmp_path, monkeypatch):
+    entradas = _entradas(tmp_path)
+    total = sum(os.path.getsize(p) for p in entradas)
+    amostras = []
+
+    def comprimir(dados, qualidade, notify, resolucao=None, **k):
+        amostras.append((qualidade, resolucao, marcas(dados)))
+        return b"x" * int(len(dados) * _fator(resolucao))
+
+    monkeypatch.setattr(m, "comprimir_para_bytes", comprimir)
+    # o conjunto cabe numa parte só até 150 dpi (200 já passaria do limite)
+    monkeypatch.setattr(m, "LIMITE_MB", total * _fator(150) * 1.01 / m.FATOR_PREVISAO / (1024 * 1024))
+    assert m.escolher_qualidade_auto(entradas, m.Notifier(Queue())) == ("/ebook", 150)
+    # duas compressões da mesma amostra, nos degraus extremos
+    assert [(q, r) for q, r, _ in amostras] == [("/printer", m.AUTO_RESOLUCOES[0]), ("/screen", m.AUTO_RESOLUCOES[-1])]
+    paginas = amostras[0][2]
+    assert len(paginas) == m.AUTO_AMOSTRA_PAGINAS
+    assert {p.split()[0] for p in paginas} == {"A", "B"}
+
+
+def test_sem_limite_apertado_usa_o_maior_degrau(tmp_path, monkeypatch):
+    monkeypatch.setattr(m, "comprimir_para_bytes", lambda dados, *a, resolucao=None, **k: b"x" * int(len(dados) * _fator(resolucao)))
+    assert m.escolher_qualidade_auto(_entradas(tmp_path), m.Notifier(Queue())) == ("/printer", m.AUTO_RESOLUCOES[0])
+
+
+def test_falha_na_amostra_volta_ao_padrao(tmp_path, monkeypatch):
+    monkeypatch.setattr(m, "comprimir_para_bytes", lambda *a, **k: None)
+    assert m.escolher_qualidade_auto(_entradas(tmp_path), m.Notifier(Queue())) == ("/ebook", m.GS_RESOLUCAO_PADRAO)
+    lixo = tmp_path / "lixo.pdf"
+    lixo.write_bytes(b"nada")
+    assert m.escolher_qualidade_auto([str(lixo)], m.Notifier(Queue())) == ("/ebook", m.GS_RESOLUCAO_PADRAO)
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+from queue import Queue
+
+import pytest
+
+import testesunirecomprimirpdf as m
+
+
+def _spans(rastreador):
+    rastreador.fechar()
+    with open(rastreador.caminho, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f]
+
+
+def _rastro(pasta, nome, *spans):
+    path = os.path.join(str(pasta), nome)
+    with open(path, "w", encoding="utf-8") as f:
+        for sp in spans:
+            f.write((sp if isinstance(sp, str) else json.dumps(sp)) + "\n")
+    return path
+
+
+# ===================== Rastreador =====================
+
+def test_spans_aninhados_com_atributos_e_anotacoes(tmp_path):
+    r = m.Rastreador(str(tmp_path))
+    notify = m.Notifier(Queue())
+    notify.rastreador = r
+    with notify.span("job", arquivos=2):
+        with notify.span("gs", entradas=2) as sp:
+            notify.anotar(codigo_saida=0)
+            sp["bytes_out"] = 10
+    fora, dentro = sorted(_spans(r), key=lambda sp: sp["id"])
+    assert (fora["nome"], fora["pai"], fora["arquivos"]) == ("job", None, 2)
+    assert (dentro["pai"], dentro["entradas"], dentro["bytes_out"], dentro["codigo_saida"]) == (fora["id"], 2, 10, 0)
+    assert "_anotacoes" not in dentro and dentro["dur_s"] >= 0 and dentro["cpu_s"] >= 0
+    assert fora["job"] == dentro["job"] and os.path.basename(r.caminho) == f"{r.job}.jsonl"
+
+
+def test_excecao_fica_registrada_no_span(tmp_path):
+    r = m.Rastreador(str(tmp_path))
+    with pytest.raises(ValueError):
+        with r.span("uniao"):
+            raise ValueError("xref quebrada")
+    sp, = _spans(r)
+    assert sp["erro"] == "ValueError: xref quebrada"
+
+
+def test_span_em_outra_thread_nao_tem_pai(tmp_path):
+    r = m.Rastreador(str(tmp_path))
+
+    def fatia():
+        with r.span("fatia"):
+            pass
+
+    with r.span("job"):
+        t = threading.Thread(target=fatia)
+        t.start(); t.join()
+    sp = next(sp for sp in _spans(r) if sp["nome"] == "fatia")
+    assert sp["pai"] is None and sp["thread"] != threading.current_thread().name
+
+
+def test_sem_rastreador_o_span_so_entrega_os_atributos():
+    notify = m.Notifier(Queue())
+    with notify.span("gs", entradas=1) as sp:
+        sp["bytes_out"] = 5
+        notify.anotar(codigo_saida=1)   # no-op
+    assert sp == {"entradas": 1, "bytes_out": 5}
+
+
+def test_rastros_antigos_sao_podados(tmp_path, monkeypatch):
+    monkeypatch.setattr(m, "RASTROS_MAX_ARQUIVOS", 3)
+    for n in range(5):
+        _rastro(tmp_path, f"20240101_00000{n}_1_001.jsonl")
+    r = m.Rastreador(str(tmp_path))
+    r.fechar()
+    restantes = sorted(os.listdir(tmp_path))
+    assert len(restantes) == 3 and os.path.basename(r.caminho) in restantes
+    assert "20240101_000000_1_001.jsonl" not in restantes
+
+
+# ===================== Resumo =====================
+
+def test_resumo_por_etapa_e_mais_lentos(tmp_path):
+    a = _rastro(tmp_path, "a.jsonl",
+                {"nome": "gs", "dur_s": 2.0, "cpu_s": 0.1, "bytes_in": 100, "bytes_out": 40},
+                {"nome": "gs", "dur_s": 4.0, "cpu_s": 0.1, "bytes_in": 200, "bytes_out": None},
+                "linha truncada {",
+                {"nome": "uniao", "dur_s": 1.0, "cpu_s": 0.9})
+    b = _rastro(tmp_path, "b.jsonl", *[{"nome": "staging", "dur_s": 0.25} for _ in range(20)])
+    resumo = m.resumir_rastros([a, b, str(tmp_path / "sumiu.jsonl")], top=2)
+    assert [e["nome"] for e in resumo["etapas"]] == ["gs", "staging", "uniao"]   # por tempo total
+    gs = resumo["etapas"][0]
+    assert (gs["n"], gs["total_s"], gs["media_s"], gs["p95_s"], gs["max_s"]) == (2, 6.0, 3.0, 4.0, 4.0)
+    assert (gs["cpu_s"], gs["bytes_in"], gs["bytes_out"]) == (0.2, 300, 40)
+    assert resumo["etapas"][1]["total_s"] == 5.0
+    assert [(sp["nome"], sp["dur_s"], sp["_rastro"]) for sp in resumo["lentos"]] == [("gs", 4.0, "a.jsonl"), ("gs", 2.0, "a.jsonl")]
+
+
+def test_p95_ignora_os_extremos_isolados(tmp_path):
+    spans = [{"nome": "gs", "dur_s": 1.0} for _ in range(99)] + [{"nome": "gs", "dur_s": 60.0}]
+    etapa, = m.resumir_rastros([_rastro(tmp_path, "a.jsonl", *spans)])["etapas"]
+    assert (etapa["p95_s"], etapa["max_s"]) == (1.0, 60.0)
+
+
+def test_cli_lista_as_etapas(tmp_path, capsys):
+    import unir_comprimir_lote as lote
+    _rastro(tmp_path, "a.jsonl", {"nome": "gs", "dur_s": 2.0, "paginas": 3})
+    assert lote.main(["--rastros", str(tmp_path), "--top", "1"]) == 0
+    saida = capsys.readouterr().out
+    assert "1 rastro(s)" in saida and '"paginas": 3' in saida
+    assert lote.main(["--rastros", str(tmp_path / "vazia")]) == 0
+    assert "Nenhum rastro" in capsys.readouterr().out
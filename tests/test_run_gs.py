@@ -0,0 +1,89 @@
+import io
+import sys
+import threading
+import time
+from queue import Queue
+
+import pytest
+
+import testesunirecomprimirpdf as m
+from pdfs_sinteticos import gerar_pdf
+
+
+def _falso(codigo: str):
+    # um "GS" em Python: o que _run_gs faz com o processo não depende de qual executável é
+    return [sys.executable, "-c", "import sys, time\n" + codigo]
+
+
+def _rodar(codigo: str, **k):
+    notify = k.pop("notify", None) or m.Notifier(Queue())
+    paginas = []
+    ok, err = m._run_gs(_falso(codigo), timeout=k.pop("timeout", 60), cwd=None, notify=notify,
+                        ao_paginar=paginas.append, **k)
+    return ok, err, paginas, notify
+
+
+def test_page_n_do_stdout_vira_progresso_e_sai_das_mensagens():
+    ok, err, paginas, _ = _rodar("for n in range(1, 4): print(f'Page {n}', flush=True)\n"
+                                 "print('Processing pages 1 through 3.')\n"
+                                 "sys.stderr.write('aviso de fonte\\n')")
+    assert ok and paginas == [1, 2, 3]
+    assert err == "aviso de fonte"
+
+
+@pytest.mark.parametrize("linha", ["Page 1 of 3", "  Page 2", "Pages 3", "Page x"])
+def test_so_linhas_page_n_exatas_contam(linha):
+    assert not m._RE_PAGINA_GS.match(linha)
+    _, _, paginas, _ = _rodar(f"print({linha!r})")
+    assert paginas == []
+
+
+def test_codigo_de_saida_nao_zero_avisa_com_stderr_e_stdout():
+    ok, err, paginas, notify = _rodar("print('Page 1'); print('quebrou aqui')\n"
+                                      "sys.stderr.write('Error: /undefinedfilename\\n'); sys.exit(1)")
+    assert not ok and err == "Error: /undefinedfilename" and paginas == [1]
+    (tipo, msg), = notify.msgs
+    assert tipo == "warn" and "código 1" in msg and "quebrou aqui" in msg and "Page 1" not in msg
+    assert "Dica:" in msg
+    _, _, _, calado = _rodar("sys.exit(1)", avisar=False)
+    assert calado.msgs == []
+
+
+def test_cancelar_mata_o_processo_na_hora():
+    cancel = threading.Event()
+    paginas = []
+
+    def ao_paginar(n):
+        paginas.append(n)
+        cancel.set()
+
+    inicio = time.monotonic()
+    ok, err = m._run_gs(_falso("print('Page 1', flush=True); time.sleep(60)"), timeout=120, cwd=None,
+                        notify=m.Notifier(Queue()), cancel_flag=cancel, ao_paginar=ao_paginar)
+    assert (ok, err, paginas) == (False, "cancelado", [1])
+    assert time.monotonic() - inicio < 30
+
+
+def test_timeout_mata_e_reporta():
+    ok, err, _, notify = _rodar("time.sleep(60)", timeout=1)
+    assert (ok, err) == (False, "timeout")
+    assert notify.msgs[0][0] == "error" and "Tempo esgotado (1s)" in notify.msgs[0][1]
+
+
+def test_modo_pipe_copia_o_stdout_e_conta_paginas_pelo_stderr():
+    saida = io.BytesIO()
+    ok, _, paginas, _ = _rodar("dados = sys.stdin.buffer.read()\n"
+                               "sys.stderr.write('Page 1\\nPage 2\\n'); sys.stderr.flush()\n"
+                               "sys.stdout.buffer.write(dados[::-1])",
+                               entrada=b"%PDF" + bytes(range(256)) * 4096, saida=saida)
+    assert ok and paginas == [1, 2]
+    assert saida.getvalue() == (b"%PDF" + bytes(range(256)) * 4096)[::-1]
+
+
+@pytest.mark.skipif(m._encontrar_ghostscript() is None, reason="Ghostscript não instalado")
+def test_progresso_com_ghostscript_de_verdade(tmp_path):
+    pdf = gerar_pdf(str(tmp_path / "a.pdf"), 4, "A")
+    paginas = []
+    args = [m._encontrar_ghostscript()] + m._gs_opcoes("/ebook") + [f"-sOutputFile={tmp_path / 'b.pdf'}", pdf]
+    ok, _ = m._run_gs(args, timeout=60, cwd=str(tmp_path), notify=m.Notifier(Queue()), ao_paginar=paginas.append)
+    assert ok and paginas == [1, 2, 3, 4]
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import testesunirecomprimirpdf as m
+from pdfs_sinteticos import gerar_pdf
+
+
+@pytest.mark.parametrize("caminho, seguro", [
+    ("/casos/2024/proc-01_a.pdf", True),
+    ("C:/Users/ana/Documents/x.pdf", True),
+    ("/casos/com espaço.pdf", False),
+    ("/casos/petição.pdf", False),
+    ("/casos/o'brien.pdf", False),
+    ('/casos/"x".pdf', False),
+    ("/casos/a;b.pdf", False),
+])
+def test_caminho_seguro_para_gs(caminho, seguro):
+    assert m._caminho_seguro_para_gs(caminho) is seguro
+
+
+def test_caminho_seguro_dispensa_staging(tmp_path):
+    src = gerar_pdf(str(tmp_path / "simples.pdf"), 1, "A")
+    if not m._caminho_seguro_para_gs(src):
+        pytest.skip("pasta temporária com caracteres que o GS não lê direto")
+    with m.AreaStaging() as stage:
+        assert stage.preparar([src]) == [m._norm(os.path.abspath(src))]
+        assert [n for n in os.listdir(stage.dir) if n.endswith(".pdf")] == []
+
+
+def test_nome_acentuado_ganha_nome_ascii_no_stage(tmp_path):
+    src = gerar_pdf(str(tmp_path / "petição inicial.pdf"), 2, "A")
+    with m.AreaStaging() as stage:
+        dst, = stage.preparar([src])
+        assert os.path.dirname(dst) == stage.dir and m._caminho_seguro_para_gs(os.path.basename(dst))
+        with open(src, "rb") as a, open(dst, "rb") as b:
+            assert a.read() == b.read()
+    assert os.path.exists(src)   # fechar a área não toca na origem
+
+
+def test_mesma_origem_preparada_uma_vez_por_job(tmp_path):
+    src = gerar_pdf(str(tmp_path / "ação.pdf"), 1, "A")
+    with m.AreaStaging() as stage:
+        primeiro = stage.preparar([src, src])
+        assert primeiro[0] == primeiro[1] and stage.preparar([src]) == primeiro[:1]
+        # a origem mudou (mtime/tamanho): prepara de novo
+        gerar_pdf(src, 3, "B")
+        st = os.stat(src)
+        os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        assert stage.preparar([src]) != primeiro[:1]
+
+
+def test_response_file_usa_basename_so_para_o_que_esta_no_stage(tmp_path):
+    acentuado = gerar_pdf(str(tmp_path / "ação.pdf"), 1, "A")
+    with m.AreaStaging() as stage:
+        staged = stage.preparar([acentuado]) + ["/casos/seguro.pdf"]
+        lista = m._write_gs_listfile_basename(staged, stage)
+        assert os.path.dirname(lista) == stage.dir
+        with open(lista, encoding="ascii") as f:
+            assert f.read().splitlines() == [os.path.basename(staged[0]), "/casos/seguro.pdf"]
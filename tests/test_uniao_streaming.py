@@ -0,0 +1,114 @@
+import io
+import os
+from queue import Queue
+
+import pytest
+from PyPDF2 import PdfReader
+
+from pdfs_sinteticos import LADO_IMAGEM, esperado, gerar_pdf, imagem, marcas
+from testesunirecomprimirpdf import Notifier, UniaoStreaming, _recursos_compartilhaveis, unir_pdfs_sem_recomprimir
+
+
+@pytest.fixture
+def documentos(tmp_path):
+    return [gerar_pdf(str(tmp_path / "a.pdf"), 3, "A"), gerar_pdf(str(tmp_path / "b.pdf"), 2, "B"),
+            gerar_pdf(str(tmp_path / "c.pdf"), 4, "C")]
+
+
+def _unir(caminhos, **opcoes) -> bytes:
+    buf = io.BytesIO()
+    uniao = UniaoStreaming(buf, **opcoes)
+    for c in caminhos:
+        uniao.adicionar(c)
+    uniao.finalizar()
+    return buf.getvalue()
+
+
+def test_paginas_na_ordem_dos_arquivos(documentos):
+    dados = _unir(documentos, compacto=False)
+    assert marcas(dados) == esperado("A", 3) + esperado("B", 2) + esperado("C", 4)
+
+
+def test_selecao_de_paginas(documentos):
+    buf = io.BytesIO()
+    uniao = UniaoStreaming(buf, compacto=False)
+    assert uniao.adicionar(documentos[2], [3, 0]) == 2
+    assert uniao.adicionar(documentos[0], []) == 0
+    uniao.finalizar()
+    assert uniao.n_paginas == 2
+    assert marcas(buf.getvalue()) == ["C 4", "C 1"]
+
+
+def test_uniao_vazia_e_um_pdf_valido():
+    assert marcas(_unir([], compacto=False)) == []
+
+
+def test_unir_sem_recomprimir_em_arquivo(documentos, tmp_path):
+    saida = str(tmp_path / "saida.pdf")
+    assert unir_pdfs_sem_recomprimir(documentos, saida, streaming=True)
+    with open(saida, "rb") as f:
+        assert marcas(f.read()) == esperado("A", 3) + esperado("B", 2) + esperado("C", 4)
+    assert len(PdfReader(saida).pages) == 9
+
+
+def test_falha_no_streaming_cai_para_o_pypdf2_e_avisa(documentos, tmp_path, monkeypatch):
+    def quebra(self, path, paginas=None):
+        raise ValueError("xref exótica")
+    monkeypatch.setattr(UniaoStreaming, "adicionar", quebra)
+    saida = str(tmp_path / "saida.pdf")
+    notify = Notifier(Queue())
+    assert unir_pdfs_sem_recomprimir(documentos, saida, streaming=True, notify=notify)
+    with open(saida, "rb") as f:
+        assert marcas(f.read()) == esperado("A", 3) + esperado("B", 2) + esperado("C", 4)
+    assert not os.path.exists(saida + ".tmp")
+    assert [k for k, s in notify.msgs] == ["warn"] and "xref exótica" in notify.msgs[0][1]
+
+
+@pytest.mark.parametrize("compacto", [False, True])
+def test_releitura_estrita_nos_dois_formatos_de_xref(documentos, compacto):
+    dados = _unir(documentos, compacto=compacto)
+    assert marcas(dados) == esperado("A", 3) + esperado("B", 2) + esperado("C", 4)
+    assert (b"/ObjStm" in dados and b"/XRef" in dados) == compacto
+    assert (b"\nxref\n" in dados) != compacto
+
+
+def test_object_streams_reduzem_documento_de_muitas_paginas(tmp_path):
+    doc = gerar_pdf(str(tmp_path / "longo.pdf"), 250, "L")
+    classico, compacto = _unir([doc], compacto=False), _unir([doc], compacto=True)
+    assert marcas(compacto) == esperado("L", 250)
+    assert len(compacto) < len(classico) * 0.8
+
+
+@pytest.fixture
+def com_timbre(tmp_path):
+    # dois documentos comprimidos à parte com o mesmo timbre e um com imagem própria
+    timbre = imagem(1)
+    return [gerar_pdf(str(tmp_path / "x.pdf"), 2, "X", timbre), gerar_pdf(str(tmp_path / "y.pdf"), 3, "Y", timbre),
+            gerar_pdf(str(tmp_path / "z.pdf"), 1, "Z", imagem(2))]
+
+
+def _n_imagens(dados: bytes) -> int:
+    reader = PdfReader(io.BytesIO(dados), strict=True)
+    refs = {page["/Resources"]["/XObject"].raw_get("/Im0").idnum for page in reader.pages}
+    return len(refs)
+
+
+@pytest.mark.parametrize("compacto", [False, True])
+def test_deduplicacao_grava_o_recurso_repetido_uma_vez(com_timbre, compacto):
+    buf = io.BytesIO()
+    uniao = UniaoStreaming(buf, compacto=compacto, deduplicar=True)
+    for c in com_timbre:
+        uniao.adicionar(c)
+    uniao.finalizar()
+    dados = buf.getvalue()
+    sem = _unir(com_timbre, compacto=compacto, deduplicar=False)
+    assert marcas(dados) == marcas(sem) == esperado("X", 2) + esperado("Y", 3) + esperado("Z", 1)
+    assert (_n_imagens(dados), _n_imagens(sem)) == (2, 3)
+    assert uniao.bytes_deduplicados == LADO_IMAGEM * LADO_IMAGEM
+    assert len(sem) - len(dados) >= LADO_IMAGEM * LADO_IMAGEM - 100
+
+
+def test_recursos_compartilhaveis_identificam_o_mesmo_timbre(com_timbre):
+    x, y, z = (_recursos_compartilhaveis(c) for c in com_timbre)
+    assert list(x.values()) == [LADO_IMAGEM * LADO_IMAGEM]
+    assert x == y and not set(x) & set(z)
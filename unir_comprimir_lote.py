@@ -0,0 +1,207 @@
+"""
+Unir & Comprimir em lote, sem interface gráfica.
+
+Uso:
+  python unir_comprimir_lote.py --manifesto casos.jsonl
+  python unir_comprimir_lote.py --pasta "D:/Casos" --saida "D:/Casos comprimidos"
+
+Manifesto: um caso por linha, em JSON (linhas vazias e iniciadas por # são ignoradas):
+  {"destino": "D:/saida/caso_01.pdf", "arquivos": ["D:/caso_01/peticao.pdf", "D:/caso_01/procuracao.pdf"]}
+
+Pasta: cada subpasta (em qualquer nível) que contenha PDFs é um caso; os PDFs entram em
+ordem natural do nome (01, 02, 10…) e o destino é <saida>/<caminho relativo da subpasta>.pdf.
+
+Para cada caso é gravado, ao lado do destino, um <destino>.resumo.json com as partes geradas,
+tempos e mensagens. Todos os casos compartilham o mesmo pool de threads e o cache de compressão.
+
+Cada job também grava um rastro JSONL com a duração de cada etapa (pasta "rastros" dos dados
+do app). Para ver as etapas mais lentas somadas sobre vários rastros:
+  python unir_comprimir_lote.py --rastros            (pasta padrão)
+  python unir_comprimir_lote.py --rastros D:/rastros --top 20
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from testesunirecomprimirpdf import (
+    CACHE_MAX_MB, DUPLICATAS_MODOS, LIMITE_MB, MAX_WORKERS_DEFAULT, MOTORES, QUALIDADE_AUTO, QUALIDADES_GS,
+    CacheDisco, NotifierConsole, _mb, _pasta_rastros, processar_com_limite_worker, resumir_rastros,
+)
+
+
+def natural_sort_key(s):
+    # Mantém ordens humanas (001 < 10 < 100, etc.)
+    return [int(text) if text.isdigit() else text.lower() for text in re.split(r'(\d+)', s)]
+
+
+def ler_manifesto(path: str) -> List[Tuple[str, List[str]]]:
+    casos = []
+    with open(path, "r", encoding="utf-8") as f:
+        for num, linha in enumerate(f, start=1):
+            linha = linha.strip()
+            if not linha or linha.startswith("#"):
+                continue
+            try:
+                item = json.loads(linha)
+                destino = item["destino"]
+                arquivos = list(item["arquivos"])
+            except Exception as e:
+                raise ValueError(f"{path}:{num}: linha inválida ({e})")
+            if not arquivos:
+                raise ValueError(f"{path}:{num}: caso sem arquivos")
+            casos.append((destino, arquivos))
+    return casos
+
+
+def casos_da_pasta(raiz: str, saida: str) -> List[Tuple[str, List[str]]]:
+    raiz = os.path.abspath(raiz)
+    saida = os.path.abspath(saida)
+    casos = []
+    for dirpath, dirnames, filenames in os.walk(raiz):
+        dirnames[:] = sorted((d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != saida),
+                             key=natural_sort_key)
+        pdfs = sorted((f for f in filenames if f.lower().endswith(".pdf")), key=natural_sort_key)
+        if not pdfs:
+            continue
+        rel = os.path.relpath(dirpath, raiz)
+        nome = os.path.basename(raiz) if rel == "." else rel
+        destino = os.path.join(saida, nome + ".pdf")
+        casos.append((destino, [os.path.join(dirpath, f) for f in pdfs]))
+    return casos
+
+
+def caminho_resumo(destino: str) -> str:
+    return os.path.splitext(destino)[0] + ".resumo.json"
+
+
+def processar_caso(destino: str, arquivos: List[str], args, executor, cache_disco,
+                   cancel_flag: threading.Event) -> Dict:
+    nome = os.path.splitext(os.path.basename(destino))[0]
+    notify = NotifierConsole(prefixo=f"[{nome}] ")
+    faltando = [a for a in arquivos if not os.path.isfile(a)]
+    inicio = time.monotonic()
+    partes: List[str] = []
+    # a pasta do destino também recebe o resumo, mesmo quando o caso falha antes de processar
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(destino)) or ".", exist_ok=True)
+    except OSError as e:
+        notify.error(f"Falha ao criar a pasta de saída: {e}")
+    if faltando:
+        notify.error("Arquivos não encontrados:\n" + "\n".join(faltando))
+    else:
+        try:
+            partes = processar_com_limite_worker(
+                arquivos, destino, args.qualidade, args.remover_brancos, not args.preciso, notify, cancel_flag,
+                compressao_paralela=not args.sem_paralelo, executor=executor, cache_disco=cache_disco,
+                motor=args.motor, duplicatas=args.duplicatas,
+            )
+        except Exception as e:
+            notify.error(f"Falha inesperada: {e}")
+    resumo = {
+        "destino": destino,
+        "arquivos": arquivos,
+        "ok": bool(partes),
+        "partes": [{"arquivo": p, "mb": round(_mb(p), 3)} for p in partes],
+        "segundos": round(time.monotonic() - inicio, 2),
+        "qualidade": args.qualidade,
+        "modo": "preciso" if args.preciso else "turbo",
+        "motor": args.motor,
+        "duplicatas": args.duplicatas,
+        "limite_mb": LIMITE_MB,
+        "mensagens": [{"tipo": k, "texto": m} for k, m in notify.msgs],
+    }
+    try:
+        with open(caminho_resumo(destino), "w", encoding="utf-8") as f:
+            json.dump(resumo, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        notify.error(f"Falha ao gravar resumo: {e}")
+    return resumo
+
+
+def imprimir_resumo_rastros(pasta: str, top: int) -> int:
+    caminhos = sorted(glob.glob(os.path.join(pasta, "*.jsonl")))
+    if not caminhos:
+        print(f"Nenhum rastro em {pasta}")
+        return 0
+    resumo = resumir_rastros(caminhos, top=top)
+    print(f"{resumo['rastros']} rastro(s) em {pasta}\n")
+    print(f"{'etapa':<24}{'n':>6}{'total s':>10}{'média s':>10}{'p95 s':>9}{'máx s':>9}{'cpu s':>9}{'MB in':>9}{'MB out':>9}")
+    for e in resumo["etapas"]:
+        print(f"{e['nome']:<24}{e['n']:>6}{e['total_s']:>10.2f}{e['media_s']:>10.3f}{e['p95_s']:>9.3f}{e['max_s']:>9.3f}"
+              f"{e['cpu_s']:>9.2f}{e['bytes_in'] / 1048576:>9.1f}{e['bytes_out'] / 1048576:>9.1f}")
+    print(f"\n{top} spans mais lentos:")
+    for sp in resumo["lentos"]:
+        extras = {k: v for k, v in sp.items()
+                  if k not in ("job", "id", "pai", "nome", "inicio", "thread", "dur_s", "cpu_s", "_rastro")}
+        print(f"  {sp.get('dur_s', 0):>8.2f}s  {sp.get('nome', '?'):<22} {sp['_rastro']}  {json.dumps(extras, ensure_ascii=False)}")
+    return 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Une e comprime vários casos (PDFs) em lote, sem interface.")
+    origem = ap.add_mutually_exclusive_group(required=True)
+    origem.add_argument("--manifesto", help="arquivo JSONL: um caso por linha com 'destino' e 'arquivos'")
+    origem.add_argument("--pasta", help="pasta raiz; cada subpasta com PDFs é um caso")
+    origem.add_argument("--rastros", nargs="?", const=_pasta_rastros(), metavar="PASTA",
+                        help="não processa nada: resume as etapas mais lentas dos rastros JSONL")
+    ap.add_argument("--saida", help="pasta de saída (obrigatória com --pasta)")
+    ap.add_argument("--qualidade", default="/ebook", choices=QUALIDADES_GS + (QUALIDADE_AUTO,),
+                    help=f"preset do Ghostscript, ou '{QUALIDADE_AUTO}' para escolher por amostragem")
+    ap.add_argument("--motor", default="gs", choices=MOTORES,
+                    help="gs = Ghostscript; imagens = recodifica só as imagens embutidas (scans/fotos)")
+    ap.add_argument("--preciso", action="store_true", help="modo preciso (padrão: turbo)")
+    ap.add_argument("--remover-brancos", action="store_true", help="remove páginas em branco")
+    ap.add_argument("--duplicatas", default="desligado", choices=DUPLICATAS_MODOS,
+                    help="páginas repetidas no caso: relatar, remover (idênticas) ou remover_similares (também rescans)")
+    ap.add_argument("--sem-paralelo", action="store_true", help="não comprime PDFs grandes em fatias paralelas")
+    ap.add_argument("--workers", type=int, default=MAX_WORKERS_DEFAULT, help="threads do pool compartilhado")
+    ap.add_argument("--cache-max-mb", type=float, default=CACHE_MAX_MB, help="teto do cache de compressão")
+    ap.add_argument("--top", type=int, default=10, help="spans individuais listados com --rastros")
+    args = ap.parse_args(argv)
+
+    if args.rastros:
+        return imprimir_resumo_rastros(args.rastros, args.top)
+
+    if args.pasta and not args.saida:
+        ap.error("--saida é obrigatória com --pasta")
+    try:
+        casos = ler_manifesto(args.manifesto) if args.manifesto else casos_da_pasta(args.pasta, args.saida)
+    except (OSError, ValueError) as e:
+        print(f"ERRO: {e}", file=sys.stderr)
+        return 2
+    if not casos:
+        print("Nenhum caso encontrado.")
+        return 0
+
+    cancel_flag = threading.Event()
+    cache_disco = CacheDisco(max_mb=args.cache_max_mb)
+    resumos = []
+    inicio = time.monotonic()
+    print(f"{len(casos)} caso(s) — qualidade {args.qualidade}, {args.workers} workers")
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        try:
+            for n, (destino, arquivos) in enumerate(casos, start=1):
+                print(f"=== Caso {n}/{len(casos)}: {destino}", flush=True)
+                resumos.append(processar_caso(destino, arquivos, args, executor, cache_disco, cancel_flag))
+        except KeyboardInterrupt:
+            cancel_flag.set()
+            print("Cancelado pelo usuário.", file=sys.stderr)
+
+    falhas = [r["destino"] for r in resumos if not r["ok"]]
+    print(f"Concluído em {time.monotonic() - inicio:.1f}s: {len(resumos) - len(falhas)} ok, {len(falhas)} com falha.")
+    for d in falhas:
+        print(f"  falhou: {d}  (ver {caminho_resumo(d)})")
+    return 1 if falhas or cancel_flag.is_set() else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
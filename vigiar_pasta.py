@@ -0,0 +1,322 @@
+"""
+Vigia uma pasta de entrada e une & comprime cada caso sozinho, quando ele para de mudar.
+
+Uso:
+  python vigiar_pasta.py --entrada "D:/Entrada" --saida "D:/Saida"
+  python vigiar_pasta.py --entrada /srv/entrada --saida /srv/saida --assentar 60 --janela 19-7
+
+Casos são como no lote (unir_comprimir_lote.py --pasta): cada subpasta com PDFs é um caso, os
+PDFs entram em ordem natural do nome e o destino é <saida>/<caminho relativo da subpasta>.pdf.
+
+Um caso é processado quando fica --assentar segundos sem mudança (arquivo novo, apagado ou ainda
+sendo copiado). Se depois chegar mais um PDF, o caso é refeito. O padrão aqui é o modo preciso,
+que não passa o conjunto inteiro pelo Ghostscript: cada PDF é pré-comprimido sozinho, então os que
+não mudaram saem do cache de compressão (CacheDisco) e só o que é novo passa pelo Ghostscript
+(com --turbo o caso inteiro é recomprimido a cada vez). Partes antigas que sobrarem (o caso
+encolheu) são apagadas.
+
+No Linux as mudanças chegam por inotify (ctypes, sem dependências); nos demais sistemas, ou se o
+inotify falhar, a árvore é varrida a cada --intervalo segundos. O estado (o que já foi processado)
+fica em <saida>/.vigia_estado.json, então reiniciar o serviço não refaz casos prontos.
+"""
+import argparse
+import ctypes
+import ctypes.util
+import glob
+import json
+import multiprocessing
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from testesunirecomprimirpdf import (
+    CACHE_MAX_MB, DUPLICATAS_MODOS, MAX_WORKERS_DEFAULT, MOTORES, QUALIDADE_AUTO, QUALIDADES_GS,
+    CacheDisco,
+)
+from unir_comprimir_lote import casos_da_pasta, processar_caso
+
+ESTADO_ARQUIVO = ".vigia_estado.json"
+
+
+def _log(s: str):
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {s}", flush=True)
+
+
+# ===================== Detecção de mudanças =====================
+
+class InotifyArvore:
+    """
+    inotify recursivo via ctypes: só serve para acordar o laço quando algo muda na árvore
+    (quem descobre o quê mudou é a varredura). Diretórios novos ganham watch na próxima varredura.
+    """
+    _MASCARA = (0x00000002 | 0x00000008 | 0x00000040 | 0x00000080 | 0x00000100 | 0x00000200 |
+                0x00000400 | 0x00000800)   # MODIFY CLOSE_WRITE MOVED_FROM MOVED_TO CREATE DELETE DELETE_SELF MOVE_SELF
+    _IN_NONBLOCK = 0o4000
+    _IN_CLOEXEC = 0o2000000
+
+    def __init__(self, parar: threading.Event):
+        self.parar = parar
+        nome = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not nome:
+            raise OSError("inotify indisponível")
+        self._libc = ctypes.CDLL(nome, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self._libc.inotify_init1(self._IN_NONBLOCK | self._IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self._vigiados: Dict[str, int] = {}
+
+    def vigiar_arvore(self, raiz: str, ignorar: Optional[str] = None):
+        for dirpath, dirnames, _ in os.walk(raiz):
+            if ignorar:
+                dirnames[:] = [d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != ignorar]
+            if dirpath in self._vigiados:
+                continue
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), self._MASCARA)
+            if wd < 0:
+                erro = ctypes.get_errno()
+                if erro == 28:   # ENOSPC: acabou fs.inotify.max_user_watches
+                    raise OSError(erro, "limite de watches do inotify atingido")
+                continue
+            self._vigiados[dirpath] = wd
+
+    def esperar(self, timeout: float) -> bool:
+        """
+        Bloqueia até chegar evento, passar o timeout ou pedirem parada. Retorna True se houve evento
+        (e esvazia a fila).
+        """
+        limite = time.monotonic() + max(0.0, timeout)
+        while True:
+            # fatias curtas: o select é retomado após o sinal, então o pedido de parada é checado aqui
+            prontos, _, _ = select.select([self.fd], [], [], min(0.5, max(0.0, limite - time.monotonic())))
+            if prontos:
+                break
+            if self.parar.is_set() or time.monotonic() >= limite:
+                return False
+        while True:
+            try:
+                dados = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            if not dados:
+                break
+            pos = 0
+            while pos + 16 <= len(dados):
+                wd, mascara, _, tam = struct.unpack_from("iIII", dados, pos)
+                if mascara & 0x00008000:   # IN_IGNORED: o diretório sumiu
+                    for d, w in list(self._vigiados.items()):
+                        if w == wd:
+                            del self._vigiados[d]
+                pos += 16 + tam
+        return True
+
+    def fechar(self):
+        try: os.close(self.fd)
+        except Exception: pass
+
+
+class Varredura:
+    """
+    Sem inotify: espera o intervalo de varredura (ou o sinal de parada).
+    """
+    def __init__(self, parar: threading.Event):
+        self.parar = parar
+
+    def vigiar_arvore(self, raiz: str, ignorar: Optional[str] = None):
+        pass
+
+    def esperar(self, timeout: float) -> bool:
+        self.parar.wait(timeout)
+        return False
+
+    def fechar(self):
+        pass
+
+
+# ===================== Estado dos casos =====================
+
+def assinatura_caso(arquivos: List[str]) -> List[Tuple[str, int, int]]:
+    """
+    (caminho, tamanho, mtime) de cada PDF: muda quando um arquivo entra, sai ou ainda está sendo gravado.
+    """
+    assinatura = []
+    for a in arquivos:
+        try:
+            st = os.stat(a)
+            assinatura.append((a, st.st_size, st.st_mtime_ns))
+        except OSError:
+            assinatura.append((a, -1, 0))
+    return assinatura
+
+
+def ler_estado(path: str) -> Dict[str, List]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def gravar_estado(path: str, estado: Dict[str, List]):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def apagar_partes_antigas(destino: str, partes_novas: List[str]):
+    # o caso encolheu (ou deixou de ser dividido): partes/arquivo inteiro da execução anterior não valem mais
+    base, ext = os.path.splitext(destino)
+    antigas = set(glob.glob(glob.escape(base) + "_parte_*" + ext)) | {destino}
+    manter = {os.path.abspath(p) for p in partes_novas}
+    for p in antigas:
+        if os.path.exists(p) and os.path.abspath(p) not in manter:
+            try: os.remove(p)
+            except Exception: pass
+
+
+def dentro_da_janela(janela: Optional[Tuple[int, int]]) -> bool:
+    if janela is None:
+        return True
+    inicio, fim = janela
+    hora = time.localtime().tm_hour
+    return inicio <= hora < fim if inicio <= fim else (hora >= inicio or hora < fim)
+
+
+# ===================== Laço principal =====================
+
+def vigiar(args, parar: threading.Event) -> int:
+    entrada = os.path.abspath(args.entrada)
+    saida = os.path.abspath(args.saida)
+    os.makedirs(saida, exist_ok=True)
+    caminho_estado = os.path.join(saida, ESTADO_ARQUIVO)
+    estado = ler_estado(caminho_estado)   # destino -> assinatura processada
+
+    observador = None
+    if not args.sem_inotify:
+        try:
+            observador = InotifyArvore(parar)
+            observador.vigiar_arvore(entrada, ignorar=saida)
+            _log(f"Vigiando {entrada} (inotify)")
+        except OSError as e:
+            if observador is not None:
+                observador.fechar()
+            observador = None
+            _log(f"inotify indisponível ({e}); varrendo a cada {args.intervalo:.0f}s")
+    if observador is None:
+        observador = Varredura(parar)
+        if args.sem_inotify:
+            _log(f"Vigiando {entrada} (varredura a cada {args.intervalo:.0f}s)")
+
+    cache_disco = CacheDisco(max_mb=args.cache_max_mb)
+    vistos: Dict[str, List] = {}          # destino -> última assinatura observada
+    mudou_em: Dict[str, float] = {}       # destino -> quando a assinatura mudou pela última vez
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            while not parar.is_set():
+                try:
+                    observador.vigiar_arvore(entrada, ignorar=saida)
+                except OSError as e:
+                    _log(f"inotify: {e}; passando para varredura")
+                    observador.fechar()
+                    observador = Varredura(parar)
+
+                agora = time.monotonic()
+                casos = casos_da_pasta(entrada, saida)
+                for destino, arquivos in casos:
+                    assinatura = [list(x) for x in assinatura_caso(arquivos)]
+                    if vistos.get(destino) != assinatura:
+                        vistos[destino] = assinatura
+                        mudou_em[destino] = agora
+                proximo = args.intervalo
+                for destino, arquivos in casos:
+                    if parar.is_set():
+                        break
+                    if estado.get(destino) == vistos[destino]:
+                        continue
+                    falta = args.assentar - (time.monotonic() - mudou_em[destino])
+                    if falta > 0:
+                        proximo = min(proximo, falta)
+                        continue
+                    if not dentro_da_janela(args.janela):
+                        continue
+                    _log(f"Processando {os.path.relpath(destino, saida)} ({len(arquivos)} PDF(s))")
+                    resumo = processar_caso(destino, arquivos, args, executor, cache_disco, parar)
+                    if parar.is_set():
+                        break
+                    # gravado mesmo em falha: só tenta de novo quando o caso mudar
+                    estado[destino] = vistos[destino]
+                    if resumo["ok"]:
+                        apagar_partes_antigas(destino, [p["arquivo"] for p in resumo["partes"]])
+                        _log(f"  ok em {resumo['segundos']:.1f}s: {len(resumo['partes'])} arquivo(s)")
+                    else:
+                        _log(f"  falhou (ver {os.path.splitext(destino)[0]}.resumo.json)")
+                    try:
+                        gravar_estado(caminho_estado, estado)
+                    except Exception as e:
+                        _log(f"Falha ao gravar estado: {e}")
+                if args.uma_vez and all(estado.get(d) == vistos[d] for d, _ in casos):
+                    break
+                observador.esperar(max(0.2, proximo))
+    finally:
+        observador.fechar()
+    return 0
+
+
+def _janela(texto: str) -> Tuple[int, int]:
+    try:
+        inicio, fim = (int(x) for x in texto.split("-"))
+        if not (0 <= inicio <= 23 and 0 <= fim <= 24):
+            raise ValueError
+        return inicio, fim
+    except ValueError:
+        raise argparse.ArgumentTypeError("use HH-HH, ex.: 19-7")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Vigia uma pasta e une & comprime cada caso quando ele para de mudar.")
+    ap.add_argument("--entrada", required=True, help="pasta vigiada; cada subpasta com PDFs é um caso")
+    ap.add_argument("--saida", required=True, help="pasta de saída (pode ficar dentro da entrada)")
+    ap.add_argument("--assentar", type=float, default=30.0, help="segundos sem mudança antes de processar um caso")
+    ap.add_argument("--intervalo", type=float, default=10.0, help="segundos entre varreduras (sem inotify)")
+    ap.add_argument("--janela", type=_janela, default=None, metavar="HH-HH",
+                    help="só processa nesse horário (ex.: 19-7, fora do expediente)")
+    ap.add_argument("--sem-inotify", action="store_true", help="sempre varre a pasta em vez de usar inotify")
+    ap.add_argument("--uma-vez", action="store_true", help="processa o que estiver pendente e sai")
+    ap.add_argument("--qualidade", default="/ebook", choices=QUALIDADES_GS + (QUALIDADE_AUTO,))
+    ap.add_argument("--motor", default="gs", choices=MOTORES)
+    ap.add_argument("--duplicatas", default="desligado", choices=DUPLICATAS_MODOS)
+    ap.add_argument("--turbo", action="store_true",
+                    help="modo turbo (padrão aqui: preciso, que reaproveita o cache por arquivo ao refazer um caso)")
+    ap.add_argument("--remover-brancos", action="store_true", help="remove páginas em branco")
+    ap.add_argument("--sem-paralelo", action="store_true", help="não comprime PDFs grandes em fatias paralelas")
+    ap.add_argument("--workers", type=int, default=MAX_WORKERS_DEFAULT, help="threads do pool compartilhado")
+    ap.add_argument("--cache-max-mb", type=float, default=CACHE_MAX_MB, help="teto do cache de compressão")
+    args = ap.parse_args(argv)
+    args.preciso = not args.turbo   # processar_caso segue as opções do lote
+
+    if not os.path.isdir(args.entrada):
+        print(f"ERRO: pasta de entrada não existe: {args.entrada}", file=sys.stderr)
+        return 2
+
+    parar = threading.Event()
+
+    def _sinal(signum, frame):
+        _log("Encerrando…")
+        parar.set()
+
+    signal.signal(signal.SIGINT, _sinal)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, _sinal)
+    return vigiar(args, parar)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())